@@ -0,0 +1,163 @@
+#price alerts: a DM once a stock's price reaches a level, checked right after every market update.
+#
+#    above  fires once the price is at or above the level
+#    below  fires once the price is at or below the level
+#
+#an alert is only accepted while the price hasn't reached it yet, and it's gone once it fires, so
+#every alert left was crossed if and only if the new price is past it: the ones that fire are a
+#prefix of a per-(symbol, direction) sorted list, found with one bisect and cut off in
+#O(log n + fired). only the list on the side the price moved towards is looked at, and the
+#alerts that don't fire never are.
+#
+#fired alerts go to an outbox grouped by user, the cog sends out a few DMs a second from it
+#(see StocksCog.send_alerts) so a big move can't run into discord's rate limits. the alerts are
+#kept in memory and written to ALERTS_FILE whenever they change, the outbox isn't kept.
+import datetime
+import itertools
+import math
+import os
+from sortedcontainers import SortedList
+from globals import ALERTS_FILE
+import snapshots
+
+DIRECTIONS = ("above", "below")
+MAX_ALERTS_PER_USER = 25
+
+_alerts = None
+#(symbol, direction) -> SortedList of (key, alert id), the key is -price for below so what fires
+#first sorts first either way
+_sorted = {}
+#user id -> set of their alert ids
+_by_user = {}
+_next_id = 1
+#user id -> [lines] not sent yet, oldest user first
+_outbox = {}
+
+
+def _key(alert):
+    return alert["price"] if alert["direction"] == "above" else -alert["price"]
+
+
+def _index(alert):
+    _sorted.setdefault((alert["symbol"], alert["direction"]), SortedList()).add((_key(alert), alert["id"]))
+    _by_user.setdefault(alert["user_id"], set()).add(alert["id"])
+
+
+def _unindex(alert):
+    ids = _by_user.get(alert["user_id"])
+    if ids is not None:
+        ids.discard(alert["id"])
+        if not ids:
+            del _by_user[alert["user_id"]]
+
+
+def load():
+    """The active alerts, {alert id: alert}. Read from ALERTS_FILE on first use."""
+    global _alerts, _next_id
+    if _alerts is None:
+        saved = {}
+        if os.path.exists(ALERTS_FILE):
+            try:
+                saved = snapshots.load(ALERTS_FILE)
+            except ValueError:
+                print(f"{ALERTS_FILE} is unreadable, starting with no alerts.")
+        _alerts = {}
+        for alert in saved.get("alerts", []):
+            _alerts[alert["id"]] = alert
+            _index(alert)
+        _next_id = saved.get("next_id", max(_alerts, default=0) + 1)
+    return _alerts
+
+
+def save():
+    snapshots.save(ALERTS_FILE, {"next_id": _next_id, "alerts": list(load().values())})
+
+
+def user_alerts(user_id):
+    """The user's active alerts, oldest first."""
+    alerts = load()
+    return [alerts[alert_id] for alert_id in sorted(_by_user.get(str(user_id), ()))]
+
+
+def add(user_id, symbol, price, current):
+    """Add an alert at price, above or below depending on which side of the current price it is.
+
+    Raises ValueError if the price is the current price.
+    """
+    global _next_id
+    if price == current:
+        raise ValueError(f"{symbol} is already at {price}.")
+    alerts = load()
+    alert = {
+        "id": _next_id,
+        "user_id": str(user_id),
+        "symbol": symbol,
+        "direction": "above" if price > current else "below",
+        "price": price,
+        "from": current,
+        "created": datetime.datetime.now().isoformat(),
+    }
+    _next_id += 1
+    alerts[alert["id"]] = alert
+    _index(alert)
+    save()
+    return alert
+
+
+def remove(alert_id, user_id=None):
+    """Remove an alert and return it, None if there's no such alert (or it's not user_id's)."""
+    alerts = load()
+    alert = alerts.get(alert_id)
+    if alert is None or (user_id is not None and alert["user_id"] != str(user_id)):
+        return None
+    del alerts[alert_id]
+    _unindex(alert)
+    _sorted[(alert["symbol"], alert["direction"])].remove((_key(alert), alert_id))
+    save()
+    return alert
+
+
+def check(prices, previous=None):
+    """Take out every alert the new prices ({symbol: price}) reached. Returns [(alert, price)].
+
+    With the previous prices only the side each symbol moved towards is looked at.
+    """
+    alerts = load()
+    fired = []
+    for symbol, price in prices.items():
+        old = None if previous is None else previous.get(symbol)
+        for direction in DIRECTIONS:
+            #a price that went up can't have crossed anything below it, and the other way round
+            if old is not None and (price <= old if direction == "above" else price >= old):
+                continue
+            ranked = _sorted.get((symbol, direction))
+            if not ranked:
+                continue
+            #everything keyed at or under this has been crossed since the last update
+            end = ranked.bisect_left((price if direction == "above" else -price, math.inf))
+            if not end:
+                continue
+            for _, alert_id in ranked[:end]:
+                alert = alerts.pop(alert_id)
+                _unindex(alert)
+                fired.append((alert, price))
+            del ranked[:end]
+    if fired:
+        save()
+    return fired
+
+
+def notify(fired):
+    """Queue a DM line for each fired alert from check()."""
+    for alert, price in fired:
+        _outbox.setdefault(alert["user_id"], []).append(
+            f"{alert['symbol']} is now {price}, {alert['direction']} your alert at {alert['price']} (#{alert['id']}, set at {alert['from']}).")
+
+
+def outbox(count):
+    """Take up to count users' queued lines, [(user id, [lines])], the longest waiting first."""
+    return [(user_id, _outbox.pop(user_id)) for user_id in list(itertools.islice(_outbox, count))]
+
+
+def queued():
+    return len(_outbox)
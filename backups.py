@@ -0,0 +1,371 @@
+#backups of every state file. each backup is a small manifest naming one blob per file, blobs
+#are compressed (zstd if the zstandard package is installed, gzip otherwise) and shared between
+#backups, so a file that didn't change costs nothing and a dict-shaped file that did change
+#(data.json, stocks.json, ...) is usually stored as just the keys that differ from the previous
+#backup. the binary history stores (price_history/, networth_history/) are backed up file by file
+#as raw bytes, and since they're mostly appended to, a file that grew is stored as the bytes after
+#what the previous backup had. old backups are thinned out to the newest one per hour/day/week.
+#
+#    backups/manifests/20250101_120000.json   {"time": ..., "files": {"data.json": "<blob id>", ...},
+#                                              "binary": {"price_history/INK.bin": "<blob id>", ...}}
+#    backups/blobs/<blob id>.zst              {"full": <content>} or {"base": "<blob id>", "set": {...}, "del": [...]}
+#                                             for binary files F + bytes, or D + base blob id + 8 byte
+#                                             length kept of the base + the bytes after it
+#
+#restoring is done by hand with the bot stopped:
+#    python backups.py list
+#    python backups.py restore 20250101_1200 restored/
+import datetime
+import gzip
+import hashlib
+import os
+import sys
+from globals import (DATA_FILE, STOCK_FILE, OPTIONS_FILE, CONTRACTS_FILE, LOTTERY_FILE, DRUG_MARKET_FILE, ORDERS_FILE,
+                     ALERTS_FILE, MARGIN_FILE, SHORTS_FILE, BASKETS_FILE, PRICE_HISTORY_DIR, NETWORTH_HISTORY_DIR,
+                     STORAGE_BACKEND, SQLITE_FILE, BACKUP_DIR, BACKUP_KEEP_HOURLY, BACKUP_KEEP_DAILY, BACKUP_KEEP_WEEKLY)
+import snapshots
+from fileio import write_atomic
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STATE_FILES = (DATA_FILE, STOCK_FILE, OPTIONS_FILE, CONTRACTS_FILE, LOTTERY_FILE, DRUG_MARKET_FILE,
+               ORDERS_FILE, ALERTS_FILE, MARGIN_FILE, SHORTS_FILE, BASKETS_FILE)
+#directories of binary files, every file in them is backed up
+STATE_DIRS = (PRICE_HISTORY_DIR, NETWORTH_HISTORY_DIR)
+TIME_FORMAT = "%Y%m%d_%H%M%S"
+#a delta chain is cut with a full copy after this many links, so a restore never replays too many
+MAX_CHAIN = 48
+#a binary file whose last bytes were rewritten (the newest candle) still gets a delta if no more
+#than this many were
+REWRITE_SLACK = 64
+
+MANIFEST_DIR = os.path.join(BACKUP_DIR, "manifests")
+BLOB_DIR = os.path.join(BACKUP_DIR, "blobs")
+
+#file name -> (blob id, decoded content, chain length) of the newest backup, used to build deltas
+_last = {}
+#binary file path -> (blob id, size, digest of the content, digest of all but the last REWRITE_SLACK
+#bytes, chain length) of the newest backup. the content itself isn't kept, the stores can be big
+_last_binary = {}
+
+
+def _compress(raw):
+    if zstandard is not None:
+        return ".zst", zstandard.ZstdCompressor(level=3).compress(raw)
+    return ".gz", gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd compressed but the zstandard package isn't installed.")
+        return zstandard.ZstdDecompressor().decompress(raw)
+    return gzip.decompress(raw)
+
+
+def _blob_path(blob_id):
+    for ext in (".zst", ".gz"):
+        path = os.path.join(BLOB_DIR, blob_id + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"Backup blob {blob_id} is missing.")
+
+
+def _write_blob(entry):
+    raw = snapshots.json_line(entry)
+    blob_id = hashlib.sha256(raw).hexdigest()[:24]
+    try:
+        _blob_path(blob_id)
+    except FileNotFoundError:
+        ext, packed = _compress(raw)
+        write_atomic(os.path.join(BLOB_DIR, blob_id + ext), packed)
+    return blob_id
+
+
+def _read_blob(blob_id):
+    return snapshots.loads(_decompress(_blob_path(blob_id)))
+
+
+def _write_binary_blob(raw):
+    blob_id = hashlib.sha256(raw).hexdigest()[:24]
+    try:
+        _blob_path(blob_id)
+    except FileNotFoundError:
+        ext, packed = _compress(raw)
+        write_atomic(os.path.join(BLOB_DIR, blob_id + ext), packed)
+    return blob_id
+
+
+def _binary_base(raw):
+    """The base blob id of a binary blob, None for a full copy."""
+    return raw[1:25].decode() if raw[:1] == b"D" else None
+
+
+def read_binary(blob_id):
+    """Rebuild a binary file's bytes by replaying its chain of appends. Returns (content, chain length)."""
+    chain = []
+    raw = _decompress(_blob_path(blob_id))
+    while raw[:1] == b"D":
+        chain.append(raw)
+        raw = _decompress(_blob_path(_binary_base(raw)))
+    content = raw[1:]
+    for delta in reversed(chain):
+        kept = int.from_bytes(delta[25:33], "little")
+        content = content[:kept] + delta[33:]
+    return content, len(chain)
+
+
+def _digests(content):
+    return (hashlib.sha256(content).digest(),
+            hashlib.sha256(content[:max(0, len(content) - REWRITE_SLACK)]).digest())
+
+
+def _state_paths():
+    """Every file in STATE_DIRS, relative to the bot's directory."""
+    paths = []
+    for directory in STATE_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for root, _, names in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in names if not name.endswith(".tmp"))
+    return sorted(paths)
+
+
+def _backup_binary(path):
+    """Back up one binary file, a delta against its previous backup if that's a prefix of it. Returns the blob id."""
+    with open(path, "rb") as f:
+        content = f.read()
+    whole, head = _digests(content)
+    previous = _last_binary.get(path)
+    if previous is not None and previous[2] == whole:
+        return previous[0]
+    blob = b"F" + content
+    chain = 0
+    if previous is not None and previous[4] < MAX_CHAIN:
+        base_id, size, base_whole, base_head, base_chain = previous
+        kept = None
+        if len(content) >= size and hashlib.sha256(content[:size]).digest() == base_whole:
+            kept = size
+        elif len(content) >= size - REWRITE_SLACK and hashlib.sha256(content[:max(0, size - REWRITE_SLACK)]).digest() == base_head:
+            kept = max(0, size - REWRITE_SLACK)
+        if kept is not None:
+            blob = b"D" + base_id.encode() + kept.to_bytes(8, "little") + content[kept:]
+            chain = base_chain + 1
+    blob_id = _write_binary_blob(blob)
+    _last_binary[path] = (blob_id, len(content), whole, head, chain)
+    return blob_id
+
+
+def read_content(blob_id):
+    """Rebuild a file's content by replaying its delta chain. Returns (content, chain length)."""
+    chain = []
+    entry = _read_blob(blob_id)
+    while "base" in entry:
+        chain.append(entry)
+        entry = _read_blob(entry["base"])
+    content = entry["full"]
+    for delta in reversed(chain):
+        content = dict(content)
+        content.update(delta["set"])
+        for key in delta["del"]:
+            content.pop(key, None)
+    return content, len(chain)
+
+
+def _read_state(name):
+    """Current content of a state file, None if it doesn't exist."""
+    if name == DATA_FILE and STORAGE_BACKEND == "sqlite":
+        #data.json isn't kept up to date with the sqlite backend, back up the database's users instead
+        from storage import SqliteBackend
+        return SqliteBackend(SQLITE_FILE).load()
+    try:
+        return snapshots.load(name)
+    except FileNotFoundError:
+        return None
+
+
+def _encode_entry(name, content):
+    """Full copy or delta against the previous backup of this file."""
+    previous = _last.get(name)
+    if previous is None or not isinstance(content, dict) or not isinstance(previous[1], dict) or previous[2] >= MAX_CHAIN:
+        return {"full": content}, 0
+    base_id, base, chain = previous
+    changed = {key: value for key, value in content.items() if base.get(key) != value or key not in base}
+    removed = [key for key in base if key not in content]
+    if len(changed) + len(removed) > len(content) // 2:
+        #mostly rewritten, a delta would be about as big as a full copy
+        return {"full": content}, 0
+    return {"base": base_id, "set": changed, "del": removed}, chain + 1
+
+
+def list_backups():
+    """Backup timestamps, oldest first."""
+    if not os.path.isdir(MANIFEST_DIR):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(MANIFEST_DIR) if name.endswith(".json"))
+
+
+def read_manifest(stamp):
+    return snapshots.load(os.path.join(MANIFEST_DIR, stamp + ".json"))
+
+
+def _resume():
+    #first backup since startup, pick the delta chains up from the newest manifest
+    stamps = list_backups()
+    if not stamps:
+        return
+    manifest = read_manifest(stamps[-1])
+    for name, blob_id in manifest["files"].items():
+        if blob_id is not None:
+            content, chain = read_content(blob_id)
+            _last[name] = (blob_id, content, chain)
+    for path, blob_id in manifest.get("binary", {}).items():
+        content, chain = read_binary(blob_id)
+        _last_binary[path] = (blob_id, len(content), *_digests(content), chain)
+
+
+def create_backup(now=None):
+    """Back up every state file. Blocking, run it in a worker thread."""
+    now = now or datetime.datetime.now()
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    if not _last and not _last_binary:
+        _resume()
+    files = {}
+    for name in STATE_FILES:
+        try:
+            content = _read_state(name)
+        except ValueError as e:
+            print(f"Skipping unreadable {name} in backup: {e}")
+            content = None
+        if content is None:
+            files[name] = None
+            continue
+        previous = _last.get(name)
+        if previous is not None and previous[1] == content:
+            files[name] = previous[0]
+            continue
+        entry, chain = _encode_entry(name, content)
+        blob_id = _write_blob(entry)
+        _last[name] = (blob_id, content, chain)
+        files[name] = blob_id
+    binary = {}
+    for path in _state_paths():
+        try:
+            binary[path] = _backup_binary(path)
+        except FileNotFoundError:
+            #removed since the listing (a prune or a migration swapping the directory in)
+            continue
+    stamp = now.strftime(TIME_FORMAT)
+    write_atomic(os.path.join(MANIFEST_DIR, stamp + ".json"),
+                 snapshots.json_line({"time": now.isoformat(), "files": files, "binary": binary}))
+    removed = prune()
+    print(f"Backup {stamp} written, pruned {removed} old backup(s).")
+    return stamp
+
+
+def select_retained(stamps, hourly=BACKUP_KEEP_HOURLY, daily=BACKUP_KEEP_DAILY, weekly=BACKUP_KEEP_WEEKLY):
+    """The newest backup in each of the last `hourly` hours, `daily` days and `weekly` weeks."""
+    times = sorted((datetime.datetime.strptime(s, TIME_FORMAT) for s in stamps), reverse=True)
+    keep = set(times[:1])
+    for bucket_format, count in (("%Y%m%d%H", hourly), ("%Y%m%d", daily), ("%G%V", weekly)):
+        buckets = set()
+        for t in times:
+            bucket = t.strftime(bucket_format)
+            if bucket in buckets:
+                continue
+            if len(buckets) >= count:
+                break
+            buckets.add(bucket)
+            keep.add(t)
+    return {t.strftime(TIME_FORMAT) for t in keep}
+
+
+def prune():
+    """Drop backups outside the retention policy and any blob no remaining backup needs."""
+    stamps = list_backups()
+    keep = select_retained(stamps)
+    for stamp in stamps:
+        if stamp not in keep:
+            os.remove(os.path.join(MANIFEST_DIR, stamp + ".json"))
+    needed = set()
+    for stamp in keep:
+        manifest = read_manifest(stamp)
+        for blob_id in manifest["files"].values():
+            #walk the delta chain, every base a kept backup depends on has to stay
+            while blob_id is not None and blob_id not in needed:
+                needed.add(blob_id)
+                blob_id = _read_blob(blob_id).get("base")
+        for blob_id in manifest.get("binary", {}).values():
+            while blob_id is not None and blob_id not in needed:
+                needed.add(blob_id)
+                blob_id = _binary_base(_decompress(_blob_path(blob_id)))
+    for name in os.listdir(BLOB_DIR):
+        if name.split(".")[0] not in needed:
+            os.remove(os.path.join(BLOB_DIR, name))
+    return len(stamps) - len(keep)
+
+
+def find_backup(when):
+    """Newest backup taken at or before `when`, a timestamp or prefix like 20250101_12 or "latest"."""
+    stamps = list_backups()
+    if not stamps:
+        return None
+    if when == "latest":
+        return stamps[-1]
+    #pad a prefix out to the end of the period it names
+    when = when + "99991231_235959"[len(when):]
+    candidates = [s for s in stamps if s <= when]
+    return candidates[-1] if candidates else None
+
+
+def restore(stamp, dest):
+    """Write every file of backup `stamp` into dest in the current snapshot format."""
+    os.makedirs(dest, exist_ok=True)
+    manifest = read_manifest(stamp)
+    for name, blob_id in manifest["files"].items():
+        if blob_id is None:
+            continue
+        content, _ = read_content(blob_id)
+        write_atomic(os.path.join(dest, name), snapshots.dumps(content))
+        print(f"Restored {name}")
+    binary = manifest.get("binary", {})
+    for path, blob_id in binary.items():
+        content, _ = read_binary(blob_id)
+        target = os.path.join(dest, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        write_atomic(target, content)
+    if binary:
+        print(f"Restored {len(binary)} history files")
+    log_path = os.path.join(dest, DATA_FILE + ".log")
+    if os.path.exists(log_path):
+        #the change log would be replayed on top of the restored data, it belongs to the old state
+        os.remove(log_path)
+        print(f"Removed {log_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "list":
+        for stamp in list_backups():
+            manifest = read_manifest(stamp)
+            names = [name for name, blob_id in manifest["files"].items() if blob_id]
+            names += sorted({path.split(os.sep)[0] + "/" for path in manifest.get("binary", {})})
+            print(stamp, " ".join(names))
+    elif len(sys.argv) == 4 and sys.argv[1] == "restore":
+        stamp = find_backup(sys.argv[2])
+        if stamp is None:
+            print(f"No backup at or before {sys.argv[2]}.")
+            sys.exit(1)
+        print(f"Restoring backup {stamp} into {sys.argv[3]}, make sure the bot is stopped.")
+        restore(stamp, sys.argv[3])
+        if STORAGE_BACKEND == "sqlite":
+            print(f"To load it into sqlite: move {SQLITE_FILE} away, then python storage.py {DATA_FILE} {SQLITE_FILE}")
+    else:
+        print("usage: python backups.py list")
+        print("       python backups.py restore <timestamp|latest> <directory>")
+        sys.exit(1)
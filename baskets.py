@@ -0,0 +1,111 @@
+#index funds: basket symbols priced from other symbols instead of moving on their own. admins
+#define them in BASKETS_FILE (baskets.json):
+#
+#    {"BEANIDX": {"INK": 50, "ACME": 30, "BEANEDCOIN": 20}}
+#
+#weights are shares of the basket's value (any scale, they're normalized) and are rebalanced on
+#every market update, so a basket moves by the weighted average of its parts' moves. after the
+#market tick every basket is repriced at once as old price * (weights matrix @ new/old price ratios).
+#a basket is an ordinary symbol in stocks.json otherwise: it's bought and sold through /stockbuy
+#and /stocksell, has a price history and is valued by networth.py like any stock. a new basket
+#starts at START_PRICE, one taken out of the file (or whose definition stops validating, say a part
+#was removed) trades on as an ordinary stock.
+import json
+import numpy as np
+from globals import BASKETS_FILE
+import filecache
+import market
+
+START_PRICE = 100.0
+
+#(file content, symbols, baskets, weights matrix) of the last load, rebuilt when either changes
+_last = (None, None, {}, np.zeros((0, 0)))
+
+
+def _validate(raw, symbols):
+    baskets = {}
+    for name, parts in raw.items():
+        name = name.upper()
+        if "COIN" in name:
+            print(f"[Baskets] {name}: basket names can't contain COIN, skipped.")
+            continue
+        if not isinstance(parts, dict) or not parts:
+            print(f"[Baskets] {name}: needs a {{symbol: weight}} object, skipped.")
+            continue
+        weights = {}
+        for symbol, weight in parts.items():
+            symbol = symbol.upper()
+            if symbol not in symbols or symbol in raw:
+                print(f"[Baskets] {name}: {symbol} isn't a stock or coin, skipped.")
+                weights = None
+                break
+            if not isinstance(weight, (int, float)) or weight <= 0:
+                print(f"[Baskets] {name}: weight of {symbol} must be a positive number, skipped.")
+                weights = None
+                break
+            weights[symbol] = weights.get(symbol, 0) + float(weight)
+        if weights:
+            total = sum(weights.values())
+            baskets[name] = {symbol: weight / total for symbol, weight in weights.items()}
+    return baskets
+
+
+def load(symbols):
+    """({basket: {symbol: weight}}, weights matrix) for the baskets in BASKETS_FILE.
+
+    symbols are the symbols baskets can be made of, in the order of the matrix's columns; a basket
+    naming anything else is left out. Weights sum to 1.
+    """
+    global _last
+    try:
+        raw = filecache.load(BASKETS_FILE, parse=json.loads)
+    except FileNotFoundError:
+        return {}, np.zeros((0, len(symbols)))
+    except ValueError as e:
+        print(f"[Baskets] {BASKETS_FILE} is unreadable: {e}")
+        return {}, np.zeros((0, len(symbols)))
+    symbols = list(symbols)
+    if raw is _last[0] and symbols == _last[1]:
+        return _last[2], _last[3]
+    baskets = _validate({name.upper(): parts for name, parts in raw.items()}, set(symbols))
+    columns = {symbol: i for i, symbol in enumerate(symbols)}
+    matrix = np.zeros((len(baskets), len(symbols)))
+    for row, parts in enumerate(baskets.values()):
+        for symbol, weight in parts.items():
+            matrix[row, columns[symbol]] = weight
+    _last = (raw, symbols, baskets, matrix)
+    return baskets, matrix
+
+
+def names():
+    """The basket symbols defined right now, whatever they're made of."""
+    try:
+        raw = filecache.load(BASKETS_FILE, parse=json.loads)
+    except (FileNotFoundError, ValueError):
+        return set()
+    return {name.upper() for name in raw}
+
+
+def definitions(prices):
+    """{basket: {symbol: weight}} of the baskets that can be priced from prices ({symbol: price})."""
+    basket_names = names()
+    return load([symbol for symbol in prices if symbol not in basket_names])[0]
+
+
+def reprice(baskets, matrix, old_prices, new_prices, current):
+    """{basket: new price} after the symbols moved from old_prices to new_prices (arrays in matrix column order).
+
+    current is {symbol: price} holding the baskets' prices before the update, if they have one.
+    """
+    if not baskets:
+        return {}
+    old_prices = np.asarray(old_prices, dtype=np.float64)
+    new_prices = np.asarray(new_prices, dtype=np.float64)
+    #a part priced at 0 can't say how far it moved, it counts as flat
+    ratio = np.divide(new_prices, old_prices, out=np.ones_like(new_prices), where=old_prices > 0)
+    growth = matrix @ ratio
+    repriced = {}
+    for basket, factor in zip(baskets, growth.tolist()):
+        price = current.get(basket)
+        repriced[basket] = START_PRICE if not price else max(round(price * factor, 2), market.STOCK_MIN)
+    return repriced
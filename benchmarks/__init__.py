@@ -0,0 +1,27 @@
+#performance benchmarks for the bot. run from the repo root, e.g.
+#    python -m benchmarks.transactions
+#every benchmark works in a throwaway directory so the live json files are never touched.
+import json
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def enter_sandbox(config_overrides=None):
+    """chdir into a fresh temp dir with a dummy config.json. Call before importing bot modules."""
+    sandbox = tempfile.mkdtemp(prefix="beanbench_")
+    config = {"token": "benchmark", "guild_id": "1", "target_member_id": "1"}
+    config.update(config_overrides or {})
+    with open(os.path.join(sandbox, "config.json"), "w") as f:
+        json.dump(config, f)
+    os.chdir(sandbox)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return sandbox
+
+
+def report(name, results):
+    """Print results as one json document so runs can be diffed over time."""
+    print(json.dumps({"benchmark": name, "results": results}, indent=4))
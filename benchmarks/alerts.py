@@ -0,0 +1,103 @@
+#price alert checks: the per-(symbol, direction) sorted lists in alerts.py vs scanning every alert
+#on every tick, with tens of thousands of alerts, on a tick where nothing moved past any alert and
+#on ticks where a few hundred fire. --check also replays random ticks, adds and removes through
+#both and fails if they ever fire different alerts.
+#
+#    python -m benchmarks.alerts --alerts 50000 --symbols 200 --check
+import argparse
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+
+def scan(active, prices):
+    """The naive check: look at every alert."""
+    fired = []
+    for alert_id, alert in list(active.items()):
+        price = prices.get(alert["symbol"])
+        if price is None:
+            continue
+        if (price >= alert["price"]) if alert["direction"] == "above" else (price <= alert["price"]):
+            del active[alert_id]
+            fired.append((alert, price))
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alerts", type=int, default=50_000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import fileio
+    import alerts
+
+    rng = random.Random(0)
+    prices = {f"S{i:04d}": round(rng.uniform(5, 1000), 2) for i in range(args.symbols)}
+    symbols = list(prices)
+    #alerts are saved whenever they change, keep the writes out of the timings
+    alerts.save = lambda: None
+
+    def add_random():
+        symbol = rng.choice(symbols)
+        level = round(prices[symbol] * rng.uniform(0.5, 1.5), 2)
+        if level != prices[symbol]:
+            alerts.add(str(rng.randrange(1000)), symbol, level, prices[symbol])
+
+    for _ in range(args.alerts):
+        add_random()
+    #a tick where every price moved but nothing fires, the bisects alone
+    nudged = {s: p * (1 + 1e-9) for s, p in prices.items()}
+    start = time.perf_counter()
+    for _ in range(100):
+        alerts.check(nudged, prices)
+    quiet_ms = (time.perf_counter() - start) * 10
+    naive = {alert_id: dict(alert) for alert_id, alert in alerts.load().items()}
+
+    sorted_ms, scan_ms, fired_total, mismatches = [], [], 0, 0
+    for _ in range(args.ticks):
+        if args.check:
+            for alert_id in rng.sample(sorted(naive), min(len(naive), 20)):
+                alerts.remove(alert_id)
+                del naive[alert_id]
+            #new alerts are set against the last prices, like /alert add does
+            for _ in range(20):
+                add_random()
+            for alert_id, alert in alerts.load().items():
+                naive.setdefault(alert_id, dict(alert))
+        previous, prices = prices, {s: round(p * (1 + rng.gauss(0, 0.02)), 2) for s, p in prices.items()}
+        start = time.perf_counter()
+        fired = alerts.check(prices, previous)
+        sorted_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = scan(naive, prices)
+        scan_ms.append((time.perf_counter() - start) * 1000)
+        fired_total += len(fired)
+        if sorted(alert["id"] for alert, _ in fired) != sorted(alert["id"] for alert, _ in expected):
+            mismatches += 1
+        alerts.notify(fired)
+        alerts.outbox(alerts.queued())
+
+    results = {
+        "alerts": args.alerts,
+        "symbols": args.symbols,
+        "ticks": args.ticks,
+        "fired_per_tick": round(fired_total / args.ticks, 1),
+        "sorted_ms_quiet_tick": round(quiet_ms, 3),
+        "sorted_ms_per_tick": round(sum(sorted_ms) / len(sorted_ms), 3),
+        "scan_ms_per_tick": round(sum(scan_ms) / len(scan_ms), 3),
+    }
+    if args.check:
+        results["mismatched_ticks"] = mismatches
+    fileio.shutdown()
+    report("alerts", results)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#basket repricing after a market tick: the weights matrix x price ratio product in baskets.py vs
+#walking every basket's parts in python. --check fails if the two ever price a basket differently.
+#
+#    python -m benchmarks.baskets --baskets 100 --symbols 500 --parts 50 --check
+import argparse
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+
+def loop_reprice(definitions, old, new, current):
+    repriced = {}
+    for basket, parts in definitions.items():
+        factor = sum(weight * (new[symbol] / old[symbol] if old[symbol] > 0 else 1.0) for symbol, weight in parts.items())
+        repriced[basket] = max(round(current[basket] * factor, 2), 0.01)
+    return repriced
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baskets", type=int, default=100)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--parts", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import json
+    import numpy as np
+    import baskets
+    import fileio
+
+    rng = random.Random(0)
+    symbols = [f"S{i:04d}" for i in range(args.symbols)]
+    prices = {symbol: round(rng.uniform(5, 1000), 2) for symbol in symbols}
+    config = {f"IDX{i:03d}": {symbol: rng.randint(1, 100) for symbol in rng.sample(symbols, args.parts)}
+              for i in range(args.baskets)}
+    with open(baskets.BASKETS_FILE, "w") as f:
+        json.dump(config, f)
+    current = {basket: baskets.START_PRICE for basket in config}
+
+    matrix_ms, loop_ms, mismatches = [], [], 0
+    for _ in range(args.ticks):
+        new = {symbol: round(price * (1 + rng.gauss(0, 0.05)), 2) for symbol, price in prices.items()}
+        old_prices = np.fromiter(prices.values(), dtype=np.float64, count=len(symbols))
+        new_prices = np.fromiter(new.values(), dtype=np.float64, count=len(symbols))
+        start = time.perf_counter()
+        definitions, weights = baskets.load(symbols)
+        repriced = baskets.reprice(definitions, weights, old_prices, new_prices, current)
+        matrix_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = loop_reprice(definitions, prices, new, current)
+        loop_ms.append((time.perf_counter() - start) * 1000)
+        if any(abs(repriced[basket] - expected[basket]) > 0.011 for basket in expected):
+            mismatches += 1
+        prices, current = new, repriced
+
+    results = {
+        "baskets": args.baskets,
+        "symbols": args.symbols,
+        "parts_per_basket": args.parts,
+        "matrix_ms_per_tick": round(sum(matrix_ms) / len(matrix_ms), 3),
+        "loop_ms_per_tick": round(sum(loop_ms) / len(loop_ms), 3),
+    }
+    if args.check:
+        results["mismatched_ticks"] = mismatches
+    fileio.shutdown()
+    report("baskets", results)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
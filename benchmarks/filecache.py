@@ -0,0 +1,64 @@
+#reading stocks.json and the industry config the old way (read and parse on every call) vs
+#through filecache, plus a burst of price reads with a save in between like a market tick.
+#
+#    python -m benchmarks.filecache --tickers 500 --reads 10000
+import argparse
+import copy
+import json
+import random
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import FACILITIES, RAW_RESOURCES
+
+
+def per_call(reads, fn):
+    start = time.perf_counter()
+    for _ in range(reads):
+        fn()
+    return round((time.perf_counter() - start) / reads * 1_000_000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=10_000)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import fileio
+    import filecache
+    import snapshots
+
+    rng = random.Random(0)
+    prices = {f"S{i:04d}": round(rng.uniform(5, 1000), 2) for i in range(args.tickers)}
+    snapshots.save("stocks.json", prices).result()
+    store = {"raw_resources": {r: {"buy_price": 50, "sell_price": 25} for r in RAW_RESOURCES}}
+    fileio.write_atomic("industries.json", json.dumps({"facilities": FACILITIES}, indent=4))
+    fileio.write_atomic("industriesstore.json", json.dumps(store, indent=4))
+
+    results = {"tickers": args.tickers, "reads": args.reads, "microseconds_per_read": {}}
+    timings = results["microseconds_per_read"]
+    timings["stocks_uncached"] = per_call(args.reads, lambda: snapshots.load("stocks.json"))
+    timings["stocks_cached"] = per_call(args.reads, lambda: filecache.load("stocks.json", copy=copy.copy))
+    for name in ("industries.json", "industriesstore.json"):
+        timings[name + "_uncached"] = per_call(args.reads, lambda: json.loads(fileio.read(name)))
+        timings[name + "_cached"] = per_call(args.reads, lambda: filecache.load(name, parse=json.loads))
+
+    #a tick every 100 reads: load, move prices, save, then keep reading
+    def tick_reads():
+        for i in range(args.reads):
+            data = filecache.load("stocks.json", copy=copy.copy)
+            if i % 100 == 0:
+                for symbol in data:
+                    data[symbol] = round(data[symbol] * (1 + rng.gauss(0, 0.01)), 2)
+                filecache.save("stocks.json", data, copy=copy.copy)
+    start = time.perf_counter()
+    tick_reads()
+    timings["stocks_with_saves"] = round((time.perf_counter() - start) / args.reads * 1_000_000, 2)
+    fileio.shutdown()
+    results["cache"] = filecache.stats()
+    report("filecache", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#event loop lag while the whole economy and a large stock history are saved.
+#"blocking" is the old json.dump(..., indent=4) straight from a command or loop,
+#"fileio" is a compaction plus a snapshots.save of the history through the i/o pool (stock history
+#itself now lives in pricehistory.py, the big snapshot stands in for any large state file).
+#
+#    python -m benchmarks.io --users 50000 --symbols 40 --ticks 5000
+import argparse
+import asyncio
+import json
+import random
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import synthetic_user
+
+
+async def measure(save, interval):
+    from metrics import LoopLagMonitor
+    monitor = LoopLagMonitor(interval=interval, window=100_000, warn=0)
+    monitor.start()
+    await asyncio.sleep(interval * 5)
+    start = time.perf_counter()
+    await save()
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(interval * 5)
+    monitor.stop()
+    stats = monitor.stats()
+    stats["save_seconds"] = round(elapsed, 3)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--symbols", type=int, default=40)
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import economy
+    import fileio
+    import snapshots
+    from globals import DATA_FILE, STOCK_HISTORY_FILE
+
+    rng = random.Random(0)
+    data = economy.load()
+    for i in range(args.users):
+        data[str(100000000000000000 + i)] = synthetic_user(rng)
+    history = {
+        f"SYM{s}": [{"timestamp": "2025-01-01T00:00:00", "price": rng.random() * 500} for _ in range(args.ticks)]
+        for s in range(args.symbols)
+    }
+    interval = args.interval_ms / 1000
+
+    async def blocking_save():
+        with open(DATA_FILE, "w") as f:
+            json.dump(data.to_storage(), f, indent=4)
+        with open(STOCK_HISTORY_FILE, "w") as f:
+            json.dump(history, f, indent=4)
+
+    async def fileio_save():
+        economy.mark_dirty()
+        await economy.compact_async()
+        await asyncio.wrap_future(snapshots.save(STOCK_HISTORY_FILE, history))
+
+    async def run():
+        return {
+            "blocking": await measure(blocking_save, interval),
+            "fileio": await measure(fileio_save, interval),
+        }
+
+    results = asyncio.run(run())
+    fileio.shutdown()
+    results.update({"users": args.users, "history_points": args.symbols * args.ticks})
+    report("io", results)
+
+
+if __name__ == "__main__":
+    main()
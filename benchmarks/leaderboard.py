@@ -0,0 +1,60 @@
+#/leaderboard time/timealone/timeafk/prestige: the old full scan and sort vs the sorted indexes
+#in ranking.py, reading a page and the caller's rank right after a user's voice time changed.
+#net worth has its own benchmark, benchmarks.networth.
+#
+#    python -m benchmarks.leaderboard --users 100000
+import argparse
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import generate
+
+
+def timed(fn, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    generate(users=args.users, tickers=10, history_days=1, contracts=1)
+    import economy
+    import fileio
+    import ranking
+
+    data = economy.load()
+    user_id = list(data)[len(data) // 2]
+
+    def old():
+        board = [(uid, record.get("vc_time", 0)) for uid, record in data.items()]
+        board.sort(key=lambda x: x[1], reverse=True)
+        return board[:10]
+
+    def after_change():
+        data.user(user_id)["vc_time"] += 60
+        economy.save(data, user_id)
+        ranking.page("time", 1)
+        ranking.rank("time", user_id)
+
+    results = {"users": args.users, "ms": {}}
+    ms = results["ms"]
+    ms["old_full_sort"] = timed(old)
+    ms["index_build_all_categories"] = timed(lambda: ranking.page("time", 1), rounds=1)
+    ms["page_1"] = timed(lambda: ranking.page("time", 1))
+    ms["page_500"] = timed(lambda: ranking.page("time", 500))
+    ms["my_rank"] = timed(lambda: ranking.rank("time", user_id))
+    ms["page_and_rank_after_change"] = timed(after_change)
+    fileio.shutdown()
+    report("leaderboard", results)
+
+
+if __name__ == "__main__":
+    main()
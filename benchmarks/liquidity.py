@@ -0,0 +1,112 @@
+#market impact fills: the closed-form curve in liquidity.py vs walking the same curve in small lots,
+#the way a fill that iterates over shares would, for orders from a fraction of a symbol's budget
+#to several times it. --check fails if the two disagree by more than the lots' discretization
+#error, if splitting an order changes what it fills at, or if a round trip ever makes money.
+#
+#    python -m benchmarks.liquidity --fills 2000 --lots 10000 --check
+import argparse
+import math
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+
+def walk_buy(k, ask, amount, x, lots):
+    """Shares amount buys, paying the marginal price of each lot at its middle."""
+    #buying is bounded by what the amount could buy at the starting price
+    lot = amount / (ask * math.exp(x / k)) / lots
+    shares = 0.0
+    while amount > 0:
+        cost = ask * math.exp((x + shares + lot / 2) / k) * lot
+        if cost > amount:
+            shares += amount / (ask * math.exp((x + shares) / k))
+            break
+        amount -= cost
+        shares += lot
+    return shares
+
+
+def walk_sell(k, bid, shares, x, lots):
+    lot = shares / lots
+    proceeds = 0.0
+    for i in range(lots):
+        proceeds += bid * math.exp((x - (i + 0.5) * lot) / k) * lot
+    return proceeds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fills", type=int, default=2000)
+    parser.add_argument("--lots", type=int, default=10_000)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    enter_sandbox()
+    from globals import LIQUIDITY_BUDGET, SPREAD
+    import liquidity
+
+    rng = random.Random(0)
+    #coins at fractions of a cent to stocks in the thousands, where share counts differ by 1e11
+    prices = {f"S{i:03d}COIN" if i % 4 == 0 else f"S{i:03d}": round(10 ** rng.uniform(-5, 3), 8) for i in range(100)}
+    symbols = list(prices)
+    orders = []
+    for _ in range(args.fills):
+        symbol = rng.choice(symbols)
+        #this tick's flow so far, and an order of 0.1% to 5x the budget
+        x = rng.uniform(-1, 1) * liquidity.depth(symbol, prices[symbol])
+        orders.append((symbol, x, LIQUIDITY_BUDGET * 10 ** rng.uniform(-3, 0.7)))
+
+    #buy, then sell what was bought straight back
+    start = time.perf_counter()
+    closed = []
+    for symbol, x, amount in orders:
+        bought = liquidity.quote_buy(symbol, prices[symbol], amount, x)
+        closed.append((bought, liquidity.quote_sell(symbol, prices[symbol], bought, x + bought)))
+    closed_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    walked = []
+    for symbol, x, amount in orders:
+        price = prices[symbol]
+        k = liquidity.depth(symbol, price)
+        bought = walk_buy(k, price * (1 + SPREAD / 2), amount, x, args.lots)
+        walked.append((bought, walk_sell(k, price * (1 - SPREAD / 2), bought, x + bought, args.lots)))
+    walked_ms = (time.perf_counter() - start) * 1000
+
+    worst = max(max(abs(a - b) / b for a, b in zip(fast, slow)) for fast, slow in zip(closed, walked))
+    split_worst, profitable = 0.0, 0
+    if args.check:
+        for (bought, proceeds), (symbol, x, amount) in zip(closed, orders):
+            price = prices[symbol]
+            #the same order in ten pieces, each starting where the last left off
+            pieces, flow = 0.0, x
+            for _ in range(10):
+                shares = liquidity.quote_buy(symbol, price, amount / 10, flow)
+                pieces += shares
+                flow += shares
+            split_worst = max(split_worst, abs(pieces - bought) / bought)
+            cost = liquidity.quote_cost(symbol, price, bought, x)
+            split_worst = max(split_worst, abs(cost - amount) / amount)
+            if proceeds >= amount:
+                profitable += 1
+
+    results = {
+        "fills": args.fills,
+        "lots_per_walk": args.lots,
+        "closed_form_us_per_fill": round(closed_ms * 1000 / args.fills, 2),
+        "walked_us_per_fill": round(walked_ms * 1000 / args.fills, 2),
+        "max_relative_difference": float(f"{worst:.3g}"),
+    }
+    failed = worst > 1e-4
+    if args.check:
+        results["max_split_or_inverse_difference"] = float(f"{split_worst:.3g}")
+        results["profitable_round_trips"] = profitable
+        failed = failed or split_worst > 1e-9 or profitable
+    report("liquidity", results)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
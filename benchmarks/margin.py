@@ -0,0 +1,99 @@
+#margin liquidation checks: the per-symbol lists sorted by liquidation price in margin.py vs
+#revaluing every position on every tick, with interest accruing between ticks. --check also
+#replays random ticks, opens and closes through both and fails if they ever liquidate different
+#positions.
+#
+#    python -m benchmarks.margin --positions 100000 --symbols 200 --check
+import argparse
+import datetime
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+
+def scan(book, prices, borrow_index, maintenance):
+    """The naive check: value every position."""
+    liquidated = []
+    for position_id, position in list(book.items()):
+        price = prices.get(position["symbol"])
+        if price is None:
+            continue
+        value = position["shares"] * price
+        if value - position["debt"] * borrow_index < maintenance * value:
+            del book[position_id]
+            liquidated.append((position, price))
+    return liquidated
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import fileio
+    import margin
+    from globals import MARGIN_MAINTENANCE
+
+    rng = random.Random(0)
+    prices = {f"S{i:04d}": round(rng.uniform(5, 1000), 2) for i in range(args.symbols)}
+    symbols = list(prices)
+    #positions are saved whenever they change, keep the writes out of the timings
+    margin.save = lambda: None
+    now = datetime.datetime.now()
+    margin.accrue(now)
+
+    def open_random():
+        symbol = rng.choice(symbols)
+        margin.open_position(str(rng.randrange(1000)), symbol, prices[symbol], 100.0, rng.uniform(1.5, 3))
+
+    for _ in range(args.positions):
+        open_random()
+    naive = {position_id: dict(position) for position_id, position in margin.load().items()}
+
+    sorted_ms, scan_ms, liquidated_total, mismatches = [], [], 0, 0
+    for _ in range(args.ticks):
+        if args.check:
+            for position_id in rng.sample(sorted(naive), min(len(naive), 20)):
+                margin.close(position_id)
+                del naive[position_id]
+            for _ in range(20):
+                open_random()
+            for position_id, position in margin.load().items():
+                naive.setdefault(position_id, dict(position))
+        prices = {s: round(p * (1 + rng.gauss(0, 0.02)), 2) for s, p in prices.items()}
+        #a day of interest a tick, so it shows up
+        now += datetime.timedelta(days=1)
+        start = time.perf_counter()
+        margin.accrue(now)
+        liquidated = margin.check(prices)
+        sorted_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = scan(naive, prices, margin.borrow_index(), MARGIN_MAINTENANCE)
+        scan_ms.append((time.perf_counter() - start) * 1000)
+        liquidated_total += len(liquidated)
+        if sorted(p["id"] for p, _ in liquidated) != sorted(p["id"] for p, _ in expected):
+            mismatches += 1
+
+    results = {
+        "positions": args.positions,
+        "symbols": args.symbols,
+        "ticks": args.ticks,
+        "liquidated_per_tick": round(liquidated_total / args.ticks, 1),
+        "sorted_ms_per_tick": round(sum(sorted_ms) / len(sorted_ms), 3),
+        "scan_ms_per_tick": round(sum(scan_ms) / len(scan_ms), 3),
+    }
+    if args.check:
+        results["mismatched_ticks"] = mismatches
+    fileio.shutdown()
+    report("margin", results)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
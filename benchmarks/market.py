@@ -0,0 +1,176 @@
+#the vectorized market engine vs the per-symbol loop update_stock_prices used before it.
+#
+#    python -m benchmarks.market                 tick time at 10/1k/100k symbols
+#    python -m benchmarks.market --check         statistical equivalence of the two
+#
+#--check draws a big sample of moves from both for coins and stocks, in each market event and
+#from the minimum price (where the recovery boost kicks in), and runs a two-sample
+#kolmogorov-smirnov test on the price ratios. it exits non-zero if any pair differs.
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+#ks critical value coefficient for alpha = 0.001
+KS_C = 1.95
+
+
+def reference_tick(prices, event_type, rng=random):
+    """The per-symbol loop update_stock_prices ran before market.py, without the history and saves."""
+    new = {}
+    for stock, price in prices.items():
+        is_coin = "COIN" in stock.upper()
+        cycle_roll = rng.random()
+        if cycle_roll < 0.02:
+            cycle_effect = "bubble"
+        elif cycle_roll < 0.04:
+            cycle_effect = "crash"
+        elif cycle_roll < 0.06:
+            cycle_effect = "recovery"
+        else:
+            cycle_effect = "normal"
+
+        if is_coin:
+            if event_type == "rally":
+                if rng.random() < 0.70:
+                    new_price = price * (1 + rng.uniform(0.20, 1.20))
+                else:
+                    new_price = price * (1 + rng.uniform(-0.30, 0.50))
+            elif event_type == "crash":
+                if rng.random() < 0.70:
+                    new_price = price * (1 - rng.uniform(0.15, 0.70))
+                else:
+                    new_price = price * (1 + rng.uniform(-0.40, 0.30))
+            elif cycle_effect == "bubble":
+                new_price = price * (1 + rng.uniform(0.30, 2.00))
+            elif cycle_effect == "crash":
+                new_price = price * (1 - rng.uniform(0.40, 0.85))
+            elif cycle_effect == "recovery":
+                new_price = price * (1 + rng.uniform(0.10, 0.60))
+            else:
+                new_price = price * (1 + rng.uniform(-0.70, 1.50))
+            new_price = max(round(new_price, 8), 0.00000001)
+        else:
+            if event_type == "rally":
+                if rng.random() < 0.70:
+                    new_price = price * (1 + rng.uniform(0.10, 0.35))
+                else:
+                    new_price = price * (1 + rng.uniform(-0.05, 0.15))
+            elif event_type == "crash":
+                if rng.random() < 0.70:
+                    new_price = price * (1 - rng.uniform(0.10, 0.35))
+                else:
+                    new_price = price * (1 + rng.uniform(-0.05, 0.10))
+            elif cycle_effect == "bubble":
+                new_price = price * (1 + rng.uniform(0.20, 0.80))
+            elif cycle_effect == "crash":
+                new_price = price * (1 - rng.uniform(0.25, 0.60))
+            elif cycle_effect == "recovery":
+                new_price = price * (1 + rng.uniform(0.08, 0.40))
+            elif rng.random() < 0.01:
+                jump_factor = rng.uniform(0.40, 1.20)
+                if rng.random() < 0.5:
+                    new_price = price * (1 + jump_factor)
+                else:
+                    new_price = price * (1 - min(jump_factor, 0.90))
+            else:
+                new_price = price * (1 + rng.uniform(-0.12, 0.12))
+            new_price = max(round(new_price, 2), 0.01)
+
+        if rng.random() < 0.001:
+            if rng.random() < 0.5:
+                new_price = price * rng.uniform(5.0, 20.0)
+            else:
+                new_price = price * rng.uniform(0.05, 0.20)
+
+        if (is_coin and new_price <= 0.00000001) or (not is_coin and new_price <= 0.01):
+            new_price = new_price * (1 + rng.uniform(0.20, 1.50))
+            new_price = round(new_price, 8) if is_coin else round(new_price, 2)
+        new[stock] = new_price
+    return new
+
+
+def ks_statistic(a, b):
+    import numpy as np
+    a, b = np.sort(a), np.sort(b)
+    values = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, values, side="right") / len(a)
+    cdf_b = np.searchsorted(b, values, side="right") / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+def check(samples, seed):
+    import numpy as np
+    import market
+
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    critical = KS_C * ((2 * samples) / (samples * samples)) ** 0.5
+    results = {}
+    failed = False
+    for kind, symbol in (("coin", "XCOIN"), ("stock", "XYZ")):
+        for start_name, start in (("100", 100.0), ("minimum", 0.00000001 if kind == "coin" else 0.01)):
+            for event_type in (None, "rally", "crash"):
+                symbols = [f"{symbol}{i}" for i in range(samples)]
+                reference = reference_tick(dict.fromkeys(symbols, start), event_type, rng)
+                is_coin = market.coin_mask(symbols)
+                vectorized, _, _ = market.tick(np.full(samples, start), is_coin, event_type, np_rng)
+                d = ks_statistic(np.fromiter(reference.values(), dtype=np.float64) / start, vectorized / start)
+                name = f"{kind}/{start_name}/{event_type or 'none'}"
+                results[name] = {"ks_d": round(d, 5), "critical": round(critical, 5), "ok": d < critical}
+                failed |= d >= critical
+    return results, failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="compare distributions instead of timing")
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import numpy as np
+    import market
+
+    if args.check:
+        results, failed = check(args.samples, args.seed)
+        report("market_check", {"samples": args.samples, "pairs": results})
+        sys.exit(1 if failed else 0)
+
+    results = {}
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        #one in twenty symbols is a coin, like the live market
+        symbols = [f"S{i}COIN" if i % 20 == 0 else f"S{i}" for i in range(size)]
+        prices = {s: round(rng.uniform(5, 1000), 2) for s in symbols}
+        timings = {}
+        for name, fn in (
+            ("loop", lambda: reference_tick(prices, None, rng)),
+            ("tick", lambda: market.tick(np.fromiter(prices.values(), dtype=np.float64, count=size),
+                                         market.coin_mask(symbols))),
+            #what update_stock_prices does per tick: dict -> arrays, tick, back to python floats
+            ("vectorized", lambda: dict(zip(symbols, market.tick(
+                np.fromiter(prices.values(), dtype=np.float64, count=size), market.coin_mask(symbols))[0].tolist()))),
+        ):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name + "_ms"] = round(best * 1000, 3)
+        #speedup of the whole tick including the conversion back to the stocks.json dict
+        timings["speedup"] = round(timings["loop_ms"] / timings["vectorized_ms"], 1)
+        results[str(size)] = timings
+    report("market", results)
+
+
+if __name__ == "__main__":
+    main()
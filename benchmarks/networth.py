@@ -0,0 +1,76 @@
+#/leaderboard networth: the old full recompute and sort vs the index in networth.py, read right
+#after one trade and right after a market tick, plus the per-tick net worth sample for
+#networthhistory.py (taking it, and writing it in the i/o pool).
+#
+#    python -m benchmarks.networth --users 100000
+import argparse
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import generate
+
+
+def timed(fn, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--tickers", type=int, default=500)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    generate(users=args.users, tickers=args.tickers, history_days=1, contracts=1)
+    import economy
+    import fileio
+    import networth
+    import networthhistory
+    import stocks
+
+    data = economy.load()
+    prices = stocks.load_stocks()
+    user_id = next(iter(data))
+
+    def old():
+        board = []
+        for uid, record in data.items():
+            portfolio = record.get("portfolio", {})
+            worth = record.get("balance", 0) + sum(prices.get(s, 0) * n for s, n in portfolio.items())
+            board.append((uid, worth + record.get("graphics_cards", 0) * 10000))
+        board.sort(key=lambda x: x[1], reverse=True)
+        return board[:10]
+
+    def trade():
+        data.user(user_id)["balance"] += 1
+        economy.save(data, user_id)
+        networth.top(prices)
+
+    def tick():
+        for symbol in prices:
+            prices[symbol] = round(prices[symbol] * 1.001, 2)
+        networth.top(prices)
+
+    results = {"users": args.users, "ms": {}}
+    ms = results["ms"]
+    ms["old_full_sort"] = timed(old)
+    ms["index_build"] = timed(lambda: networth.top(prices), rounds=1)
+    ms["index_read"] = timed(lambda: networth.top(prices))
+    ms["index_after_trade"] = timed(trade)
+    ms["index_after_tick"] = timed(tick)
+    ms["history_sample"] = timed(lambda: networth.samples(prices))
+    ids, samples = networth.samples(prices)
+    start = time.perf_counter()
+    networthhistory.append(ids, samples)
+    fileio.shutdown()
+    ms["history_first_write"] = round((time.perf_counter() - start) * 1000, 3)
+    report("networth", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#resting order matching: the per-(symbol, kind) heaps in orders.py vs scanning every open order
+#on every tick, with a large book and a few orders triggering per tick. --check also replays
+#random ticks and cancels through both and fails if they ever fill different orders.
+#
+#    python -m benchmarks.orders --orders 100000 --symbols 200 --check
+import argparse
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+
+def scan(book, prices):
+    """The naive matcher: look at every open order."""
+    fills = []
+    for order_id, order in list(book.items()):
+        price = prices.get(order["symbol"])
+        if price is None or price <= 0:
+            continue
+        if (price >= order["price"]) if order["kind"] == "sell" else (price <= order["price"]):
+            del book[order_id]
+            fills.append((order, price))
+    return fills
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import fileio
+    import orders
+
+    rng = random.Random(0)
+    prices = {f"S{i:04d}": round(rng.uniform(5, 1000), 2) for i in range(args.symbols)}
+    symbols = list(prices)
+    #the book is only saved when something fills, keep the writes out of the timings
+    orders.save = lambda: None
+    for _ in range(args.orders):
+        symbol = rng.choice(symbols)
+        kind = rng.choice(orders.KINDS)
+        away = rng.uniform(0.0, 0.5)
+        price = round(prices[symbol] * (1 + away if kind == "sell" else 1 - away), 2)
+        orders.place(str(rng.randrange(1000)), symbol, kind, price, amount=100.0, shares=1.0)
+    naive = {order_id: dict(order) for order_id, order in orders.load().items()}
+
+    heap_ms, scan_ms, filled, mismatches = [], [], 0, 0
+    for _ in range(args.ticks):
+        prices = {s: round(p * (1 + rng.gauss(0, 0.02)), 2) for s, p in prices.items()}
+        if args.check:
+            for order_id in rng.sample(sorted(naive), min(len(naive), 20)):
+                orders.cancel(order_id)
+                del naive[order_id]
+        start = time.perf_counter()
+        fills = orders.match(prices)
+        heap_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = scan(naive, prices)
+        scan_ms.append((time.perf_counter() - start) * 1000)
+        filled += len(fills)
+        if sorted(order["id"] for order, _ in fills) != sorted(order["id"] for order, _ in expected):
+            mismatches += 1
+
+    results = {
+        "orders": args.orders,
+        "symbols": args.symbols,
+        "ticks": args.ticks,
+        "filled_per_tick": round(filled / args.ticks, 1),
+        "heap_ms_per_tick": round(sum(heap_ms) / len(heap_ms), 3),
+        "scan_ms_per_tick": round(sum(scan_ms) / len(scan_ms), 3),
+    }
+    if args.check:
+        results["mismatched_ticks"] = mismatches
+    fileio.shutdown()
+    report("orders", results)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#price history: the old stock_history.json (reload + append + rewrite every tick, full parse for
+#/stocks <symbol>) vs the per-symbol files in pricehistory.py, as the history grows.
+#
+#    python -m benchmarks.pricehistory --symbols 200 --days 90
+import argparse
+import datetime
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import generate
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    summary = generate(users=10, tickers=args.symbols, history_days=args.days, contracts=1)
+    import fileio
+    import pricehistory
+    import snapshots
+    from globals import STOCK_HISTORY_FILE
+
+    history = snapshots.load(STOCK_HISTORY_FILE)
+    symbol = next(iter(history))
+    prices = {s: points[-1]["price"] for s, points in history.items()}
+    now = datetime.datetime.now()
+
+    def json_tick():
+        old = snapshots.load(STOCK_HISTORY_FILE)
+        for s, price in prices.items():
+            old[s].append({"timestamp": now.isoformat(), "price": price})
+        fileio.write_atomic(STOCK_HISTORY_FILE, snapshots.dumps(old))
+
+    results = {"symbols": args.symbols, "points": summary["history_points"], "ms": {}}
+    ms = results["ms"]
+    ms["json_tick"] = timed(json_tick)
+    ms["json_last_10"] = timed(lambda: snapshots.load(STOCK_HISTORY_FILE)[symbol][-10:])
+    ms["migrate"] = timed(pricehistory.symbols)
+    #append returns at once, the worker then does the equivalent of _write_tick
+    ms["store_tick_queue"] = timed(lambda: pricehistory.append(prices, now))
+    ms["store_tick_write"] = timed(lambda: pricehistory._write_tick(int(now.timestamp()) + 1, prices, {}))
+    ms["store_last_10"] = timed(lambda: pricehistory.tail(symbol, 10))
+    ms["store_last_day"] = timed(lambda: pricehistory.between(symbol, now - datetime.timedelta(days=1), now))
+    fileio.shutdown()
+    report("pricehistory", results)
+
+
+if __name__ == "__main__":
+    main()
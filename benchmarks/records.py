@@ -0,0 +1,57 @@
+#memory held by the in-memory economy, plain dicts vs records.UserRecord.
+#
+#    python -m benchmarks.records --users 50000
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import synthetic_user
+
+
+def measure(build):
+    #timed without tracemalloc, it slows allocation down a lot
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    table = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return table, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50_000)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    from records import UserTable
+
+    rng = random.Random(0)
+    stored = {str(i): synthetic_user(rng) for i in range(args.users)}
+
+    #every field is a fresh object so both sides pay for the same values
+    plain, plain_bytes, plain_seconds = measure(lambda: {uid: dict(r) for uid, r in stored.items()})
+    del plain
+    table, record_bytes, record_seconds = measure(lambda: UserTable.from_storage(stored))
+    start = time.perf_counter()
+    table.to_storage()
+    encode_seconds = time.perf_counter() - start
+
+    report("records", {
+        "users": args.users,
+        "dict_bytes_per_user": round(plain_bytes / args.users),
+        "record_bytes_per_user": round(record_bytes / args.users),
+        "dict_build_seconds": round(plain_seconds, 4),
+        "record_decode_seconds": round(record_seconds, 4),
+        "record_encode_seconds": round(encode_seconds, 4),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#short positions per market tick: the per-symbol fee index and buy-in lists in shorts.py vs taking
+#the fee from every position's collateral and checking every position, one by one. --check also
+#fails if the two ever buy in different shorts.
+#
+#    python -m benchmarks.shorts --positions 100000 --symbols 200 --check
+import argparse
+import datetime
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+
+
+def naive_tick(book, prices, days, fee, maintenance):
+    """Charge and check every short one at a time."""
+    bought_in = []
+    for position_id, position in list(book.items()):
+        price = prices[position["symbol"]]
+        position["collateral"] -= fee * days * price * position["shares"]
+        if position["collateral"] < maintenance * position["shares"] * price:
+            del book[position_id]
+            bought_in.append(position)
+    return bought_in
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import fileio
+    import shorts
+    from globals import SHORT_FEE_DAILY, SHORT_MAINTENANCE
+
+    rng = random.Random(0)
+    prices = {f"S{i:04d}": round(rng.uniform(5, 1000), 2) for i in range(args.symbols)}
+    symbols = list(prices)
+    #shorts are saved whenever they change, keep the writes out of the timings
+    shorts.save = lambda: None
+    now = datetime.datetime.now()
+    shorts.charge(prices, now)
+    for i in range(args.positions):
+        symbol = rng.choice(symbols)
+        shares = rng.uniform(1, 100)
+        #some put up more than the minimum so they last longer
+        deposit = shorts.required(shares, prices[symbol]) * rng.uniform(1, 3)
+        shorts.open_short(str(i), symbol, shares, shares * prices[symbol], deposit)
+    naive = {position_id: dict(position) for position_id, position in shorts.load().items()}
+
+    fast_ms, naive_ms, bought_total, mismatches = [], [], 0, 0
+    for _ in range(args.ticks):
+        prices = {s: round(p * (1 + rng.gauss(0, 0.02)), 2) for s, p in prices.items()}
+        now += datetime.timedelta(days=1)
+        start = time.perf_counter()
+        shorts.charge(prices, now)
+        bought_in = shorts.check(prices)
+        fast_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        expected = naive_tick(naive, prices, 1.0, SHORT_FEE_DAILY, SHORT_MAINTENANCE)
+        naive_ms.append((time.perf_counter() - start) * 1000)
+        bought_total += len(bought_in)
+        if args.check and sorted(p["id"] for p, _ in bought_in) != sorted(p["id"] for p in expected):
+            mismatches += 1
+
+    results = {
+        "positions": args.positions,
+        "symbols": args.symbols,
+        "ticks": args.ticks,
+        "bought_in_per_tick": round(bought_total / args.ticks, 1),
+        "fee_index_ms_per_tick": round(sum(fast_ms) / len(fast_ms), 3),
+        "per_position_ms_per_tick": round(sum(naive_ms) / len(naive_ms), 3),
+    }
+    if args.check:
+        results["mismatched_ticks"] = mismatches
+    fileio.shutdown()
+    report("shorts", results)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#encode/decode time and size of the economy snapshot in each snapshot_format.
+#"json" is the old indent=4 format every save used to write.
+#
+#    python -m benchmarks.snapshots --users 50000
+import argparse
+import random
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import synthetic_user
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import snapshots
+
+    rng = random.Random(0)
+    data = {str(100000000000000000 + i): synthetic_user(rng) for i in range(args.users)}
+
+    formats = ["json", "orjson"]
+    if snapshots.msgpack is not None:
+        formats.append("msgpack")
+    results = {"users": args.users, "orjson_installed": snapshots.orjson is not None}
+    for fmt in formats:
+        encode_seconds, raw = best_of(args.repeat, lambda: snapshots.dumps(data, fmt))
+        decode_seconds, decoded = best_of(args.repeat, lambda: snapshots.loads(raw))
+        assert decoded == data
+        results[fmt] = {
+            "encode_seconds": round(encode_seconds, 4),
+            "decode_seconds": round(decode_seconds, 4),
+            "bytes": len(raw),
+        }
+    report("snapshots", results)
+
+
+if __name__ == "__main__":
+    main()
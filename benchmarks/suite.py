@@ -0,0 +1,349 @@
+#the whole bot against a synthetic economy: every slash command is driven through a fake
+#discord.Interaction with random users, and every background loop is timed. needs the bot's own
+#dependencies (discord.py, numpy, scipy, pytz), not a discord connection.
+#
+#    python -m benchmarks.suite --scale 10k --rounds 20 --output results.json
+#
+#results are one json document, commands and loops report mean/p50/p95/max in milliseconds plus
+#how many calls raised (synthetic arguments aren't always valid for every command).
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import random
+import sys
+import time
+from benchmarks import enter_sandbox, report
+from benchmarks.synthetic import SCALES, generate, user_id
+
+#same extensions bot.py loads, plus crime which has a setup() but isn't loaded there
+EXTENSIONS = ("general", "help", "stocks", "blackjack", "lottery", "roulette", "crypto", "options",
+              "industry", "prestige", "crime")
+#lotterydraw pays out the whole jackpot, it is timed as a loop (lottery_draw) instead
+SKIP_COMMANDS = {"lotterydraw"}
+
+#argument values by parameter name, callables get (rng, world)
+ARGUMENTS = {
+    "bet": "100",
+    "amount": "100",
+    "stock": lambda rng, world: rng.choice(world.stocks),
+    "coin": lambda rng, world: rng.choice(world.coins),
+    "crypto": lambda rng, world: rng.choice(world.coins),
+    "numbers": lambda rng, world: " ".join(str(n) for n in rng.sample(range(1, 61), 5)),
+    "choice": lambda rng, world: rng.choice(("red", "black", "odd", "even", "1st12", "17")),
+    "resource": lambda rng, world: rng.choice(("coal", "soy", "raw_iron", "power")),
+    "quantity": "1",
+    "facility": lambda rng, world: rng.choice(("coal_mine", "soy_farm", "coal_power", "sparse_drill")),
+    "industry": "coal_mine",
+    "strategy": lambda rng, world: rng.choice(("call", "put")),
+    "expiry": lambda rng, world: rng.randint(1, 4),
+    "strike": lambda rng, world: "100.0",
+    "cards": 1,
+    "hours": 2,
+    "drug": "marijuana",
+    "timeframe": lambda rng, world: rng.choice((None, "1h", "1d", "1w")),
+    "period": lambda rng, world: rng.choice(("1d", "1w", "1m", "1y", "all")),
+    "style": lambda rng, world: rng.choice(("line", "candle")),
+    "kind": lambda rng, world: rng.choice(("buy", "sell", "stop")),
+    "price": lambda rng, world: rng.choice((1.0, 500.0, 100000.0)),
+    "cancel": lambda rng, world: rng.choice((None, None, "all", "1")),
+    "number": lambda rng, world: rng.choice(("1", "all")),
+    "leverage": lambda rng, world: rng.choice((None, None, 2.0, 3.0)),
+    "close": lambda rng, world: rng.choice((None, None, "all", "1")),
+    "legs": lambda rng, world: f"buy {rng.choice(world.stocks)} 100, sell {rng.choice(world.stocks)} 50%, buy {rng.choice(world.coins)} 10%",
+}
+
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+
+    async def send_message(self, *args, view=None, **kwargs):
+        self._done = True
+        if view is not None:
+            #nobody is going to press the buttons, let commands waiting on the view carry on
+            view.stop()
+
+    async def defer(self, *args, **kwargs):
+        self._done = True
+
+    async def edit_message(self, *args, view=None, **kwargs):
+        if view is not None:
+            view.stop()
+
+    def is_done(self):
+        return self._done
+
+
+class FakeWebhook:
+    async def send(self, *args, view=None, **kwargs):
+        if view is not None:
+            view.stop()
+
+
+class FakeChannel:
+    name = "bot-output"
+
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeRole:
+    def __init__(self, name):
+        self.name = name
+        self.id = random.getrandbits(48)
+        self.mention = f"<@&{self.id}>"
+
+
+class FakeMember:
+    def __init__(self, uid, guild):
+        self.id = int(uid)
+        self.name = self.display_name = self.global_name = f"user{uid}"
+        self.mention = f"<@{uid}>"
+        self.bot = False
+        self.roles = []
+        self.premium_since = None
+        self.guild = guild
+
+    async def timeout(self, *args, **kwargs):
+        pass
+
+    async def send(self, *args, **kwargs):
+        pass
+
+    async def add_roles(self, *roles, **kwargs):
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, **kwargs):
+        pass
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.roles = []
+
+    def get_member(self, uid):
+        return FakeMember(uid, self)
+
+    async def create_role(self, name="role", **kwargs):
+        role = FakeRole(name)
+        self.roles.append(role)
+        return role
+
+
+class FakeInteraction:
+    """Just enough of discord.Interaction for the cogs."""
+    def __init__(self, client, guild, uid):
+        self.client = client
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = FakeMember(uid, guild)
+        self.channel = FakeChannel()
+        self.response = FakeResponse()
+        self.followup = FakeWebhook()
+        self.created_at = time.time()
+
+
+class World:
+    def __init__(self, users, guild):
+        import stocks
+        prices = stocks.load_stocks()
+        self.users = users
+        self.guild = guild
+        self.stocks = [s for s in prices if "COIN" not in s]
+        self.coins = [s for s in prices if "COIN" in s]
+
+    def member(self, rng):
+        return FakeMember(user_id(rng.randrange(self.users)), self.guild)
+
+
+def summarize(samples, errors=None):
+    ordered = sorted(samples)
+    if not ordered:
+        return {"calls": 0, "errors": errors or {}}
+    result = {
+        "calls": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def build_arguments(command, rng, world):
+    from discord import AppCommandOptionType
+    kwargs = {}
+    for param in command.parameters:
+        if param.type in (AppCommandOptionType.user, AppCommandOptionType.mentionable):
+            kwargs[param.name] = world.member(rng)
+            continue
+        value = ARGUMENTS.get(param.name)
+        if callable(value):
+            value = value(rng, world)
+        if value is None:
+            if not param.required:
+                continue
+            value = 1
+        if param.type == AppCommandOptionType.integer:
+            value = int(float(value))
+        elif param.type == AppCommandOptionType.number:
+            value = float(value)
+        elif param.type == AppCommandOptionType.string:
+            value = str(value)
+        kwargs[param.name] = value
+    return kwargs
+
+
+async def invoke(command, interaction, kwargs):
+    if command.binding is not None:
+        await command.callback(command.binding, interaction, **kwargs)
+    else:
+        await command.callback(interaction, **kwargs)
+
+
+async def time_call(fn):
+    start = time.perf_counter()
+    result = fn()
+    if asyncio.iscoroutine(result):
+        await result
+    return time.perf_counter() - start
+
+
+async def run(args, scale):
+    import discord
+    from discord import app_commands
+    from discord.ext import commands, tasks
+    import economy
+    from globals import GUILD_ID
+    from metrics import LoopLagMonitor
+
+    lag = LoopLagMonitor(interval=0.01, window=1_000_000, warn=0)
+    lag.start()
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+    for extension in EXTENSIONS:
+        await bot.load_extension(extension)
+    #the cogs start their loops on load, the suite runs them by hand instead
+    for cog in bot.cogs.values():
+        for value in vars(cog).values():
+            if isinstance(value, tasks.Loop):
+                value.cancel()
+
+    command_list = [c for c in bot.tree.walk_commands(guild=discord.Object(id=GUILD_ID))
+                    if isinstance(c, app_commands.Command)]
+    command_list += [c for c in bot.tree.walk_commands() if isinstance(c, app_commands.Command)]
+    #commands defined at module level but never added to the tree (the drug market ones)
+    for extension in EXTENSIONS:
+        for value in vars(sys.modules[extension]).values():
+            if isinstance(value, app_commands.Command) and value not in command_list:
+                command_list.append(value)
+
+    guild = FakeGuild(GUILD_ID)
+    world = World(scale["users"], guild)
+    rng = random.Random(args.seed)
+    results = {"commands": {}, "loops": {}}
+
+    for command in sorted(command_list, key=lambda c: c.qualified_name):
+        if command.name in SKIP_COMMANDS or (args.only and command.name not in args.only):
+            continue
+        samples, errors = [], {}
+        for _ in range(args.rounds):
+            interaction = FakeInteraction(bot, guild, user_id(rng.randrange(scale["users"])))
+            kwargs = build_arguments(command, rng, world)
+            start = time.perf_counter()
+            try:
+                await invoke(command, interaction, kwargs)
+            except Exception as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+            samples.append(time.perf_counter() - start)
+            #most calls never actually wait on anything, give the loop (and the lag monitor) a turn
+            await asyncio.sleep(0)
+        results["commands"][command.qualified_name] = summarize(samples, errors)
+
+    import stocks
+    import lottery
+    stocks_cog = bot.get_cog("StocksCog")
+    loops = {
+        "update_stock_prices": lambda: stocks.update_stock_prices(None),
+        "market_update_task": stocks_cog.market_update_task,
+        "send_alerts": stocks_cog.send_alerts,
+        "update_options": bot.get_cog("OptionsCog").update_options,
+        "execute_mine": bot.get_cog("CryptoCog").execute_mine,
+        "hourly_production": bot.get_cog("IndustryGroup").hourly_production,
+        "process_contracts": bot.get_cog("IndustryGroup").process_contracts,
+        "lottery_draw": lottery.lottery_draw,
+        "economy_flush": lambda: (economy.mark_dirty(), economy.flush_async())[1],
+        "economy_compact": economy.compact_async,
+    }
+    for name, fn in loops.items():
+        if args.only and name not in args.only:
+            continue
+        samples, errors = [], {}
+        for _ in range(args.loop_rounds):
+            try:
+                samples.append(await time_call(fn))
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            await asyncio.sleep(0)
+        results["loops"][name] = summarize(samples, errors)
+
+    lag.stop()
+    results["event_loop_lag"] = lag.stats()
+    import filecache
+    import charts
+    results["file_cache"] = filecache.stats()
+    results["charts"] = charts.stats()
+    await bot.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    parser.add_argument("--users", type=int, help="override the scale's user count")
+    parser.add_argument("--tickers", type=int)
+    parser.add_argument("--history-days", type=int)
+    parser.add_argument("--rounds", type=int, default=20, help="calls per command")
+    parser.add_argument("--loop-rounds", type=int, default=3, help="runs per background loop")
+    parser.add_argument("--only", nargs="*", help="only these commands/loops")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show what the bot prints")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key in ("users", "tickers", "history_days"):
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    if importlib.util.find_spec("discord") is None:
+        print("The suite runs the real cogs and needs the bot's dependencies installed: no module named 'discord'")
+        sys.exit(1)
+
+    enter_sandbox()
+    start = time.perf_counter()
+    generated = generate(seed=args.seed, **scale)
+    generated["seconds"] = round(time.perf_counter() - start, 2)
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        results = asyncio.run(run(args, scale))
+    import fileio
+    import charts
+    fileio.shutdown()
+    charts.shutdown()
+    results = {"scale": args.scale, "generated": generated, **results}
+    report("suite", results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "suite", "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
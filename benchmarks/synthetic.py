@@ -0,0 +1,245 @@
+#synthetic state files for the benchmarks: data.json, stocks.json, stock_history.json,
+#options.json, contracts.json, lottery.json, orders.json, alerts.json, margin.json, shorts.json
+#plus baskets.json and the industry config files the cogs need.
+#everything is seeded so two runs at the same scale see the same economy.
+import datetime
+import random
+
+#named sizes for --scale
+SCALES = {
+    "1k": {"users": 1_000, "tickers": 50, "history_days": 30, "contracts": 200},
+    "10k": {"users": 10_000, "tickers": 200, "history_days": 90, "contracts": 2_000},
+    "100k": {"users": 100_000, "tickers": 500, "history_days": 180, "contracts": 20_000},
+}
+
+#one market tick every 20 minutes
+TICKS_PER_DAY = 72
+FIRST_USER_ID = 100000000000000000
+
+RAW_RESOURCES = ("coal", "raw_iron", "uranium", "soy", "oil", "power")
+FACILITIES = {
+    "coal_mine": {"category": "raw", "cost": 50_000, "resource": "coal", "base_prod": [5, 10],
+                  "powered_prod": [10, 20], "power_required": 2},
+    "soy_farm": {"category": "raw", "cost": 40_000, "resource": "soy", "base_prod": [8, 12]},
+    "iron_mine": {"category": "raw", "cost": 60_000, "resource": "raw_iron", "base_prod": [4, 8]},
+    "coal_power": {"category": "power", "cost": 80_000, "resource": "power", "consumption": {"coal": 5},
+                   "production": 20},
+    "steelmaker": {"category": "industry", "cost": 150_000, "consumption": {"raw_iron": 4, "power": 4},
+                   "production": {"steel": 2}},
+    "sparse_drill": {"category": "oil", "cost": 100_000,
+                     "outcomes": [{"chance": 0.5, "range": [0, 500]}, {"chance": 0.5, "range": [500, 5000]}]},
+}
+
+
+def user_id(i):
+    return str(FIRST_USER_ID + i)
+
+
+def synthetic_user(rng):
+    """A user with the fields most users have, stocks and inventory for some."""
+    record = {
+        "balance": rng.randint(0, 1_000_000),
+        "cash": rng.randint(0, 10_000),
+        "vc_time": rng.random() * 100_000,
+        "vc_timealone": rng.random() * 10_000,
+        "vc_afk": rng.random() * 10_000,
+        "last_daily": "2025-01-01T12:00:00",
+    }
+    #most users never touch stocks, mining or industry
+    if rng.random() < 0.3:
+        record["portfolio"] = {f"STOCK{i}": rng.random() * 50 for i in range(rng.randint(1, 4))}
+        record["total_spent"] = rng.randint(0, 100_000)
+    if rng.random() < 0.2:
+        record["inventory"] = {"coal": rng.randint(0, 50), "power": rng.randint(0, 50)}
+    return record
+
+
+def economy_user(rng, stocks, coins, expirations):
+    """A user touching every system: stocks, mining, industry and options for some."""
+    record = synthetic_user(rng)
+    record["prestige"] = rng.choice((0, 0, 0, 1, 2))
+    if "portfolio" in record:
+        record["portfolio"] = {s: rng.random() * 50 for s in rng.sample(stocks, min(len(stocks), rng.randint(1, 5)))}
+    if rng.random() < 0.1:
+        record["graphics_cards"] = rng.randint(1, 20)
+        record["mining"] = {rng.choice(coins): record["graphics_cards"]}
+        record.setdefault("inventory", {})["power"] = rng.randint(0, 500)
+    if rng.random() < 0.1:
+        record["facilities"] = {name: rng.randint(1, 5) for name in rng.sample(["coal_mine", "soy_farm", "iron_mine", "coal_power", "steelmaker"], 2)}
+        if rng.random() < 0.3:
+            record["facilities"]["sparse_drill"] = [{"capacity": rng.randint(100, 5000), "extracted": 0}]
+        inventory = record.setdefault("inventory", {})
+        for resource in RAW_RESOURCES:
+            inventory[resource] = rng.randint(0, 200)
+    if rng.random() < 0.05 and expirations:
+        record["options"] = []
+        for _ in range(rng.randint(1, 3)):
+            stock = rng.choice(stocks)
+            strategy = rng.choice(("call", "put"))
+            record["options"].append({
+                "stock": stock,
+                "strategy": strategy,
+                "expiration": rng.choice(expirations),
+                "strike_price": 100.0,
+                "quantity": rng.randint(1, 10),
+                f"{strategy}_price": round(rng.random() * 10, 2),
+            })
+    return record
+
+
+def generate(users, tickers, history_days, contracts, seed=0, now=None):
+    """Write every state file into the current directory. Returns a summary of what was made."""
+    import snapshots
+    from fileio import write_atomic
+    from globals import (DATA_FILE, STOCK_FILE, STOCK_HISTORY_FILE, OPTIONS_FILE, CONTRACTS_FILE,
+                         LOTTERY_FILE, ORDERS_FILE, ALERTS_FILE, MARGIN_FILE, SHORTS_FILE)
+    import json
+
+    rng = random.Random(seed)
+    now = now or datetime.datetime.now()
+    coin_count = max(1, tickers // 20)
+    stocks = [f"S{i:04d}" for i in range(tickers - coin_count)]
+    coins = [f"C{i:03d}COIN" for i in range(coin_count)]
+    prices = {symbol: round(rng.uniform(5, 1000), 2) for symbol in stocks + coins}
+
+    history = {}
+    ticks = history_days * TICKS_PER_DAY
+    start = now - datetime.timedelta(minutes=20 * ticks)
+    for symbol, price in prices.items():
+        points = []
+        current = price
+        for tick in range(ticks):
+            current = max(0.01, current * (1 + rng.gauss(0, 0.01)))
+            points.append({"timestamp": (start + datetime.timedelta(minutes=20 * tick)).isoformat(),
+                           "price": round(current, 2)})
+        history[symbol] = points
+
+    expirations = [
+        (now + datetime.timedelta(days=i)).replace(hour=20, minute=0, second=0, microsecond=0).strftime("%Y-%m-%d %H:%M:%S")
+        for i in range(1, 5)
+    ]
+    options = {}
+    for symbol in stocks:
+        chain = {}
+        for expiry in expirations:
+            chain[expiry] = {
+                strategy: {
+                    str(round(prices[symbol] * pct, 2)): {"price": round(rng.uniform(0.5, 50), 2), "delta": 0.5,
+                                                         "gamma": 0.01, "theta": -0.05}
+                    for pct in (0.90, 0.95, 1.00, 1.05, 1.10)
+                }
+                for strategy in ("call", "put")
+            }
+        options[symbol] = {"current_price": prices[symbol], "expiration": chain}
+
+    data = {user_id(i): economy_user(rng, stocks, coins, expirations) for i in range(users)}
+    contract_list = [{
+        "contract_id": str(100000 + i),
+        "offering_user": user_id(rng.randrange(users)),
+        "receiving_user": user_id(rng.randrange(users)),
+        "resource": rng.choice(RAW_RESOURCES),
+        "quantity_per_hour": rng.randint(1, 20),
+        "remaining_hours": rng.randint(1, 48),
+        "created_at": now.isoformat(),
+        "status": "active",
+    } for i in range(contracts)]
+    lottery = {"Jackpot": 100000, "Tickets": [
+        {"user_id": user_id(rng.randrange(users)), "numbers": sorted(rng.sample(range(1, 61), 5))}
+        for _ in range(max(1, users // 10))
+    ]}
+
+    #resting orders, one per ten users, priced up to 30% away from the market so a few fill every tick
+    order_list = []
+    for i in range(users // 10):
+        symbol = rng.choice(stocks)
+        kind = rng.choice(("buy", "sell", "stop"))
+        away = rng.uniform(0.0, 0.3)
+        order_list.append({
+            "id": i + 1,
+            "user_id": user_id(rng.randrange(users)),
+            "symbol": symbol,
+            "kind": kind,
+            "price": round(prices[symbol] * (1 + away if kind == "sell" else 1 - away), 2),
+            "amount": 100.0 if kind == "buy" else 0.0,
+            "shares": 0.0 if kind == "buy" else 1.0,
+            "placed": now.isoformat(),
+        })
+    orders = {"next_id": len(order_list) + 1, "orders": order_list}
+
+    #price alerts, one per ten users, up to 30% either side of the market
+    alert_list = []
+    for i in range(users // 10):
+        symbol = rng.choice(stocks)
+        up = rng.random() < 0.5
+        away = rng.uniform(0.01, 0.3)
+        alert_list.append({
+            "id": i + 1,
+            "user_id": user_id(rng.randrange(users)),
+            "symbol": symbol,
+            "direction": "above" if up else "below",
+            "price": round(prices[symbol] * (1 + away if up else 1 - away), 2),
+            "from": prices[symbol],
+            "created": now.isoformat(),
+        })
+    alerts = {"next_id": len(alert_list) + 1, "alerts": alert_list}
+
+    #margin positions, one per twenty users at 2-3x, a few close to liquidation
+    position_list = []
+    for i in range(users // 20):
+        symbol = rng.choice(stocks)
+        leverage = rng.uniform(2, 3)
+        equity = float(rng.randint(100, 10000))
+        bought_at = round(prices[symbol] * rng.uniform(0.95, 1.3), 2)
+        position_list.append({
+            "id": i + 1,
+            "user_id": user_id(rng.randrange(users)),
+            "symbol": symbol,
+            "shares": equity * leverage / bought_at,
+            "price": bought_at,
+            "equity": equity,
+            "borrowed": equity * (leverage - 1),
+            "debt": equity * (leverage - 1),
+            "opened": now.isoformat(),
+        })
+    margin = {"next_id": len(position_list) + 1, "borrow_index": 1.0, "accrued_at": now.isoformat(),
+              "positions": position_list}
+
+    #short positions, one per twenty users, with 1.5-3x their value as collateral
+    short_list = []
+    for i in range(users // 20):
+        symbol = rng.choice(stocks)
+        shares = float(rng.randint(1, 100))
+        short_list.append({
+            "id": i + 1,
+            "user_id": user_id(rng.randrange(users)),
+            "symbol": symbol,
+            "shares": shares,
+            "collateral": shares * prices[symbol] * rng.uniform(1.5, 3),
+            "fee_index": 0.0,
+            "opened": now.isoformat(),
+        })
+    short_book = {"next_id": len(short_list) + 1, "charged_at": now.isoformat(), "fee_index": {},
+                  "positions": short_list}
+
+    for path, content in ((DATA_FILE, data), (STOCK_FILE, prices), (STOCK_HISTORY_FILE, history),
+                          (OPTIONS_FILE, options), (CONTRACTS_FILE, contract_list), (LOTTERY_FILE, lottery),
+                          (ORDERS_FILE, orders), (ALERTS_FILE, alerts),
+                          (MARGIN_FILE, margin), (SHORTS_FILE, short_book)):
+        write_atomic(path, snapshots.dumps(content))
+    store = {"raw_resources": {r: {"buy_price": rng.randint(10, 100), "sell_price": rng.randint(5, 50)} for r in RAW_RESOURCES}}
+    write_atomic("industriesstore.json", json.dumps(store, indent=4))
+    write_atomic("industries.json", json.dumps({"facilities": FACILITIES}, indent=4))
+    #one index fund over a handful of stocks and a coin, priced on the first market update
+    write_atomic("baskets.json", json.dumps({"SYNIDX": {symbol: rng.randint(1, 10) for symbol in stocks[:5] + coins[:1]}}))
+    return {
+        "users": users,
+        "stocks": len(stocks),
+        "coins": len(coins),
+        "history_points": ticks * len(prices),
+        "contracts": contracts,
+        "lottery_tickets": len(lottery["Tickets"]),
+        "orders": len(order_list),
+        "alerts": len(alert_list),
+        "margin_positions": len(position_list),
+        "short_positions": len(short_list),
+    }
@@ -0,0 +1,82 @@
+#throughput of concurrent economy commands.
+#
+#"one file lock" models the old load -> mutate -> save cycle, where every command had to
+#hold the whole data.json while it waited on discord. "per-user transactions" is
+#economy.transaction(), where only the users involved are locked.
+#
+#    python -m benchmarks.transactions --commands 2000 --users 500 --latency-ms 2
+import argparse
+import asyncio
+import random
+import time
+from benchmarks import enter_sandbox, report
+
+
+async def run_commands(economy, lock_for, commands, latency):
+    async def command(payer, payee):
+        async with lock_for(payer, payee) as tx:
+            payer_record = tx[payer]
+            payee_record = tx[payee]
+            #stand-in for the discord round trip a command makes while holding its data
+            await asyncio.sleep(latency)
+            payer_record["cash"] = payer_record.get("cash", 0) - 1
+            payee_record["cash"] = payee_record.get("cash", 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(command(payer, payee) for payer, payee in commands))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    enter_sandbox()
+    import economy
+
+    data = economy.load()
+    for i in range(args.users):
+        data[str(i)] = {"balance": 0, "cash": 1000}
+    rng = random.Random(0)
+    commands = [tuple(rng.sample(range(args.users), 2)) for _ in range(args.commands)]
+    latency = args.latency_ms / 1000
+
+    global_lock = asyncio.Lock()
+
+    class FileLock:
+        """Everyone waits on the same lock, like rewriting one data.json."""
+        def __init__(self, *user_ids):
+            self.tx = economy.transaction(*user_ids)
+
+        async def __aenter__(self):
+            await global_lock.acquire()
+            return await self.tx.__aenter__()
+
+        async def __aexit__(self, *exc):
+            try:
+                return await self.tx.__aexit__(*exc)
+            finally:
+                global_lock.release()
+
+    async def run_all():
+        results = {}
+        for name, lock_for in (("one file lock", FileLock), ("per-user transactions", economy.transaction)):
+            elapsed = await run_commands(economy, lock_for, commands, latency)
+            results[name] = {
+                "seconds": round(elapsed, 4),
+                "commands_per_second": round(len(commands) / elapsed, 1),
+            }
+        total_cash = sum(record["cash"] for record in data.values())
+        results["cash_conserved"] = total_cash == 1000 * args.users
+        return results
+
+    results = asyncio.run(run_all())
+    results["config"] = vars(args)
+    report("transactions", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ from discord.ext import commands
 import random
 import datetime
 import asyncio
-from utils import load_data, save_data
+import economy
 from globals import GUILD_ID
 
 #constants for cards:
@@ -74,6 +74,8 @@ class BlackjackGame:
     def __init__(self, player: discord.Member, bet: float):
         self.player = player
         self.bet = bet
+        #Beaned Bucks taken from the player for this game, paid back with the winnings on a win or tie
+        self.held = 0.0
         self.deck = get_deck()
         self.player_hand = [self.deck.pop(), self.deck.pop()]
         self.dealer_hand = [self.deck.pop(), self.deck.pop()]
@@ -171,16 +173,25 @@ class BlackjackView(discord.ui.View):
             await interaction.response.send_message("You can only double down on your first move (with exactly 2 cards).", ephemeral=True)
             return
 
-        if not hasattr(self.game, 'remaining'):
-            await interaction.response.send_message("Funds information missing.", ephemeral=True)
+
+        user_id = str(self.game.player.id)
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            #the game may have ended while waiting for the lock
+            finished = self.game.finished
+            enough = user_record.get("balance", 0) >= self.game.bet
+            if not finished and enough:
+                user_record["balance"] = user_record.get("balance", 0) - self.game.bet
+                self.game.held += self.game.bet
+                self.game.bet *= 2
+        if finished:
+            await interaction.response.defer()
             return
-        if self.game.remaining < self.game.bet:
+        if not enough:
             await interaction.response.send_message("You don't have enough funds to double down.", ephemeral=True)
             return
 
-        self.game.remaining -= self.game.bet
-        self.game.bet *= 2
-        print(f"[Blackjack] Doubling down. New bet: {self.game.bet}. Remaining funds: {self.game.remaining}")
+        print(f"[Blackjack] Doubling down. New bet: {self.game.bet}. Remaining funds: {user_record['balance']}")
         self.game.player_hand.append(self.game.deck.pop())
         await self.end_game(interaction)
 
@@ -192,31 +203,34 @@ class BlackjackCog(commands.Cog):
     @app_commands.command(name="blackjack", description="Play a round of Blackjack using your Beaned Bucks.")
     @app_commands.describe(bet="The amount of Beaned Bucks you want to bet (can be non-integer)")
     async def blackjack(self, interaction: discord.Interaction, bet: str):
-        data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0})
-        balance = float(user_record.get("balance", 0))
-
-        if bet.lower() == "all":
-            bet_val = balance
-        else:
+        bet_val = None
+        if bet.lower() != "all":
             try:
                 bet_val = float(bet)
             except ValueError:
                 await interaction.response.send_message("Invalid bet amount.", ephemeral=True)
                 return
 
+        #the bet is taken up front so it can't be spent elsewhere while the game runs
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            balance = float(user_record.get("balance", 0))
+            if bet_val is None:
+                bet_val = balance
+            enough = bet_val <= balance
+            if bet_val > 0 and enough:
+                user_record["balance"] = user_record.get("balance", 0) - bet_val
+
         if bet_val <= 0:
             await interaction.response.send_message("Bet must be greater than 0.", ephemeral=True)
             return
-        if bet_val > balance:
+        if not enough:
             await interaction.response.send_message("You don't have enough Beaned Bucks to make that bet.", ephemeral=True)
             return
 
-        #create the game and set up starting funds.
         game = BlackjackGame(interaction.user, bet_val)
-        game.start_balance = balance
-        game.remaining = balance - bet_val
+        game.held = bet_val
 
         #check for immediate blackjack.
         if is_blackjack(game.player_hand):
@@ -229,12 +243,12 @@ class BlackjackCog(commands.Cog):
             outcome_text = f"Blackjack! You win {game.bet} Beaned Bucks!" if game.result == "win" else "Both you and the dealer got blackjack. It's a tie!"
             content += "\n\n" + outcome_text
             await interaction.response.send_message(content=content, ephemeral=False)
-            if game.result == "win":
-                user_record["balance"] = balance + game.bet
-            else:
-                user_record["balance"] = balance
-            data[user_id] = user_record
-            save_data(data)
+            async with economy.transaction(user_id) as tx:
+                user_record = tx[user_id]
+                if game.result == "win":
+                    user_record["balance"] = user_record.get("balance", 0) + game.held + game.bet
+                else:
+                    user_record["balance"] = user_record.get("balance", 0) + game.held
             try:
                 await interaction.followup.send(f"Your new balance is {user_record['balance']} Beaned Bucks.", ephemeral=False)
             except Exception as e:
@@ -246,16 +260,18 @@ class BlackjackCog(commands.Cog):
         await interaction.response.send_message(content=content, view=view, ephemeral=False)
         await view.wait()
 
-        if game.result == "win":
-            user_record["balance"] = balance + game.bet
-        elif game.result == "lose":
-            user_record["balance"] = balance - game.bet
-        elif game.result == "tie":
-            user_record["balance"] = balance
-        else:
-            print("Game result not set. No balance change.")
-        data[user_id] = user_record
-        save_data(data)
+        #the bet is already held, pay it back with the winnings on a win and on its own on a tie
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            if game.result == "win":
+                user_record["balance"] = user_record.get("balance", 0) + game.held + game.bet
+            elif game.result == "lose":
+                pass
+            elif game.result == "tie":
+                user_record["balance"] = user_record.get("balance", 0) + game.held
+            else:
+                print("Game result not set. Returning the bet.")
+                user_record["balance"] = user_record.get("balance", 0) + game.held
         try:
             await interaction.followup.send(f"Your new balance is {user_record['balance']} Beaned Bucks.", ephemeral=False)
         except Exception as e:
@@ -9,9 +9,16 @@ import asyncio
 from typing import Optional
 import datetime
 from zoneinfo import ZoneInfo
-from globals import TOKEN, GUILD_ID, TARGET_USER_ID, DATA_FILE, ALLOWED_ROLES, STOCK_FILE, STOCK_HISTORY_FILE, UPDATE_INTERVAL_MINUTES, LOTTERY_FILE, AFK_CHANNEL_ID
+from globals import TOKEN, GUILD_ID, TARGET_USER_ID, ALLOWED_ROLES, STOCK_FILE, STOCK_HISTORY_FILE, UPDATE_INTERVAL_MINUTES, LOTTERY_FILE, AFK_CHANNEL_ID, FLUSH_INTERVAL_SECONDS, COMPACT_INTERVAL_MINUTES, BACKUP_INTERVAL_MINUTES
 from stocks import load_stocks
 from utils import save_data, load_data
+import economy
+import backups
+import fileio
+import charts
+import networth
+import ranking
+from metrics import loop_lag
 
 #keys are user IDs (as strings), values are dicts with session data. tracks active VCs
 active_vc_sessions = {}
@@ -47,24 +54,32 @@ def update_active_vc_sessions_on_startup():
                         print(f"Added {member.display_name} (ID: {uid}) to active VC sessions.")
 
 
-@tasks.loop(hours=4)
+#incremental backups of every state file, see backups.py
+@tasks.loop(minutes=BACKUP_INTERVAL_MINUTES)
 async def backup_data():
-    backup_dir = "backups"
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-    # Create a unique backup filename with timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = os.path.join(backup_dir, f"data_backup_{timestamp}.json")
     try:
-        with open(DATA_FILE, "r") as f:
-            data_content = f.read()
-        with open(backup_file, "w") as f:
-            f.write(data_content)
-        print(f"Backup created at {backup_file}")
+        #fold pending changes into data.json first so the backup is current
+        await economy.compact_async()
+        await fileio.run(backups.create_backup)
     except Exception as e:
         print(f"Failed to create backup: {e}")
 
 
+#write-behind flush of the in-memory economy, see economy.py
+@tasks.loop(seconds=FLUSH_INTERVAL_SECONDS)
+async def flush_data():
+    try:
+        await economy.flush_async()
+    except Exception as e:
+        print(f"Failed to flush data: {e}")
+
+@tasks.loop(minutes=COMPACT_INTERVAL_MINUTES)
+async def compact_data():
+    try:
+        await economy.compact_async()
+    except Exception as e:
+        print(f"Failed to compact data: {e}")
+
 
 # --- Voice State Update Event ---
 @bot.event
@@ -104,14 +119,14 @@ async def on_voice_state_update(member, before, after):
             data = load_data()
             #if session was AFK, update "vc_afk"; else update normal VC times.
             if session.get("afk"):
-                record = data.get(uid, {"vc_afk": 0})
+                record = data.user(uid)
                 record["vc_afk"] = record.get("vc_afk", 0) + session_duration.total_seconds()
             else:
-                record = data.get(uid, {"vc_time": 0, "vc_timealone": 0})
+                record = data.user(uid)
                 record["vc_time"] = record.get("vc_time", 0) + session_duration.total_seconds()
                 record["vc_timealone"] = record.get("vc_timealone", 0) + alone_time.total_seconds()
             data[uid] = record
-            save_data(data)
+            save_data(data, uid)
     #if a user switches voice channels:
     elif before.channel is not None and after.channel is not None:
         #end the old session.
@@ -124,14 +139,14 @@ async def on_voice_state_update(member, before, after):
             data = load_data()
             #update the appropriate field based on whether it was AFK.
             if session.get("afk"):
-                record = data.get(uid, {"vc_afk": 0})
+                record = data.user(uid)
                 record["vc_afk"] = record.get("vc_afk", 0) + session_duration.total_seconds()
             else:
-                record = data.get(uid, {"vc_time": 0, "vc_timealone": 0})
+                record = data.user(uid)
                 record["vc_time"] = record.get("vc_time", 0) + session_duration.total_seconds()
                 record["vc_timealone"] = record.get("vc_timealone", 0) + alone_time.total_seconds()
             data[uid] = record
-            save_data(data)
+            save_data(data, uid)
         #start a new session for the new channel.
         channel = after.channel
         members = non_bot_members(channel)
@@ -244,63 +259,60 @@ async def role_join(interaction: discord.Interaction, role: str):
     description="View the leaderboard. Categories: networth, prestige, time, timealone, or timeafk.",
     guild=discord.Object(id=GUILD_ID)
 )
-@app_commands.describe(category="Choose a category: networth, prestige, time, timealone, or timeafk")
-async def leaderboard(interaction: discord.Interaction, category: str):
+@app_commands.describe(category="Choose a category: networth, prestige, time, timealone, or timeafk",
+                       page="Optional: page to show, 10 per page (default 1)",
+                       me="Optional: jump to the page with your own rank")
+async def leaderboard(interaction: discord.Interaction, category: str, page: Optional[int] = None, me: Optional[bool] = False):
     category = category.lower()
-    data = load_data()
-    leaderboard_list = []
+    user_id = str(interaction.user.id)
+    titles = {
+        "networth": "Net Worth Leaderboard",
+        "time": "Voice Channel Time Leaderboard (Non-AFK)",
+        "timealone": "Voice Channel Alone Time Leaderboard (Non-AFK)",
+        "timeafk": "AFK Time Leaderboard",
+        "prestige": "Prestige Leaderboard",
+    }
+    if category not in titles:
+        await interaction.response.send_message("Invalid category. Please choose networth, prestige, time, timealone, or timeafk.", ephemeral=True)
+        return
 
+    #every category is kept ranked (networth.py, ranking.py), a page or a rank is a cheap lookup
     if category == "networth":
         stock_prices = load_stocks()
-        for user_id, record in data.items():
-            balance = record.get("balance", 0)
-            portfolio = record.get("portfolio", {})
-            portfolio_value = sum(stock_prices.get(stock, 0) * shares for stock, shares in portfolio.items())
-            networth = balance + portfolio_value + (record.get("graphics_cards", 0) * 10000)
-            leaderboard_list.append((user_id, networth))
-        title = "Net Worth Leaderboard"
-    elif category == "time":
-        #only include non-AFK voice channel time.
-        for user_id, record in data.items():
-            vc_time = record.get("vc_time", 0)
-            leaderboard_list.append((user_id, vc_time))
-        title = "Voice Channel Time Leaderboard (Non-AFK)"
-    elif category == "timealone":
-        #only include non-AFK alone time.
-        for user_id, record in data.items():
-            vc_timealone = record.get("vc_timealone", 0)
-            leaderboard_list.append((user_id, vc_timealone))
-        title = "Voice Channel Alone Time Leaderboard (Non-AFK)"
-    elif category == "timeafk":
-        #this one shows AFK time.
-        for user_id, record in data.items():
-            vc_afk = record.get("vc_afk", 0)
-            leaderboard_list.append((user_id, vc_afk))
-        title = "AFK Time Leaderboard"
-    elif category == "prestige":
-        for user_id, record in data.items():
-            prestige = record.get("prestige", 0)
-            leaderboard_list.append((user_id, prestige))
-        title = "Prestige Leaderboard"
+        my_rank = networth.rank(user_id, stock_prices)
+        total = networth.size(stock_prices)
     else:
-        await interaction.response.send_message("Invalid category. Please choose networth, time, timealone, or timeafk.", ephemeral=True)
-        return
+        my_rank = ranking.rank(category, user_id)
+        total = ranking.size(category)
+    pages = max(1, -(-total // 10))
+    if me and my_rank is not None:
+        page = (my_rank - 1) // 10 + 1
+    page = min(max(page or 1, 1), pages)
+    if category == "networth":
+        leaderboard_list = networth.page(stock_prices, page)
+    else:
+        leaderboard_list = ranking.page(category, page)
 
-    leaderboard_list.sort(key=lambda x: x[1], reverse=True)
-    embed = discord.Embed(title=title, color=discord.Color.gold())
-    count = 0
-    for user_id, value in leaderboard_list[:10]:
-        count += 1
-        member = interaction.guild.get_member(int(user_id))
-        name = member.display_name if member else f"User {user_id}"
+    embed = discord.Embed(title=titles[category], color=discord.Color.gold())
+    for rank, member_id, value in leaderboard_list:
+        member = interaction.guild.get_member(int(member_id))
+        name = member.display_name if member else f"User {member_id}"
         if category == "networth":
             display_value = f"{value:.2f} Beaned Bucks"
+        elif category == "prestige":
+            display_value = f"Prestige {value}"
         else:
             hrs = value // 3600
             mins = (value % 3600) // 60
             secs = value % 60
             display_value = f"{int(hrs)}h {int(mins)}m {int(secs)}s"
-        embed.add_field(name=f"{count}. {name}", value=display_value, inline=False)
+        if member_id == user_id:
+            name = f"**{name}**"
+        embed.add_field(name=f"{rank}. {name}", value=display_value, inline=False)
+    footer = f"Page {page}/{pages}"
+    if my_rank is not None:
+        footer += f" | Your rank: #{my_rank} of {total}"
+    embed.set_footer(text=footer)
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(
@@ -316,6 +328,7 @@ async def exit(interaction: discord.Interaction):
 
     now = datetime.datetime.now()
     data = load_data()
+    updated_ids = list(active_vc_sessions)
     #process all active VC sessions.
     for uid, session in list(active_vc_sessions.items()):
         session_duration = now - session["join_time"]
@@ -325,24 +338,26 @@ async def exit(interaction: discord.Interaction):
         
         #check if this session is AFK
         if session.get("afk"):
-            record = data.get(uid, {"vc_afk": 0})
+            record = data.user(uid)
             record["vc_afk"] = record.get("vc_afk", 0) + session_duration.total_seconds()
         else:
-            record = data.get(uid, {"vc_time": 0, "vc_timealone": 0})
+            record = data.user(uid)
             record["vc_time"] = record.get("vc_time", 0) + session_duration.total_seconds()
             record["vc_timealone"] = record.get("vc_timealone", 0) + alone_time.total_seconds()
         
         data[uid] = record
         del active_vc_sessions[uid]
 
-    save_data(data)
+    save_data(data, *updated_ids)
     await interaction.response.send_message("Shutting down the bot and updating VC trackers...", ephemeral=True)
+    await economy.flush_async()
     await bot.close()
 
 #onready event
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
+    loop_lag.start()
     commands = await bot.http.get_global_commands(bot.user.id)
     for cmd in commands:
         await bot.http.delete_global_command(bot.user.id, cmd['id'])
@@ -362,6 +377,15 @@ async def on_ready():
     except Exception as e:
         print(f"Error syncing commands: {e}")
     update_active_vc_sessions_on_startup()
-    backup_data.start()
+    if not backup_data.is_running():
+        backup_data.start()
+    if not flush_data.is_running():
+        flush_data.start()
+    if not compact_data.is_running():
+        compact_data.start()
 
-bot.run(TOKEN)
\ No newline at end of file
+bot.run(TOKEN)
+#catch anything changed since the last background flush, then let queued file writes finish
+economy.flush()
+fileio.shutdown()
+charts.shutdown()
\ No newline at end of file
@@ -0,0 +1,158 @@
+#price charts for /stocks <symbol>. the history is sliced out of pricehistory on the event loop
+#(cheap, it's memory-mapped) and drawn with matplotlib in a process pool, so a burst of chart
+#requests after a market update never stalls other commands. finished PNGs are kept in an LRU
+#keyed by (symbol, period, style, last tick), so repeat lookups between ticks are a dict hit and
+#identical requests that arrive while one is rendering share that render. /networth charts of a
+#user's wealth (networthhistory.py) go through the same pool and cache.
+import asyncio
+import collections
+import datetime
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from globals import CHART_WORKERS, CHART_CACHE_SIZE
+import networthhistory
+import pricehistory
+
+#period -> (seconds shown, history used for a line chart, for a candle chart). None is raw ticks
+PERIODS = {
+    "1d": (86400, None, "1h"),
+    "1w": (7 * 86400, None, "1h"),
+    "1m": (30 * 86400, "1h", "1d"),
+    "1y": (365 * 86400, "1d", "1w"),
+    "all": (None, "1d", "1w"),
+}
+STYLES = ("line", "candle")
+#networth chart colors, one per networthhistory.COLUMNS
+STACK_COLORS = ("tab:olive", "tab:blue", "tab:green", "tab:purple", "tab:gray")
+
+_executor = None
+#key -> png bytes, least recently used first
+_cache = collections.OrderedDict()
+#key -> future of a render in progress
+_rendering = {}
+hits = 0
+misses = 0
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        #spawned rather than forked, the bot process has threads (the i/o pool) that fork would copy mid-flight
+        _executor = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def draw(title, style, times, columns, labels=None):
+    """Render a chart to PNG bytes. Runs in a worker process, so it only gets plain lists.
+
+    columns is [prices] for a line chart, [opens, highs, lows, closes] for candles or one list
+    per labelled layer for a "stack" chart.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    dates = [datetime.datetime.fromtimestamp(t) for t in times]
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+    if style == "candle":
+        opens, highs, lows, closes = columns
+        #candle body width, most of the gap between two candles
+        width = (dates[1] - dates[0]).total_seconds() / 86400 * 0.7 if len(dates) > 1 else 0.02
+        for date, o, h, l, c in zip(dates, opens, highs, lows, closes):
+            color = "tab:green" if c >= o else "tab:red"
+            ax.vlines(date, l, h, color=color, linewidth=1)
+            ax.bar(date, abs(c - o) or (h - l) * 0.01 or 0.01, width, bottom=min(o, c), color=color)
+    elif style == "stack":
+        ax.stackplot(dates, *columns, labels=labels, colors=STACK_COLORS[:len(columns)], alpha=0.8)
+        ax.legend(loc="upper left", fontsize="small")
+    else:
+        ax.plot(dates, columns[0], color="tab:blue", linewidth=1.2)
+    ax.set_title(title)
+    ax.set_ylabel("Beaned Bucks")
+    ax.grid(True, alpha=0.3)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(mdates.AutoDateLocator()))
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _slice(symbol, period, style, last_tick):
+    seconds, line_source, candle_source = PERIODS[period]
+    source = candle_source if style == "candle" else line_source
+    rows = pricehistory.between(symbol, None if seconds is None else last_tick - seconds, None, source)
+    if style == "candle":
+        columns = [rows[field].tolist() for field in ("open", "high", "low", "close")]
+    else:
+        columns = [(rows["close"] if source else rows["price"]).tolist()]
+    return rows["time"].tolist(), columns
+
+
+async def chart(symbol, period="1w", style="line"):
+    """PNG bytes of a chart of symbol over period, None if there's no history."""
+    symbol = symbol.upper()
+    #the newest tick is part of the key, a market update moves every chart on to a new entry
+    last = pricehistory.tail(symbol, 1)
+    if not last:
+        return None
+
+    def make():
+        times, columns = _slice(symbol, period, style, int(last[0][0].timestamp()))
+        return f"{symbol} - {period} ({style})", style, times, columns, None
+    return await _cached((symbol, period, style, last[0][0]), make)
+
+
+async def networth_chart(user_id, name, period="1w"):
+    """PNG bytes of a stacked chart of a user's net worth over period, None if there's no history."""
+    seconds = PERIODS[period][0]
+    tier = networthhistory.tier_for(seconds)
+    last = networthhistory.last_time(tier)
+    if last is None:
+        return None
+
+    def make():
+        times, samples = networthhistory.history(user_id, None if seconds is None else last - seconds, None, tier)
+        if not len(times):
+            return None
+        columns = [samples[:, i].tolist() for i in range(len(networthhistory.COLUMNS))]
+        return f"{name} - net worth {period}", "stack", times.tolist(), columns, list(networthhistory.COLUMNS)
+    return await _cached(("networth", str(user_id), period, last), make)
+
+
+async def _cached(key, make):
+    """The cached PNG for key, or render make()'s (title, style, times, columns, labels) in the pool."""
+    global hits, misses
+    png = _cache.get(key)
+    if png is not None:
+        hits += 1
+        _cache.move_to_end(key)
+        return png
+    if key in _rendering:
+        hits += 1
+        return await asyncio.shield(_rendering[key])
+    misses += 1
+    args = make()
+    if args is None:
+        return None
+    future = asyncio.get_running_loop().run_in_executor(_pool(), draw, *args)
+    _rendering[key] = future
+    try:
+        png = await asyncio.shield(future)
+    finally:
+        _rendering.pop(key, None)
+    _cache[key] = png
+    while len(_cache) > CHART_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return png
+
+
+def stats():
+    return {"hits": hits, "misses": misses, "cached": len(_cache)}
+
+
+def shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
@@ -6,6 +6,7 @@ import random
 import datetime
 from globals import GUILD_ID
 from utils import load_data, save_data
+import economy
 
 class CrimeCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -56,10 +57,10 @@ class CrimeCog(commands.Cog):
         if roll < 0.60:  # 60% success
             reward = random.randint(500, 1000)
             data = load_data()
-            user_record = data.get(user_id, {"balance": 0, "cash": 0})
+            user_record = data.user(user_id)
             user_record["cash"] = user_record.get("cash", 0) + reward
             data[user_id] = user_record
-            save_data(data)
+            save_data(data, user_id)
             
             await interaction.response.send_message(
                 f"💵 Petty crime successful! You earned {reward} cash! Cash balance: {user_record['cash']:,}",
@@ -107,39 +108,50 @@ class CrimeCog(commands.Cog):
             return
 
         self.mug_cooldowns[mugger_id] = now
-        data = load_data()
-        
-        mugger_record = data.get(mugger_id, {"balance": 0, "cash": 0})
-        target_record = data.get(target_id, {"balance": 0, "cash": 0})
-        
-        # Ensure cash exists
-        if "cash" not in mugger_record:
-            mugger_record["cash"] = 0
-        if "cash" not in target_record:
-            target_record["cash"] = 0
 
-        target_cash = target_record.get("cash", 0)
+        async with economy.transaction(mugger_id, target_id) as tx:
+            mugger_record = tx[mugger_id]
+            target_record = tx[target_id]
+            target_cash = target_record.get("cash", 0)
 
-        # Check minimum cash
-        if target_cash < 100:
-            await interaction.response.send_message(
-                f"{target.display_name} doesn't have enough cash to mug (minimum: 100 cash).",
-                ephemeral=True
-            )
-            return
+            # Check minimum cash
+            if target_cash < 100:
+                await interaction.response.send_message(
+                    f"{target.display_name} doesn't have enough cash to mug (minimum: 100 cash).",
+                    ephemeral=True
+                )
+                return
 
-        # Roll for success
-        if random.random() < 0.50:  # 50% success
-            steal_percentage = random.uniform(0.05, 0.30)
-            stolen_amount = int(target_cash * steal_percentage)
-            
-            target_record["cash"] = target_cash - stolen_amount
-            mugger_record["cash"] = mugger_record.get("cash", 0) + stolen_amount
-            
-            data[mugger_id] = mugger_record
-            data[target_id] = target_record
-            save_data(data)
-            
+            # Roll for success
+            success = random.random() < 0.50  # 50% success
+            if success:
+                steal_percentage = random.uniform(0.05, 0.30)
+                stolen_amount = int(target_cash * steal_percentage)
+
+                target_record["cash"] = target_cash - stolen_amount
+                mugger_record["cash"] = mugger_record.get("cash", 0) + stolen_amount
+            else:
+                fine_amount = random.randint(100, 10000)
+                mugger_cash = mugger_record.get("cash", 0)
+                mugger_bank = mugger_record.get("balance", 0)
+
+                # Take from cash first, then bank
+                if fine_amount <= mugger_cash:
+                    mugger_record["cash"] = mugger_cash - fine_amount
+                    fine_msg = f"Fine: {fine_amount:,} cash"
+                else:
+                    remaining_fine = fine_amount - mugger_cash
+                    if remaining_fine <= mugger_bank:
+                        mugger_record["cash"] = 0
+                        mugger_record["balance"] = mugger_bank - remaining_fine
+                        fine_msg = f"Fine: {mugger_cash:,} cash + {remaining_fine:,} bank"
+                    else:
+                        total = mugger_cash + mugger_bank
+                        mugger_record["cash"] = 0
+                        mugger_record["balance"] = 0
+                        fine_msg = f"Fine: All your money ({total:,} total)"
+
+        if success:
             await interaction.response.send_message(
                 f"💰 Mugging successful! You stole {stolen_amount:,} cash from {target.display_name} ({steal_percentage*100:.1f}%)!\n"
                 f"Your cash: {mugger_record['cash']:,}",
@@ -151,29 +163,6 @@ class CrimeCog(commands.Cog):
                 ephemeral=False
             )
         else:  # 50% failure
-            fine_amount = random.randint(100, 10000)
-            mugger_cash = mugger_record.get("cash", 0)
-            mugger_bank = mugger_record.get("balance", 0)
-            
-            # Take from cash first, then bank
-            if fine_amount <= mugger_cash:
-                mugger_record["cash"] = mugger_cash - fine_amount
-                fine_msg = f"Fine: {fine_amount:,} cash"
-            else:
-                remaining_fine = fine_amount - mugger_cash
-                if remaining_fine <= mugger_bank:
-                    mugger_record["cash"] = 0
-                    mugger_record["balance"] = mugger_bank - remaining_fine
-                    fine_msg = f"Fine: {mugger_cash:,} cash + {remaining_fine:,} bank"
-                else:
-                    total = mugger_cash + mugger_bank
-                    mugger_record["cash"] = 0
-                    mugger_record["balance"] = 0
-                    fine_msg = f"Fine: All your money ({total:,} total)"
-            
-            data[mugger_id] = mugger_record
-            save_data(data)
-            
             # Timeout
             timeout_duration = random.randint(120, 300)
             try:
@@ -211,13 +200,13 @@ class CrimeCog(commands.Cog):
         # Roll outcome - 40% success rate
         roll = random.random()
         data = load_data()
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         
         if roll < 0.40:  # 40% success
             reward = random.randint(5000, 20000)
             user_record["cash"] = user_record.get("cash", 0) + reward
             data[user_id] = user_record
-            save_data(data)
+            save_data(data, user_id)
             
             await interaction.response.send_message(
                 f"💰💰 STORE ROBBERY SUCCESSFUL! You escaped with {reward:,} cash!\n"
@@ -247,7 +236,7 @@ class CrimeCog(commands.Cog):
                     fine_msg = f"Fine: All your money ({total:,} total)"
             
             data[user_id] = user_record
-            save_data(data)
+            save_data(data, user_id)
             
             # 1-hour timeout
             try:
@@ -290,69 +279,87 @@ class CrimeCog(commands.Cog):
             )
             return
 
-        data = load_data()
-        heister_record = data.get(heister_id, {"balance": 0, "cash": 0, "prestige": 0})
-        target_record = data.get(target_id, {"balance": 0, "cash": 0})
-        
-        # Check prestige requirement
-        heister_prestige = heister_record.get("prestige", 0)
-        if heister_prestige < 1:
-            await interaction.response.send_message(
-                "You need at least prestige level 1 to attempt bank heists.", 
-                ephemeral=True
-            )
-            return
+        async with economy.transaction(heister_id, target_id) as tx:
+            heister_record = tx[heister_id]
+            target_record = tx[target_id]
 
-        # Check upfront cost for supplies
-        supplies_cost = 100000
-        heister_bank = heister_record.get("balance", 0)
-        heister_cash = heister_record.get("cash", 0)
-        total_money = heister_bank + heister_cash
+            # Check prestige requirement
+            heister_prestige = heister_record.get("prestige", 0)
+            if heister_prestige < 1:
+                await interaction.response.send_message(
+                    "You need at least prestige level 1 to attempt bank heists.", 
+                    ephemeral=True
+                )
+                return
 
-        if total_money < supplies_cost:
-            await interaction.response.send_message(
-                f"You need {supplies_cost:,} total money (bank + cash) to buy supplies for a bank heist. "
-                f"You have {total_money:,} total.",
-                ephemeral=True
-            )
-            return
+            # Check upfront cost for supplies
+            supplies_cost = 100000
+            heister_bank = heister_record.get("balance", 0)
+            heister_cash = heister_record.get("cash", 0)
+            total_money = heister_bank + heister_cash
 
-        # Check if target has enough bank money to make it worthwhile
-        target_bank = target_record.get("balance", 0)
-        if target_bank < 10000:
-            await interaction.response.send_message(
-                f"{target.display_name} doesn't have enough bank money to make a heist worthwhile (minimum: 10,000).",
-                ephemeral=True
-            )
-            return
+            if total_money < supplies_cost:
+                await interaction.response.send_message(
+                    f"You need {supplies_cost:,} total money (bank + cash) to buy supplies for a bank heist. "
+                    f"You have {total_money:,} total.",
+                    ephemeral=True
+                )
+                return
 
-        # Pay for supplies (take from bank first, then cash)
-        if supplies_cost <= heister_bank:
-            heister_record["balance"] = heister_bank - supplies_cost
-        else:
-            remaining_cost = supplies_cost - heister_bank
-            heister_record["balance"] = 0
-            heister_record["cash"] = heister_cash - remaining_cost
+            # Check if target has enough bank money to make it worthwhile
+            target_bank = target_record.get("balance", 0)
+            if target_bank < 10000:
+                await interaction.response.send_message(
+                    f"{target.display_name} doesn't have enough bank money to make a heist worthwhile (minimum: 10,000).",
+                    ephemeral=True
+                )
+                return
 
-        # Set cooldown
-        self.bankheist_cooldowns[heister_id] = now
-        
-        # Roll for success - 20% success rate
-        roll = random.random()
-        
-        if roll < 0.20:  # 20% success
-            # Steal 10-20% of target's bank account
-            steal_percentage = random.uniform(0.10, 0.20)
-            stolen_amount = int(target_bank * steal_percentage)
-            
-            # Transfer the money to heister's bank
-            target_record["balance"] = target_bank - stolen_amount
-            heister_record["balance"] = heister_record.get("balance", 0) + stolen_amount
-            
-            data[heister_id] = heister_record
-            data[target_id] = target_record
-            save_data(data)
-            
+            # Pay for supplies (take from bank first, then cash)
+            if supplies_cost <= heister_bank:
+                heister_record["balance"] = heister_bank - supplies_cost
+            else:
+                remaining_cost = supplies_cost - heister_bank
+                heister_record["balance"] = 0
+                heister_record["cash"] = heister_cash - remaining_cost
+
+            # Set cooldown
+            self.bankheist_cooldowns[heister_id] = now
+
+            # Roll for success - 20% success rate
+            roll = random.random()
+
+            if roll < 0.20:  # 20% success
+                # Steal 10-20% of target's bank account
+                steal_percentage = random.uniform(0.10, 0.20)
+                stolen_amount = int(target_bank * steal_percentage)
+
+                # Transfer the money to heister's bank
+                target_record["balance"] = target_bank - stolen_amount
+                heister_record["balance"] = heister_record.get("balance", 0) + stolen_amount
+            else:  # 80% failure
+                # Massive fine
+                fine_amount = random.randint(50000, 100000)
+                heister_cash_after = heister_record.get("cash", 0)
+                heister_bank_after = heister_record.get("balance", 0)
+
+                # Take fine from remaining money (cash first, then bank)
+                if fine_amount <= heister_cash_after:
+                    heister_record["cash"] = heister_cash_after - fine_amount
+                    fine_msg = f"Fine: {fine_amount:,} cash"
+                else:
+                    remaining_fine = fine_amount - heister_cash_after
+                    if remaining_fine <= heister_bank_after:
+                        heister_record["cash"] = 0
+                        heister_record["balance"] = heister_bank_after - remaining_fine
+                        fine_msg = f"Fine: {heister_cash_after:,} cash + {remaining_fine:,} bank"
+                    else:
+                        total_remaining = heister_cash_after + heister_bank_after
+                        heister_record["cash"] = 0
+                        heister_record["balance"] = 0
+                        fine_msg = f"Fine: All remaining money ({total_remaining:,} total)"
+
+        if roll < 0.20:
             await interaction.response.send_message(
                 f"🏦💰 BANK HEIST SUCCESSFUL! You robbed {target.display_name}'s bank and stole {stolen_amount:,} Beaned Bucks ({steal_percentage*100:.1f}%)!\n"
                 f"Your bank balance: {heister_record['balance']:,}",
@@ -364,31 +371,7 @@ class CrimeCog(commands.Cog):
                 f"Your remaining bank balance: {target_record['balance']:,}",
                 ephemeral=False
             )
-        else:  # 80% failure
-            # Massive fine
-            fine_amount = random.randint(50000, 100000)
-            heister_cash_after = heister_record.get("cash", 0)
-            heister_bank_after = heister_record.get("balance", 0)
-            
-            # Take fine from remaining money (cash first, then bank)
-            if fine_amount <= heister_cash_after:
-                heister_record["cash"] = heister_cash_after - fine_amount
-                fine_msg = f"Fine: {fine_amount:,} cash"
-            else:
-                remaining_fine = fine_amount - heister_cash_after
-                if remaining_fine <= heister_bank_after:
-                    heister_record["cash"] = 0
-                    heister_record["balance"] = heister_bank_after - remaining_fine
-                    fine_msg = f"Fine: {heister_cash_after:,} cash + {remaining_fine:,} bank"
-                else:
-                    total_remaining = heister_cash_after + heister_bank_after
-                    heister_record["cash"] = 0
-                    heister_record["balance"] = 0
-                    fine_msg = f"Fine: All remaining money ({total_remaining:,} total)"
-            
-            data[heister_id] = heister_record
-            save_data(data)
-            
+        else:
             # 2-hour timeout for failed bank heist
             try:
                 until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=2)
@@ -427,7 +410,7 @@ class CrimeCog(commands.Cog):
                 return
 
         data = load_data()
-        robber_record = data.get(robber_id, {"balance": 0, "cash": 0, "inventory": {}})
+        robber_record = data.user(robber_id)
         
         if target is None:
             # Rob random dealers (no target)
@@ -462,7 +445,7 @@ class CrimeCog(commands.Cog):
                 self.drugrobbery_cooldowns[robber_id] = now - datetime.timedelta(minutes=45)  # Set to allow retry in 15 min
                 
                 data[robber_id] = robber_record
-                save_data(data)
+                save_data(data, robber_id)
                 
                 # Format stolen drugs message
                 stolen_msg = "\n".join([f"- {amount} {drug.replace('_', ' ')}" for drug, amount in stolen_drugs.items()])
@@ -489,7 +472,7 @@ class CrimeCog(commands.Cog):
                 return
             
             target_id = str(target.id)
-            target_record = data.get(target_id, {"balance": 0, "cash": 0, "inventory": {}})
+            target_record = data.user(target_id)
             target_inventory = target_record.get("inventory", {})
             
             # Filter only drug items
@@ -538,7 +521,7 @@ class CrimeCog(commands.Cog):
                 
                 data[robber_id] = robber_record
                 data[target_id] = target_record
-                save_data(data)
+                save_data(data, robber_id, target_id)
                 
                 # Format stolen drugs message
                 stolen_msg = "\n".join([f"- {amount} {drug.replace('_', ' ')}" for drug, amount in stolen_drugs.items()])
@@ -9,6 +9,7 @@ from zoneinfo import ZoneInfo
 from globals import STOCK_FILE, GUILD_ID, UPDATE_INTERVAL_MINUTES
 from stocks import load_stocks
 from utils import load_data, save_data
+import economy
 from typing import Optional
 import pytz
 
@@ -23,70 +24,72 @@ class CryptoCog(commands.Cog):
     async def execute_mine(self):
         data = load_data()
         stock_data = load_stocks()
-        for user_id in data:
-            user_record = data.get(user_id, {"balance": 0, "graphics_cards": 0, "mining": {}, "portfolio": {}, "inventory": {}})
-            mining_config = user_record.get("mining", {})
-            total_cards = user_record.get("graphics_cards", 0)
-            
-            if not mining_config or total_cards == 0:
+        for user_id in list(data):
+            if not data.get(user_id, {}).get("mining"):
                 continue
+            #lock just this miner while their balance, power and coins change
+            async with economy.transaction(user_id) as tx:
+                user_record = tx[user_id]
+                mining_config = user_record.get("mining", {})
+                total_cards = user_record.get("graphics_cards", 0)
+            
+                if not mining_config or total_cards == 0:
+                    continue
                 
-            portfolio = user_record.get("portfolio", {})
-            inventory = user_record.get("inventory", {})
+                portfolio = user_record.get("portfolio", {})
+                inventory = user_record.get("inventory", {})
             
-            # Calculate total cards being used for mining
-            total_mining_cards = sum(mining_config.values())
-            if total_mining_cards == 0:
-                continue
+                # Calculate total cards being used for mining
+                total_mining_cards = sum(mining_config.values())
+                if total_mining_cards == 0:
+                    continue
                 
-            # Calculate power needed
-            power_needed = total_mining_cards * POWER_PER_CARD
-            power_available = inventory.get("power", 0)
+                # Calculate power needed
+                power_needed = total_mining_cards * POWER_PER_CARD
+                power_available = inventory.get("power", 0)
             
-            # Calculate how many cards can actually mine based on available power
-            cards_that_can_mine = min(total_mining_cards, power_available // POWER_PER_CARD)
+                # Calculate how many cards can actually mine based on available power
+                cards_that_can_mine = min(total_mining_cards, power_available // POWER_PER_CARD)
             
-            if cards_that_can_mine > 0:
-                # Calculate total electricity cost across all coins
-                total_electricity_cost = 0
-                for coin, allocated_cards in mining_config.items():
-                    if allocated_cards > 0 and coin in stock_data:
-                        cost_per_card = stock_data[coin] * 0.50
-                        total_electricity_cost += cost_per_card * allocated_cards
+                if cards_that_can_mine > 0:
+                    # Calculate total electricity cost across all coins
+                    total_electricity_cost = 0
+                    for coin, allocated_cards in mining_config.items():
+                        if allocated_cards > 0 and coin in stock_data:
+                            cost_per_card = stock_data[coin] * 0.50
+                            total_electricity_cost += cost_per_card * allocated_cards
                 
-                # Scale electricity cost if not all cards can mine
-                if cards_that_can_mine < total_mining_cards:
-                    total_electricity_cost *= (cards_that_can_mine / total_mining_cards)
+                    # Scale electricity cost if not all cards can mine
+                    if cards_that_can_mine < total_mining_cards:
+                        total_electricity_cost *= (cards_that_can_mine / total_mining_cards)
                 
-                # Check if user has enough money for electricity
-                if user_record.get("balance", 0) >= total_electricity_cost:
-                    # Consume power
-                    power_consumed = cards_that_can_mine * POWER_PER_CARD
-                    inventory["power"] = max(0, inventory.get("power", 0) - power_consumed)
+                    # Check if user has enough money for electricity
+                    if user_record.get("balance", 0) >= total_electricity_cost:
+                        # Consume power
+                        power_consumed = cards_that_can_mine * POWER_PER_CARD
+                        inventory["power"] = max(0, inventory.get("power", 0) - power_consumed)
                     
-                    # Pay electricity cost
-                    user_record["balance"] -= total_electricity_cost
+                        # Pay electricity cost
+                        user_record["balance"] -= total_electricity_cost
                     
-                    # Distribute mining rewards proportionally
-                    for coin, allocated_cards in mining_config.items():
-                        if allocated_cards > 0 and coin in stock_data:
-                            # Calculate how many of this coin's cards can actually mine
-                            proportion = allocated_cards / total_mining_cards
-                            effective_cards = int(cards_that_can_mine * proportion)
+                        # Distribute mining rewards proportionally
+                        for coin, allocated_cards in mining_config.items():
+                            if allocated_cards > 0 and coin in stock_data:
+                                # Calculate how many of this coin's cards can actually mine
+                                proportion = allocated_cards / total_mining_cards
+                                effective_cards = int(cards_that_can_mine * proportion)
                             
-                            if effective_cards > 0:
-                                portfolio[coin] = portfolio.get(coin, 0) + effective_cards
+                                if effective_cards > 0:
+                                    portfolio[coin] = portfolio.get(coin, 0) + effective_cards
                     
-                    user_record["portfolio"] = portfolio
-                    user_record["inventory"] = inventory
-                    data[user_id] = user_record
+                        user_record["portfolio"] = portfolio
+                        user_record["inventory"] = inventory
                     
-                    print(f"User {user_id} mined with {cards_that_can_mine}/{total_mining_cards} cards using {power_consumed} power")
+                        print(f"User {user_id} mined with {cards_that_can_mine}/{total_mining_cards} cards using {power_consumed} power")
+                    else:
+                        print(f"User {user_id} couldn't afford electricity for mining ({total_electricity_cost:.2f} needed)")
                 else:
-                    print(f"User {user_id} couldn't afford electricity for mining ({total_electricity_cost:.2f} needed)")
-            else:
-                print(f"User {user_id} has no power for mining (needs {power_needed}, has {power_available})")
-        save_data(data)
+                    print(f"User {user_id} has no power for mining (needs {power_needed}, has {power_available})")
     
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="crypto", description="Shows your mining rig status and current mining configuration.")
@@ -95,7 +98,7 @@ class CryptoCog(commands.Cog):
         target = user or interaction.user
         data = load_data()
         user_id = str(target.id)
-        user_record = data.get(user_id, {"graphics_cards": 0, "mining": {}, "inventory": {}})
+        user_record = data.user(user_id)
         total_cards = user_record.get("graphics_cards", 0)
         mining_config = user_record.get("mining", {})
         power_available = user_record.get("inventory", {}).get("power", 0)
@@ -167,7 +170,7 @@ class CryptoCog(commands.Cog):
     async def mineconfig(self, interaction: discord.Interaction, coin: str, cards: int):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"graphics_cards": 0, "mining": {}})
+        user_record = data.user(user_id)
         total_cards = user_record.get("graphics_cards", 0)
         mining_config = user_record.get("mining", {})
         
@@ -210,7 +213,7 @@ class CryptoCog(commands.Cog):
             
         user_record["mining"] = mining_config
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         # Calculate new totals
         total_mining_cards = sum(mining_config.values())
@@ -234,11 +237,11 @@ class CryptoCog(commands.Cog):
     async def minestop(self, interaction: discord.Interaction):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"mining": {}})
+        user_record = data.user(user_id)
         
         user_record["mining"] = {}
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message("All mining operations have been stopped. All cards are now idle.", ephemeral=True)
 
@@ -248,7 +251,7 @@ class CryptoCog(commands.Cog):
     async def minestart(self, interaction: discord.Interaction, coin: str):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"graphics_cards": 0, "mining": {}})
+        user_record = data.user(user_id)
         total_cards = user_record.get("graphics_cards", 0)
         
         coin = coin.upper()
@@ -268,7 +271,7 @@ class CryptoCog(commands.Cog):
         # Set all cards to mine this coin
         user_record["mining"] = {coin: total_cards}
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         power_needed = total_cards * POWER_PER_CARD
         power_available = user_record.get("inventory", {}).get("power", 0)
@@ -290,7 +293,7 @@ class CryptoCog(commands.Cog):
     async def cryptobuy(self, interaction: discord.Interaction, quantity: int):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "graphics_cards": 0})
+        user_record = data.user(user_id)
         current_balance = float(user_record.get("balance", 0))
 
         try:
@@ -312,7 +315,7 @@ class CryptoCog(commands.Cog):
         power_needed_all = total_cards * POWER_PER_CARD
 
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
 
         await interaction.response.send_message(
             f"Successfully purchased {num_cards} RTX 5090s.\n"
@@ -328,7 +331,7 @@ class CryptoCog(commands.Cog):
     async def cryptosell(self, interaction: discord.Interaction, quantity: int):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "graphics_cards": 0, "mining": {}})
+        user_record = data.user(user_id)
         owned_cards = user_record.get("graphics_cards", 0)
         mining_config = user_record.get("mining", {})
 
@@ -367,7 +370,7 @@ class CryptoCog(commands.Cog):
         user_record["graphics_cards"] -= num_sell
 
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
 
         await interaction.response.send_message(
             f"Successfully sold {num_sell} RTX 5090s for $5,000 Beaned Bucks each for a total of {sale_value} Beaned Bucks.\n"
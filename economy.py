@@ -0,0 +1,204 @@
+#process wide user store. data.json is loaded once at startup and every cog works on
+#the same in-memory dict. save_data() only marks the touched users as dirty, the bot
+#flushes them to disk in the background every FLUSH_INTERVAL_SECONDS and on shutdown,
+#and compacts the backend's log every COMPACT_INTERVAL_MINUTES.
+#
+#commands that await between reading and writing a user (or touch several users) should
+#go through transaction(), which holds per-user locks so nothing else can change those
+#users halfway through:
+#
+#    async with economy.transaction(payer_id, payee_id) as tx:
+#        tx[payer_id]["cash"] -= amount
+#        tx[payee_id]["cash"] += amount
+#
+#records are records.UserRecord objects. data.user(user_id) creates the record on first use,
+#data.get(user_id) returns None for a user that has no record.
+import asyncio
+import copy
+import threading
+from globals import DATA_FILE, STORAGE_BACKEND, SQLITE_FILE
+from records import UserTable
+from storage import JsonBackend, SqliteBackend
+import fileio
+
+if STORAGE_BACKEND == "sqlite":
+    _backend = SqliteBackend(SQLITE_FILE, migrate_from=DATA_FILE)
+else:
+    _backend = JsonBackend(DATA_FILE)
+_data = None
+_dirty = set()
+_all_dirty = False
+#flushes are serialized so an older payload never lands after a newer one
+_flush_lock = asyncio.Lock()
+_write_lock = threading.Lock()
+_user_locks = {}
+#called with the changed user ids (None meaning every user) whenever users are marked dirty
+_listeners = []
+
+
+def load():
+    """Return the shared user dict, reading it from disk the first time."""
+    global _data
+    if _data is None:
+        _data = UserTable.from_storage(_backend.load())
+    return _data
+
+
+def subscribe(listener):
+    """Have listener(user_ids) called on every change, for indexes kept next to the data (see networth.py)."""
+    _listeners.append(listener)
+
+
+def mark_dirty(*user_ids):
+    """Flag users as changed. With no ids every user is flagged."""
+    global _all_dirty
+    if user_ids:
+        user_ids = [str(uid) for uid in user_ids]
+        _dirty.update(user_ids)
+    else:
+        _all_dirty = True
+    for listener in _listeners:
+        listener(user_ids or None)
+
+
+def save(data, *user_ids):
+    global _data
+    if data is not load():
+        #a caller built a whole new dict, adopt it and rewrite everything
+        _data = data if isinstance(data, UserTable) else UserTable.from_storage(data)
+        mark_dirty()
+    else:
+        mark_dirty(*user_ids)
+
+
+def is_dirty():
+    return _all_dirty or bool(_dirty)
+
+
+def _take_dirty():
+    """Clear and return the dirty ids, None meaning every user (including removed ones)."""
+    global _all_dirty
+    dirty_ids = None if _all_dirty else set(_dirty)
+    _dirty.clear()
+    _all_dirty = False
+    return dirty_ids
+
+
+def _write(payload):
+    with _write_lock:
+        _backend.write(payload)
+
+
+def _write_failed(dirty_ids, error):
+    #keep the users dirty so the next flush retries them
+    print(f"Failed to flush economy data: {error}")
+    _backend.forget(dirty_ids)
+    if dirty_ids is None:
+        mark_dirty()
+    else:
+        mark_dirty(*dirty_ids)
+
+
+def flush():
+    """Write dirty users to disk right now, blocking. Used on shutdown."""
+    if not is_dirty():
+        return
+    dirty_ids = _take_dirty()
+    payload = _backend.encode(load(), dirty_ids)
+    try:
+        _write(payload)
+    except Exception as e:
+        _write_failed(dirty_ids, e)
+        raise
+
+
+async def flush_async():
+    """Write dirty users to disk from a worker thread so the event loop keeps running."""
+    async with _flush_lock:
+        if not is_dirty():
+            return
+        #users changed while a big encode yields to the loop are dirty again and go in the next flush
+        dirty_ids = _take_dirty()
+        payload = await _backend.encode_async(load(), dirty_ids)
+        try:
+            await fileio.run(_write, payload)
+        except Exception as e:
+            _write_failed(dirty_ids, e)
+            raise
+
+
+async def compact_async():
+    """Flush, then fold the backend's log into its main file (new json snapshot / sqlite checkpoint)."""
+    await flush_async()
+    async with _flush_lock:
+        payload = await _backend.encode_compaction_async(load())
+        await fileio.run(_write, payload)
+
+
+def _user_lock(user_id):
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = _user_locks[user_id] = asyncio.Lock()
+    return lock
+
+
+class Transaction:
+    """Exclusive access to a set of users, see transaction()."""
+    def __init__(self, user_ids):
+        #always lock in the same order so two transactions can't deadlock each other
+        self.user_ids = sorted({str(uid) for uid in user_ids})
+        self._originals = {}
+
+    def __contains__(self, user_id):
+        return str(user_id) in load()
+
+    def __getitem__(self, user_id):
+        """The live record for a locked user, created empty if they have none yet."""
+        user_id = str(user_id)
+        if user_id not in self.user_ids:
+            raise KeyError(f"User {user_id} is not part of this transaction.")
+        data = load()
+        if user_id not in self._originals:
+            record = data.get(user_id)
+            #kept so the changes can be undone if the block raises
+            self._originals[user_id] = copy.deepcopy(record)
+        return data.user(user_id)
+
+    async def __aenter__(self):
+        for user_id in self.user_ids:
+            await _user_lock(user_id).acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            data = load()
+            if exc_type is None:
+                changed = []
+                for user_id, original in self._originals.items():
+                    if original is None and not data.get(user_id):
+                        #looked at a user with no record and left it empty
+                        data.pop(user_id, None)
+                    else:
+                        changed.append(user_id)
+                if changed:
+                    mark_dirty(*changed)
+            else:
+                for user_id, original in self._originals.items():
+                    if original is None:
+                        data.pop(user_id, None)
+                    else:
+                        data[user_id] = original
+        finally:
+            for user_id in reversed(self.user_ids):
+                _user_locks[user_id].release()
+        return False
+
+
+def transaction(*user_ids):
+    """Lock the given users for the duration of an async with block.
+
+    Records fetched through the transaction are marked dirty when the block exits normally
+    and restored to how they were if it raises. Users not in the transaction are never
+    blocked, so commands for unrelated users keep running in parallel.
+    """
+    return Transaction(user_ids)
@@ -0,0 +1,101 @@
+#read-through cache of parsed files that change far less often than they're read (stocks.json,
+#the industry config files, drug_market.json). an entry is reused until the file's mtime, size
+#or inode changes, so edits made by hand or by another process are still picked up. files the bot
+#writes itself go through save(), which puts the saved object straight into the cache instead of
+#parsing it again once the write lands.
+#
+#cached objects are shared: loaders whose callers mutate what they get pass copy=, read-only
+#config can skip it.
+import os
+import threading
+import fileio
+import snapshots
+
+_lock = threading.Lock()
+#path -> (stat key, parsed value), stat key is _PENDING while our own write is still queued
+_entries = {}
+#path -> [hits, misses]
+_counters = {}
+_PENDING = object()
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _count(path, index):
+    counters = _counters.get(path)
+    if counters is None:
+        counters = _counters[path] = [0, 0]
+    counters[index] += 1
+
+
+def load(path, parse=snapshots.loads, copy=None):
+    """Parsed content of path, reparsed only when the file changed. Raises like parse(read(path))."""
+    with _lock:
+        entry = _entries.get(path)
+    if entry is not None:
+        key, value = entry
+        try:
+            fresh = key is _PENDING or key == _stat_key(path)
+        except FileNotFoundError:
+            fresh = False
+        if fresh:
+            with _lock:
+                _count(path, 0)
+            return copy(value) if copy else value
+    with _lock:
+        _count(path, 1)
+    try:
+        key = _stat_key(path)
+    except FileNotFoundError:
+        #nothing on disk yet, but there may be a queued write for fileio.read to return
+        key = None
+    value = parse(fileio.read(path))
+    with _lock:
+        if key is None:
+            _entries.pop(path, None)
+        else:
+            _entries[path] = (key, value)
+    return copy(value) if copy else value
+
+
+def save(path, obj, copy=None):
+    """snapshots.save() that also primes the cache with obj. Returns the write's Future."""
+    value = copy(obj) if copy else obj
+    future = snapshots.save(path, obj)
+    with _lock:
+        entry = (_PENDING, value)
+        _entries[path] = entry
+
+    def landed(future):
+        #runs in an i/o thread: pin the entry to the file we just wrote, unless it was replaced since
+        with _lock:
+            if _entries.get(path) is not entry:
+                return
+            if future.exception() is not None:
+                del _entries[path]
+                return
+            try:
+                _entries[path] = (_stat_key(path), value)
+            except FileNotFoundError:
+                del _entries[path]
+
+    future.add_done_callback(landed)
+    return future
+
+
+def invalidate(path=None):
+    """Drop the cached entry for path, or every entry."""
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            _entries.pop(path, None)
+
+
+def stats():
+    """Hit/miss counts per path since startup."""
+    with _lock:
+        return {path: {"hits": hits, "misses": misses} for path, (hits, misses) in _counters.items()}
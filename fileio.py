@@ -0,0 +1,92 @@
+#disk i/o off the event loop. writes go to a small thread pool with one ordered queue per file:
+#write() returns straight away, writes to the same file land in the order they were made, and
+#if a file is saved several times before the disk catches up only the newest bytes are written.
+#reads see queued writes, so load right after save still returns what was just saved.
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="fileio")
+_lock = threading.Lock()
+#path -> (payload, futures waiting on it) for the newest write not yet started
+_pending = {}
+#paths a worker is currently draining
+_active = set()
+#path -> payload being written right now, reads prefer it over the file on disk
+_in_flight = {}
+
+
+def write_atomic(path, payload):
+    #write to a temp file and swap it in, so a crash mid-write never leaves a truncated file
+    if isinstance(payload, str):
+        payload = payload.encode()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _drain(path):
+    while True:
+        with _lock:
+            job = _pending.pop(path, None)
+            if job is None:
+                _active.discard(path)
+                _in_flight.pop(path, None)
+                return
+            payload, futures = job
+            _in_flight[path] = payload
+        try:
+            write_atomic(path, payload)
+        except Exception as e:
+            print(f"Failed to write {path}: {e}")
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future in futures:
+                future.set_result(None)
+
+
+def write(path, payload):
+    """Queue bytes to replace the file at path. Returns a Future that resolves once they're on disk."""
+    future = Future()
+    with _lock:
+        previous = _pending.get(path)
+        #an older queued payload that hasn't started is superseded, its waiters wait on this one
+        futures = previous[1] + [future] if previous else [future]
+        _pending[path] = (payload, futures)
+        if path in _active:
+            return future
+        _active.add(path)
+    _executor.submit(_drain, path)
+    return future
+
+
+def read(path):
+    """Bytes of the file at path, including writes that are still queued."""
+    with _lock:
+        job = _pending.get(path)
+        if job is not None:
+            return job[0]
+        if path in _in_flight:
+            return _in_flight[path]
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def run(fn, *args):
+    """Run a blocking function on the i/o pool and wait for it without blocking the loop."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+def submit(fn, *args):
+    """Run a blocking function on the i/o pool without waiting. Returns a Future."""
+    return _executor.submit(fn, *args)
+
+
+def shutdown():
+    """Finish every queued write and stop the pool. Used on shutdown."""
+    _executor.shutdown(wait=True)
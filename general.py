@@ -7,6 +7,7 @@ import datetime
 from typing import Optional
 from globals import GUILD_ID, DATA_FILE, ALLOWED_ROLES
 from utils import load_data, save_data
+import economy
 
 class GeneralCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -34,7 +35,7 @@ class GeneralCog(commands.Cog):
         target = user or interaction.user
         data = load_data()
         user_id = str(target.id)
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         
         # Backwards compatibility
         if "cash" not in user_record:
@@ -62,7 +63,7 @@ class GeneralCog(commands.Cog):
         user_id = str(interaction.user.id)
         now = datetime.datetime.now()
         
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         user_record.setdefault("last_daily", None)
         
         # Check cooldown
@@ -82,7 +83,7 @@ class GeneralCog(commands.Cog):
         user_record["balance"] = user_record.get("balance", 0) + reward
         user_record["last_daily"] = now.isoformat()
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"🏦 You received {reward:,} Beaned Bucks in your bank! Bank balance: {user_record['balance']:,}",
@@ -100,7 +101,7 @@ class GeneralCog(commands.Cog):
         user_id = str(interaction.user.id)
         now = datetime.datetime.now()
 
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         user_record.setdefault("last_daily_boost", None)
 
         # Check cooldown
@@ -120,7 +121,7 @@ class GeneralCog(commands.Cog):
         user_record["balance"] = user_record.get("balance", 0) + reward
         user_record["last_daily_boost"] = now.isoformat()
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"🏦 Booster reward: {reward:,} Beaned Bucks added to your bank! Bank balance: {user_record['balance']:,}",
@@ -134,7 +135,7 @@ class GeneralCog(commands.Cog):
         user_id = str(interaction.user.id)
         now = datetime.datetime.now()
 
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         user_record.setdefault("last_work", None)
 
         # Check cooldown
@@ -154,7 +155,7 @@ class GeneralCog(commands.Cog):
         user_record["balance"] = user_record.get("balance", 0) + reward
         user_record["last_work"] = now.isoformat()
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"🏦 You worked and earned {reward} Beaned Bucks! Bank balance: {user_record['balance']:,}",
@@ -168,7 +169,7 @@ class GeneralCog(commands.Cog):
     async def withdraw(self, interaction: discord.Interaction, amount: str):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         
         bank_balance = user_record.get("balance", 0)
         
@@ -191,7 +192,7 @@ class GeneralCog(commands.Cog):
         user_record["balance"] = bank_balance - withdraw_amount
         user_record["cash"] = user_record.get("cash", 0) + withdraw_amount
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"💸 Withdrew {withdraw_amount:,} from bank to cash.\n"
@@ -205,7 +206,7 @@ class GeneralCog(commands.Cog):
     async def deposit(self, interaction: discord.Interaction, amount: str):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         
         cash_balance = user_record.get("cash", 0)
         
@@ -228,7 +229,7 @@ class GeneralCog(commands.Cog):
         user_record["cash"] = cash_balance - deposit_amount
         user_record["balance"] = user_record.get("balance", 0) + deposit_amount
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"🏦 Deposited {deposit_amount:,} from cash to bank.\n"
@@ -250,31 +251,20 @@ class GeneralCog(commands.Cog):
             
         payer_id = str(interaction.user.id)
         payee_id = str(user.id)
-        data = load_data()
-
-        # Ensure records exist
-        if payer_id not in data:
-            data[payer_id] = {"balance": 0, "cash": 0}
-        if payee_id not in data:
-            data[payee_id] = {"balance": 0, "cash": 0}
-        if "cash" not in data[payer_id]:
-            data[payer_id]["cash"] = 0
-        if "cash" not in data[payee_id]:
-            data[payee_id]["cash"] = 0
 
         if amount <= 0:
             await interaction.response.send_message("Amount must be greater than 0.", ephemeral=True)
             return
 
-        payer_cash = data[payer_id].get("cash", 0)
-        if payer_cash < amount:
-            await interaction.response.send_message(f"Insufficient cash. You have {payer_cash:,}, need {amount:,}.", ephemeral=True)
-            return
+        async with economy.transaction(payer_id, payee_id) as tx:
+            payer_cash = tx[payer_id].get("cash", 0)
+            if payer_cash < amount:
+                await interaction.response.send_message(f"Insufficient cash. You have {payer_cash:,}, need {amount:,}.", ephemeral=True)
+                return
 
-        # Transfer
-        data[payer_id]["cash"] = payer_cash - amount
-        data[payee_id]["cash"] = data[payee_id].get("cash", 0) + amount
-        save_data(data)
+            # Transfer
+            tx[payer_id]["cash"] = payer_cash - amount
+            tx[payee_id]["cash"] = tx[payee_id].get("cash", 0) + amount
 
         await interaction.response.send_message(f"💵 Transferred {amount:,} cash to {user.display_name}.", ephemeral=False)
 
@@ -291,13 +281,6 @@ class GeneralCog(commands.Cog):
             
         payer_id = str(interaction.user.id)
         payee_id = str(user.id)
-        data = load_data()
-
-        # Ensure records exist
-        if payer_id not in data:
-            data[payer_id] = {"balance": 0, "cash": 0}
-        if payee_id not in data:
-            data[payee_id] = {"balance": 0, "cash": 0}
 
         if amount <= 0:
             await interaction.response.send_message("Amount must be greater than 0.", ephemeral=True)
@@ -306,18 +289,18 @@ class GeneralCog(commands.Cog):
         fee = int(amount * 0.10)
         total_cost = amount + fee
         
-        payer_bank = data[payer_id].get("balance", 0)
-        if payer_bank < total_cost:
-            await interaction.response.send_message(
-                f"Insufficient bank funds. Need {total_cost:,} (transfer: {amount:,} + fee: {fee:,}), have {payer_bank:,}.",
-                ephemeral=True
-            )
-            return
+        async with economy.transaction(payer_id, payee_id) as tx:
+            payer_bank = tx[payer_id].get("balance", 0)
+            if payer_bank < total_cost:
+                await interaction.response.send_message(
+                    f"Insufficient bank funds. Need {total_cost:,} (transfer: {amount:,} + fee: {fee:,}), have {payer_bank:,}.",
+                    ephemeral=True
+                )
+                return
 
-        # Transfer
-        data[payer_id]["balance"] = payer_bank - total_cost
-        data[payee_id]["balance"] = data[payee_id].get("balance", 0) + amount
-        save_data(data)
+            # Transfer
+            tx[payer_id]["balance"] = payer_bank - total_cost
+            tx[payee_id]["balance"] = tx[payee_id].get("balance", 0) + amount
 
         await interaction.response.send_message(f"🏦 Transferred {amount:,} bank money to {user.display_name} (fee: {fee:,}).", ephemeral=False)
 
@@ -337,7 +320,7 @@ class GeneralCog(commands.Cog):
         has_allowed_role = any(role.name.lower() in [r.lower() for r in ALLOWED_ROLES] for role in invoker.roles)
         data = load_data()
         user_id = str(invoker.id)
-        user_record = data.get(user_id, {"balance": 0, "cash": 0, "prestige": 0})
+        user_record = data.user(user_id)
         user_balance = user_record.get("balance", 0)
         user_prestige = user_record.get("prestige", 0)
         
@@ -358,7 +341,7 @@ class GeneralCog(commands.Cog):
             else:
                 user_record["balance"] = user_balance - wheel_cost
                 data[user_id] = user_record
-                save_data(data)
+                save_data(data, user_id)
 
         # Wheel
         options = [(60, "60 seconds"), (300, "5 minutes"), (600, "10 minutes"), (3600, "1 hour"), (86400, "1 day"), (604800, "1 week")]
@@ -376,7 +359,7 @@ class GeneralCog(commands.Cog):
             if not has_allowed_role:
                 user_record["balance"] = user_balance
                 data[user_id] = user_record
-                save_data(data)
+                save_data(data, user_id)
             
 async def setup(bot: commands.Bot):
     print("Loading GeneralCog...")
@@ -16,4 +16,63 @@ STOCK_HISTORY_FILE = "stock_history.json"
 UPDATE_INTERVAL_MINUTES = 20 
 LOTTERY_FILE = "lottery.json"
 OPTIONS_FILE = "options.json"
-AFK_CHANNEL_ID = 574668552557297666
\ No newline at end of file
+CONTRACTS_FILE = "contracts.json"
+DRUG_MARKET_FILE = "drug_market.json"
+AFK_CHANNEL_ID = 574668552557297666
+#how often the in-memory economy is written back to disk
+FLUSH_INTERVAL_SECONDS = config.get("flush_interval_seconds", 30)
+#how often the change log is folded into a fresh snapshot
+COMPACT_INTERVAL_MINUTES = config.get("compact_interval_minutes", 60)
+#"json" keeps everyone in DATA_FILE, "sqlite" uses SQLITE_FILE (migrated from DATA_FILE on first start)
+STORAGE_BACKEND = config.get("storage", "json")
+SQLITE_FILE = config.get("sqlite_file", "economy.db")
+#how the state files are written: "orjson" (compact json), "msgpack" or "json" (indented), see snapshots.py
+SNAPSHOT_FORMAT = config.get("snapshot_format", "orjson")
+#backups of every state file, see backups.py. retention keeps the newest backup of each of the last
+#N hours/days/weeks
+BACKUP_DIR = config.get("backup_dir", "backups")
+BACKUP_INTERVAL_MINUTES = config.get("backup_interval_minutes", 60)
+BACKUP_KEEP_HOURLY = config.get("backup_keep_hourly", 24)
+BACKUP_KEEP_DAILY = config.get("backup_keep_daily", 7)
+BACKUP_KEEP_WEEKLY = config.get("backup_keep_weekly", 8)
+#price history, append-only binary files per symbol, see pricehistory.py. raw ticks and hourly
+#candles older than these many days are dropped (0 keeps them forever), daily/weekly candles stay
+PRICE_HISTORY_DIR = config.get("price_history_dir", "price_history")
+PRICE_HISTORY_RAW_DAYS = config.get("price_history_raw_days", 30)
+PRICE_HISTORY_HOURLY_DAYS = config.get("price_history_hourly_days", 365)
+#/stocks charts are drawn in this many worker processes, the newest CHART_CACHE_SIZE are kept
+CHART_WORKERS = config.get("chart_workers", 2)
+CHART_CACHE_SIZE = config.get("chart_cache_size", 64)
+#resting limit/stop orders, see orders.py
+ORDERS_FILE = "orders.json"
+#per-user net worth samples taken after every price update, see networthhistory.py. raw samples
+#and hourly ones older than these many days are dropped (0 keeps them forever), daily ones stay
+NETWORTH_HISTORY_DIR = config.get("networth_history_dir", "networth_history")
+NETWORTH_HISTORY_RAW_DAYS = config.get("networth_history_raw_days", 2)
+NETWORTH_HISTORY_HOURLY_DAYS = config.get("networth_history_hourly_days", 30)
+#price alerts, see alerts.py. fired alerts are DMed at most this many users a second
+ALERTS_FILE = "alerts.json"
+ALERT_DMS_PER_SECOND = config.get("alert_dms_per_second", 5)
+#margin positions, see margin.py. loans grow by margin_interest_daily a day, compounded, and a
+#position is liquidated once its equity is under margin_maintenance of its value
+MARGIN_FILE = "margin.json"
+MARGIN_INTEREST_DAILY = config.get("margin_interest_daily", 0.002)
+MARGIN_MAINTENANCE = config.get("margin_maintenance", 0.25)
+MARGIN_MAX_LEVERAGE = config.get("margin_max_leverage", 3)
+#short positions, see shorts.py. shorting holds the proceeds plus short_margin of the value as
+#collateral, short_fee_daily of the value is charged a day and a short is bought in once its
+#collateral is under short_maintenance times its value
+SHORTS_FILE = "shorts.json"
+SHORT_FEE_DAILY = config.get("short_fee_daily", 0.003)
+SHORT_MARGIN = config.get("short_margin", 0.5)
+SHORT_MAINTENANCE = config.get("short_maintenance", 1.25)
+#index fund baskets priced from other symbols, see baskets.py. edited by hand
+BASKETS_FILE = config.get("baskets_file", "baskets.json")
+#market impact, see liquidity.py. spending liquidity_budget Beaned Bucks of a symbol in one tick
+#doubles the price it fills at (liquidity_budgets overrides it per symbol), buys pay half the
+#spread over the price and sells get half under it, and a tick's net buying or selling of a whole
+#budget moves the next update by volume_drift (as a log return), less of it proportionally less
+LIQUIDITY_BUDGET = config.get("liquidity_budget", 250000)
+LIQUIDITY_BUDGETS = config.get("liquidity_budgets", {})
+SPREAD = config.get("spread", 0.002)
+VOLUME_DRIFT = config.get("volume_drift", 0.2)
@@ -20,7 +20,7 @@ class HelpCog(commands.Cog):
         
         general = (
             "**/balance [user]** - Check your Beaned Bucks balance (defaults to your own).\n"
-            "**/leaderboard [category]** - Check the networth, prestige, time, timealone, or timeafk leaderboards.\n" 
+            "**/leaderboard [category] [page] [me]** - Check the networth, prestige, time, timealone, or timeafk leaderboards, any page or the one with your rank.\n" 
             "**/daily** - Get your daily beaned bucks.\n"
             "**/dailyboost** - Get your daily beaned bucks. (boosters only)\n"
             "**/work** - Work for Beaned Bucks every 10 minutes.\n"
@@ -41,10 +41,23 @@ class HelpCog(commands.Cog):
         
         stocks = (
             "**/portfolio [user]** - Check your stock portfolio and profit (invested vs. earned).\n"
-            "**/stocks [stock]** - View current stock prices or a specific stock's history.\n"
-            "**/stockbuy [stock] [amount]** - Buy stock using your Beaned Bucks.\n"
+            "**/networth [user] [range]** - Chart net worth over 1d, 1w, 1m, 1y or all.\n"
+            "**/stocks [stock] [timeframe] [period] [style]** - View current stock prices or a specific stock's history and chart (1h/1d/1w candles with a timeframe, chart period 1d/1w/1m/1y/all, line or candle).\n"
+            "**/stockbuy [stock] [amount] [leverage]** - Buy stock using your Beaned Bucks, optionally on margin (up to 3x, borrowing the rest).\n"
             "**/stocksell [stock] [quantity]** - Sell a specific stock in shares.\n"
-            "**/stockgive [stock] [quantity] [user]** - Give a stock to another user."
+            "**/stockgive [stock] [quantity] [user]** - Give a stock to another user.\n"
+            "Index funds (baskets of other stocks, see /stocks [basket]) trade like any stock.\n"
+            "Big orders move the price they fill at, each stock only has so much liquidity between price updates."
+        )
+
+        trading = (
+            "**/trade [legs]** - Several buys and sells at once at the same prices, e.g. `buy INK 5000, sell BEANEDCOIN all, buy ACME 25%`. All or nothing.\n"
+            "**/stockorder [kind] [stock] [price] [amount]** - Place a limit buy, limit sell (take profit) or stop loss order, filled after the next price update that reaches it.\n"
+            "**/orders [cancel]** - List your open orders, or cancel one (or 'all').\n"
+            "**/stockshort [stock] [quantity]** / **/stockcover [stock] [quantity]** - Short a stock against collateral (borrow fee charged daily), or buy it back.\n"
+            "**/margin [close]** - List your margin positions with their loans and liquidation prices, or close one (or 'all').\n"
+            "**/alert add [stock] [price]** - Get a DM once a stock reaches a price (or a change like +20% / -50%).\n"
+            "**/alert list** / **/alert remove [number]** - List your price alerts, or remove one (or 'all')."
         )
         
         lottery = (
@@ -93,6 +106,7 @@ class HelpCog(commands.Cog):
         embed.add_field(name="Role Management", value=roles, inline=False)
         embed.add_field(name="Gambling", value=gambling, inline=False)
         embed.add_field(name="Stocks", value=stocks, inline=False)
+        embed.add_field(name="Trading", value=trading, inline=False)
         embed.add_field(name="Lottery", value=lottery, inline=False)
         embed.add_field(name="Crypto Mining", value=crypto, inline=False)
         embed.add_field(name="Industry", value=industry, inline=False)
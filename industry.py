@@ -8,44 +8,44 @@ import datetime
 import asyncio
 from zoneinfo import ZoneInfo
 from typing import Optional
-from globals import GUILD_ID
+from globals import GUILD_ID, CONTRACTS_FILE, DRUG_MARKET_FILE
 from utils import load_data, save_data
+import economy
+import snapshots
+import filecache
+import fileio
+import copy
 
 # --- Helper functions to load our JSON configurations ---
 STORE_FILE = "industriesstore.json"  
 INDUSTRIES_FILE = "industries.json"  
-CONTRACTS_FILE = "contracts.json"  
 
 def load_industry_store():
     if not os.path.exists(STORE_FILE):
         raise FileNotFoundError(f"{STORE_FILE} not found.")
-    with open(STORE_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            raise ValueError("Store JSON file is invalid.")
+    try:
+        #read-only config, shared with every caller
+        return filecache.load(STORE_FILE, parse=json.loads)
+    except json.JSONDecodeError:
+        raise ValueError("Store JSON file is invalid.")
 
 def load_industries():
     if not os.path.exists(INDUSTRIES_FILE):
         raise FileNotFoundError(f"{INDUSTRIES_FILE} not found.")
-    with open(INDUSTRIES_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            raise ValueError("Industries JSON file is invalid.")
+    try:
+        return filecache.load(INDUSTRIES_FILE, parse=json.loads)
+    except json.JSONDecodeError:
+        raise ValueError("Industries JSON file is invalid.")
 
 def load_contracts():
-    if not os.path.exists(CONTRACTS_FILE):
+    #goes by what snapshots sees rather than os.path.exists, a first save can still be queued
+    try:
+        return snapshots.load(CONTRACTS_FILE)
+    except (FileNotFoundError, ValueError):
         return []
-    with open(CONTRACTS_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
 
 def save_contracts(contracts):
-    with open(CONTRACTS_FILE, "w") as f:
-        json.dump(contracts, f, indent=4)
+    snapshots.save(CONTRACTS_FILE, contracts)
 
 
 # --- Industry Cog (as a regular Cog, not a group cog) ---
@@ -62,107 +62,111 @@ class IndustryGroup(commands.Cog):
         super().__init__()
 
     async def hourly_production(self):
+        #one short transaction per user, so commands for everyone else keep running
         data = load_data()
-        for user_id, record in data.items():
-            facilities = record.get("facilities", {})
-            inventory = record.get("inventory", {})
+        for user_id in list(data):
+            if not data.get(user_id, {}).get("facilities"):
+                continue
+            async with economy.transaction(user_id) as tx:
+                record = tx[user_id]
+                facilities = record.get("facilities", {})
+                inventory = record.get("inventory", {})
             
-            for facility_name, facility_value in facilities.items():
-                # Get facility definition from the facilities dict
-                facility_def = self.industries.get("facilities", {}).get(facility_name)
-                if facility_def is None:
-                    continue
+                for facility_name, facility_value in facilities.items():
+                    # Get facility definition from the facilities dict
+                    facility_def = self.industries.get("facilities", {}).get(facility_name)
+                    if facility_def is None:
+                        continue
                     
-                category = facility_def.get("category", "raw")
+                    category = facility_def.get("category", "raw")
                 
-                if category == "oil":
-                    # Oil drilling logic (unchanged)
-                    new_wells = []
-                    total_extracted = 0
-                    for well in facility_value:
-                        remaining = well["capacity"] - well["extracted"]
-                        if remaining <= 0:
-                            continue
-                        extract = min(50, remaining)
-                        well["extracted"] += extract
-                        total_extracted += extract
-                        if well["extracted"] < well["capacity"]:
-                            new_wells.append(well)
-                    record["facilities"][facility_name] = new_wells
-                    inventory["oil"] = inventory.get("oil", 0) + total_extracted
+                    if category == "oil":
+                        # Oil drilling logic (unchanged)
+                        new_wells = []
+                        total_extracted = 0
+                        for well in facility_value:
+                            remaining = well["capacity"] - well["extracted"]
+                            if remaining <= 0:
+                                continue
+                            extract = min(50, remaining)
+                            well["extracted"] += extract
+                            total_extracted += extract
+                            if well["extracted"] < well["capacity"]:
+                                new_wells.append(well)
+                        record["facilities"][facility_name] = new_wells
+                        inventory["oil"] = inventory.get("oil", 0) + total_extracted
                     
-                elif category == "raw":
-                    # Raw resource production (mines, farms, etc.)
-                    count = facility_value
+                    elif category == "raw":
+                        # Raw resource production (mines, farms, etc.)
+                        count = facility_value
                     
-                    # Check if we have enough power for powered production
-                    power_available = inventory.get("power", 0)
-                    power_needed = facility_def.get("power_required", 0) * count
+                        # Check if we have enough power for powered production
+                        power_available = inventory.get("power", 0)
+                        power_needed = facility_def.get("power_required", 0) * count
                     
-                    if power_available >= power_needed and power_needed > 0:
-                        # Use powered production and consume power
-                        prod_range = facility_def.get("powered_prod", facility_def.get("base_prod", [0, 0]))
-                        inventory["power"] = power_available - power_needed
-                    else:
-                        # Use base production
-                        prod_range = facility_def.get("base_prod", [0, 0])
+                        if power_available >= power_needed and power_needed > 0:
+                            # Use powered production and consume power
+                            prod_range = facility_def.get("powered_prod", facility_def.get("base_prod", [0, 0]))
+                            inventory["power"] = power_available - power_needed
+                        else:
+                            # Use base production
+                            prod_range = facility_def.get("base_prod", [0, 0])
                     
-                    # Calculate production per facility
-                    prod_per_facility = random.uniform(prod_range[0], prod_range[1])
-                    total_production = prod_per_facility * count
+                        # Calculate production per facility
+                        prod_per_facility = random.uniform(prod_range[0], prod_range[1])
+                        total_production = prod_per_facility * count
                     
-                    # Add to inventory
-                    resource = facility_def.get("resource")
-                    if resource:
-                        inventory[resource] = inventory.get(resource, 0) + total_production
+                        # Add to inventory
+                        resource = facility_def.get("resource")
+                        if resource:
+                            inventory[resource] = inventory.get(resource, 0) + total_production
                         
-                elif category in ["power", "industry"]:
-                    # Power plants and industry facilities
-                    count = facility_value
+                    elif category in ["power", "industry"]:
+                        # Power plants and industry facilities
+                        count = facility_value
                     
-                    # Check consumption requirements
-                    consumption = facility_def.get("consumption", {})
-                    can_produce = True
+                        # Check consumption requirements
+                        consumption = facility_def.get("consumption", {})
+                        can_produce = True
                     
-                    # Check if we have enough of each required resource
-                    for resource, needed_per_facility in consumption.items():
-                        total_needed = needed_per_facility * count
-                        available = inventory.get(resource, 0)
-                        if available < total_needed:
-                            can_produce = False
-                            break
-                    
-                    if can_produce:
-                        # Consume required resources
+                        # Check if we have enough of each required resource
                         for resource, needed_per_facility in consumption.items():
                             total_needed = needed_per_facility * count
-                            inventory[resource] = inventory.get(resource, 0) - total_needed
-                            if inventory[resource] <= 0:
-                                del inventory[resource]
+                            available = inventory.get(resource, 0)
+                            if available < total_needed:
+                                can_produce = False
+                                break
+                    
+                        if can_produce:
+                            # Consume required resources
+                            for resource, needed_per_facility in consumption.items():
+                                total_needed = needed_per_facility * count
+                                inventory[resource] = inventory.get(resource, 0) - total_needed
+                                if inventory[resource] <= 0:
+                                    del inventory[resource]
                         
-                        # Produce outputs
-                        production = facility_def.get("production", {})
-                        if isinstance(production, dict):
-                            # Multiple outputs (like estrogen_lab)
-                            for output_resource, amount_per_facility in production.items():
-                                total_output = amount_per_facility * count
-                                inventory[output_resource] = inventory.get(output_resource, 0) + total_output
-                        else:
-                            # Single output (like coal_power producing just power)
-                            resource = facility_def.get("resource")
-                            if resource:
-                                total_output = production * count
-                                inventory[resource] = inventory.get(resource, 0) + total_output
-
-            record["inventory"] = inventory
-            data[user_id] = record
-        save_data(data)
+                            # Produce outputs
+                            production = facility_def.get("production", {})
+                            if isinstance(production, dict):
+                                # Multiple outputs (like estrogen_lab)
+                                for output_resource, amount_per_facility in production.items():
+                                    total_output = amount_per_facility * count
+                                    inventory[output_resource] = inventory.get(output_resource, 0) + total_output
+                            else:
+                                # Single output (like coal_power producing just power)
+                                resource = facility_def.get("resource")
+                                if resource:
+                                    total_output = production * count
+                                    inventory[resource] = inventory.get(resource, 0) + total_output
+
+                record["inventory"] = inventory
         print("Hourly production completed.")
 
     async def process_contracts(self):
         contracts = load_contracts()
-        data = load_data()
-        updated = False
+        #contracts can be created while the transactions below wait for their locks, so only each
+        #contract's outcome is kept here and merged into a fresh copy of the file at the end
+        outcomes = {}
         for contract in contracts:
             if contract.get("status") != "active":
                 continue
@@ -170,30 +174,33 @@ class IndustryGroup(commands.Cog):
             receiving_id = contract["receiving_user"]
             resource = contract["resource"]
             qty = contract["quantity_per_hour"]
-            offering_record = data.get(offering_id, {"inventory": {}})
-            offering_inventory = offering_record.get("inventory", {})
-            if offering_inventory.get(resource, 0) >= qty:
-                offering_inventory[resource] -= qty
-                if offering_inventory[resource] <= 0:
-                    del offering_inventory[resource]
-                offering_record["inventory"] = offering_inventory
-                data[offering_id] = offering_record
-
-                receiving_record = data.get(receiving_id, {"inventory": {}})
-                receiving_inventory = receiving_record.get("inventory", {})
-                receiving_inventory[resource] = receiving_inventory.get(resource, 0) + qty
-                receiving_record["inventory"] = receiving_inventory
-                data[receiving_id] = receiving_record
-
-                contract["remaining_hours"] -= 1
-                updated = True
-                if contract["remaining_hours"] <= 0:
-                    contract["status"] = "completed"
-            else:
-                contract["status"] = "cancelled"
-                updated = True
-        if updated:
-            save_data(data)
+            async with economy.transaction(offering_id, receiving_id) as tx:
+                offering_record = tx[offering_id]
+                offering_inventory = offering_record.get("inventory", {})
+                if offering_inventory.get(resource, 0) >= qty:
+                    offering_inventory[resource] -= qty
+                    if offering_inventory[resource] <= 0:
+                        del offering_inventory[resource]
+                    offering_record["inventory"] = offering_inventory
+
+                    receiving_record = tx[receiving_id]
+                    receiving_inventory = receiving_record.get("inventory", {})
+                    receiving_inventory[resource] = receiving_inventory.get(resource, 0) + qty
+                    receiving_record["inventory"] = receiving_inventory
+
+                    contract["remaining_hours"] -= 1
+                    if contract["remaining_hours"] <= 0:
+                        contract["status"] = "completed"
+                else:
+                    contract["status"] = "cancelled"
+            outcomes[(contract["contract_id"], contract.get("created_at"))] = (contract["remaining_hours"], contract["status"])
+        if outcomes:
+            #no awaits from here to the save, so nothing can change the file in between
+            contracts = load_contracts()
+            for contract in contracts:
+                outcome = outcomes.get((contract["contract_id"], contract.get("created_at")))
+                if outcome and contract.get("status") == "active":
+                    contract["remaining_hours"], contract["status"] = outcome
             save_contracts(contracts)
         print("Contract processing completed.")
 
@@ -263,7 +270,7 @@ class IndustryGroup(commands.Cog):
 
         data = load_data()
         user_id = str(interaction.user.id)
-        record = data.get(user_id, {"balance": 0, "inventory": {}})
+        record = data.user(user_id)
         balance = record.get("balance", 0)
         if cost > balance:
             await interaction.response.send_message("You do not have enough funds to buy that quantity.", ephemeral=True)
@@ -274,7 +281,7 @@ class IndustryGroup(commands.Cog):
         inventory[resource] = inventory.get(resource, 0) + quantity
         record["inventory"] = inventory
         data[user_id] = record
-        save_data(data)
+        save_data(data, user_id)
         await interaction.response.send_message(f"Purchased {quantity} {resource} for {cost} Beaned Bucks. New balance: {record['balance']}.", ephemeral=False)
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
@@ -293,7 +300,7 @@ class IndustryGroup(commands.Cog):
         
         data = load_data()
         user_id = str(interaction.user.id)
-        record = data.get(user_id, {"balance": 0, "inventory": {}})
+        record = data.user(user_id)
         inventory = record.get("inventory", {})
         available = inventory.get(resource, 0)
         
@@ -321,7 +328,7 @@ class IndustryGroup(commands.Cog):
         record["inventory"] = inventory
         record["balance"] = record.get("balance", 0) + earnings
         data[user_id] = record
-        save_data(data)
+        save_data(data, user_id)
         await interaction.response.send_message(
             f"Sold {sell_quantity} {resource} for {earnings} Beaned Bucks. New balance: {record['balance']}.", ephemeral=False
         )
@@ -348,7 +355,7 @@ class IndustryGroup(commands.Cog):
 
         data = load_data()
         user_id = str(interaction.user.id)
-        record = data.get(user_id, {"balance": 0, "facilities": {}})
+        record = data.user(user_id)
         balance = record.get("balance", 0)
         if balance < build_price:
             await interaction.response.send_message("You do not have enough funds to build this facility.", ephemeral=True)
@@ -387,7 +394,7 @@ class IndustryGroup(commands.Cog):
 
         record["facilities"] = facilities_owned
         data[user_id] = record
-        save_data(data)
+        save_data(data, user_id)
         await interaction.response.send_message(
             f"Successfully built {facility} for {build_price} Beaned Bucks. New balance: {record['balance']}.", 
             ephemeral=False
@@ -430,7 +437,7 @@ class IndustryGroup(commands.Cog):
         target = user or interaction.user
         data = load_data()
         user_id = str(target.id)
-        record = data.get(user_id, {"facilities": {}, "inventory": {}})
+        record = data.user(user_id)
         facilities_owned = record.get("facilities", {})
         inventory = record.get("inventory", {})
 
@@ -502,47 +509,43 @@ class IndustryGroup(commands.Cog):
     )
     async def invtransfer(self, interaction: discord.Interaction, resource: str, quantity: str, target: discord.Member):
         resource = resource.lower()
-        data = load_data()
         sender_id = str(interaction.user.id)
         receiver_id = str(target.id)
-        sender_record = data.get(sender_id, {"inventory": {}})
-        receiver_record = data.get(receiver_id, {"inventory": {}})
-        sender_inventory = sender_record.get("inventory", {})
-        receiver_inventory = receiver_record.get("inventory", {})
-
-        if resource not in sender_inventory:
-            await interaction.response.send_message(f"You do not have any **{resource}** in your inventory.", ephemeral=True)
-            return
-
-        available_qty = sender_inventory.get(resource, 0)
-        if quantity.lower() == "all":
-            transfer_qty = available_qty
-        else:
-            try:
-                transfer_qty = float(quantity)
-            except ValueError:
-                await interaction.response.send_message("Invalid quantity provided. Please provide a number or 'all'.", ephemeral=True)
+        async with economy.transaction(sender_id, receiver_id) as tx:
+            sender_record = tx[sender_id]
+            receiver_record = tx[receiver_id]
+            sender_inventory = sender_record.get("inventory", {})
+            receiver_inventory = receiver_record.get("inventory", {})
+
+            if resource not in sender_inventory:
+                await interaction.response.send_message(f"You do not have any **{resource}** in your inventory.", ephemeral=True)
                 return
 
-        if transfer_qty <= 0:
-            await interaction.response.send_message("You must transfer a positive quantity.", ephemeral=True)
-            return
-
-        if transfer_qty > available_qty:
-            await interaction.response.send_message(f"You do not have enough **{resource}**. You only have {available_qty}.", ephemeral=True)
-            return
+            available_qty = sender_inventory.get(resource, 0)
+            if quantity.lower() == "all":
+                transfer_qty = available_qty
+            else:
+                try:
+                    transfer_qty = float(quantity)
+                except ValueError:
+                    await interaction.response.send_message("Invalid quantity provided. Please provide a number or 'all'.", ephemeral=True)
+                    return
+
+            if transfer_qty <= 0:
+                await interaction.response.send_message("You must transfer a positive quantity.", ephemeral=True)
+                return
 
-        sender_inventory[resource] = available_qty - transfer_qty
-        if sender_inventory[resource] == 0:
-            del sender_inventory[resource]
-        sender_record["inventory"] = sender_inventory
+            if transfer_qty > available_qty:
+                await interaction.response.send_message(f"You do not have enough **{resource}**. You only have {available_qty}.", ephemeral=True)
+                return
 
-        receiver_inventory[resource] = receiver_inventory.get(resource, 0) + transfer_qty
-        receiver_record["inventory"] = receiver_inventory
+            sender_inventory[resource] = available_qty - transfer_qty
+            if sender_inventory[resource] == 0:
+                del sender_inventory[resource]
+            sender_record["inventory"] = sender_inventory
 
-        data[sender_id] = sender_record
-        data[receiver_id] = receiver_record
-        save_data(data)
+            receiver_inventory[resource] = receiver_inventory.get(resource, 0) + transfer_qty
+            receiver_record["inventory"] = receiver_inventory
 
         await interaction.response.send_message(f"Successfully transferred {transfer_qty} of **{resource}** to {target.display_name}.", ephemeral=False)
 
@@ -575,7 +578,7 @@ class IndustryGroup(commands.Cog):
         industry_key = industry.lower()
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "facilities": {}})
+        user_record = data.user(user_id)
         user_facilities = user_record.get("facilities", {})
 
         if industry_key not in user_facilities or user_facilities[industry_key] <= 0:
@@ -619,7 +622,7 @@ class IndustryGroup(commands.Cog):
         user_record["facilities"] = user_facilities
         user_record["balance"] += sale_value
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
 
         await interaction.response.send_message(f"Successfully sold {sell_quantity} {industry} facility(ies) for {sale_value} Beaned Bucks (half price).", ephemeral=False)
 class DrugMarket:
@@ -630,16 +633,15 @@ class DrugMarket:
     def load_drug_prices(self):
         """Load base drug prices from drugprice.json"""
         try:
-            with open('drugprice.json', 'r') as f:
-                data = json.load(f)
-                # Convert format from {buy_price, sell_price} to {buy, sell}
-                converted = {}
-                for drug, prices in data.items():
-                    converted[drug] = {
-                        "buy": prices["buy_price"],
-                        "sell": prices["sell_price"]
-                    }
-                return converted
+            data = json.loads(fileio.read('drugprice.json'))
+            # Convert format from {buy_price, sell_price} to {buy, sell}
+            converted = {}
+            for drug, prices in data.items():
+                converted[drug] = {
+                    "buy": prices["buy_price"],
+                    "sell": prices["sell_price"]
+                }
+            return converted
         except:
             # Fallback to default prices if file doesn't exist
             return {
@@ -652,8 +654,7 @@ class DrugMarket:
     def get_market_data(self):
         """Load or create market data"""
         try:
-            with open('drug_market.json', 'r') as f:
-                return json.load(f)
+            return filecache.load(DRUG_MARKET_FILE, copy=copy.deepcopy)
         except:
             # Default market data
             default_data = {}
@@ -668,8 +669,7 @@ class DrugMarket:
     
     def save_market_data(self, data):
         """Save market data"""
-        with open('drug_market.json', 'w') as f:
-            json.dump(data, f)
+        filecache.save(DRUG_MARKET_FILE, data, copy=copy.deepcopy)
     
     def clean_old_sales(self, market_data):
         """Remove sales older than 3 days and update prices"""
@@ -772,10 +772,10 @@ def sell_drugs(user_id, drug, quantity):
         
         # Update user money
         data = load_data()
-        user_record = data.get(user_id, {"balance": 0, "cash": 0})
+        user_record = data.user(user_id)
         user_record["cash"] = user_record.get("cash", 0) + earnings
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         return earnings, sell_price
     
@@ -803,7 +803,7 @@ async def buydrug(interaction: discord.Interaction, drug: str, quantity: int):
     
     # Load user data
     data = load_data()
-    user_record = data.get(user_id, {"balance": 0, "cash": 0, "inventory": {}})
+    user_record = data.user(user_id)
     user_cash = user_record.get("cash", 0)
     
     if user_cash < total_cost:
@@ -820,7 +820,7 @@ async def buydrug(interaction: discord.Interaction, drug: str, quantity: int):
     user_record["inventory"][drug] = user_record["inventory"].get(drug, 0) + quantity
     
     data[user_id] = user_record
-    save_data(data)
+    save_data(data, user_id)
     
     await interaction.response.send_message(
         f"💰 Bought {quantity} {drug.replace('_', ' ')} for {total_cost:,} cash!\n"
@@ -847,7 +847,7 @@ async def selldrug(interaction: discord.Interaction, drug: str, quantity: int):
     
     # Load user data
     data = load_data()
-    user_record = data.get(user_id, {"balance": 0, "cash": 0, "inventory": {}})
+    user_record = data.user(user_id)
     user_inventory = user_record.get("inventory", {})
     current_amount = user_inventory.get(drug, 0)
     
@@ -870,7 +870,7 @@ async def selldrug(interaction: discord.Interaction, drug: str, quantity: int):
         del user_record["inventory"][drug]
     
     data[user_id] = user_record
-    save_data(data)
+    save_data(data, user_id)
     
     # Record the sale for market tracking
     drug_market.record_sale(drug, quantity)
@@ -885,7 +885,7 @@ async def selldrug(interaction: discord.Interaction, drug: str, quantity: int):
 async def drugs(interaction: discord.Interaction):
     user_id = str(interaction.user.id)
     data = load_data()
-    user_record = data.get(user_id, {"inventory": {}})
+    user_record = data.user(user_id)
     inventory = user_record.get("inventory", {})
     
     # Filter only drug items
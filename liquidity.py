@@ -0,0 +1,121 @@
+#market impact: trades at the market price fill along a price curve instead of all at the posted
+#price, so nobody can move any size in one go. each symbol has a liquidity budget per tick, and
+#the price a share fills at grows exponentially with the net shares traded so far this tick:
+#
+#    fill price = price * (1 +- spread / 2) * e^(x / K)      K = budget / price shares
+#
+#x is the net shares bought (minus sold) since the last market update, so spending the whole
+#budget at once doubles the fill price, and the next buyer in the same tick starts where the last
+#one left off. the curve integrates in closed form: buying shares from x to x + q costs
+#
+#    ask * K * (e^((x + q) / K) - e^(x / K))
+#
+#selling q shares gets bid * K * (e^(x / K) - e^((x - q) / K)), which never reaches
+#bid * K * e^(x / K) however much is sold, and spending A bucks buys
+#
+#    q = K * ln(e^(x / K) + A / (ask * K)) - x
+#
+#shares, so a fill is a few exp/log calls whatever its size. the posted price doesn't move within a
+#tick, the tick's flow does: update_stock_prices gets each symbol's net pressure as a drift term
+#and the volume traded goes into the price history. flows are kept in memory only, a restart
+#starts the tick over.
+import math
+import numpy as np
+from globals import LIQUIDITY_BUDGET, LIQUIDITY_BUDGETS, SPREAD, VOLUME_DRIFT
+
+#symbol -> net shares traded this tick, bought positive
+_flow = {}
+#symbol -> Beaned Bucks traded this tick, both sides
+_volume = {}
+
+
+def _exp(x):
+    try:
+        return math.exp(x)
+    except OverflowError:
+        return math.inf
+
+
+def depth(symbol, price):
+    """K, the shares of symbol that move its fill price by a factor of e at price."""
+    return LIQUIDITY_BUDGETS.get(symbol, LIQUIDITY_BUDGET) / price
+
+
+def flow(symbol):
+    """Net shares of symbol bought this tick, negative if more were sold."""
+    return _flow.get(symbol, 0.0)
+
+
+def volume(symbol):
+    """Beaned Bucks of symbol traded this tick."""
+    return _volume.get(symbol, 0.0)
+
+
+def quote_buy(symbol, price, amount, x=None):
+    """Shares amount Beaned Bucks buy at price, after x net shares (this tick's flow by default)."""
+    x = flow(symbol) if x is None else x
+    k = depth(symbol, price)
+    ask = price * (1 + SPREAD / 2)
+    #ln(e^(x/K) + A/(ask*K)) without overflowing e^(x/K)
+    return k * float(np.logaddexp(x / k, math.log(amount / (ask * k)))) - x
+
+
+def quote_cost(symbol, price, shares, x=None):
+    """What buying shares back costs at price, after x net shares (this tick's flow by default)."""
+    x = flow(symbol) if x is None else x
+    k = depth(symbol, price)
+    return price * (1 + SPREAD / 2) * k * _exp(x / k) * math.expm1(min(shares / k, 700))
+
+
+def quote_sell(symbol, price, shares, x=None):
+    """What selling shares gets at price, after x net shares (this tick's flow by default)."""
+    x = flow(symbol) if x is None else x
+    k = depth(symbol, price)
+    return price * (1 - SPREAD / 2) * k * _exp(x / k) * -math.expm1(-shares / k)
+
+
+def record(symbol, shares, value):
+    """Count a fill of shares (negative for a sale) worth value towards this tick's flow and volume."""
+    _flow[symbol] = _flow.get(symbol, 0.0) + shares
+    _volume[symbol] = _volume.get(symbol, 0.0) + abs(value)
+
+
+def buy(symbol, price, amount):
+    """Spend amount on symbol at the market. Returns the shares bought."""
+    shares = quote_buy(symbol, price, amount)
+    record(symbol, shares, amount)
+    return shares
+
+
+def buy_back(symbol, price, shares):
+    """Buy shares of symbol at the market. Returns the cost, rounded to a cent."""
+    cost = round(quote_cost(symbol, price, shares), 2)
+    record(symbol, shares, cost)
+    return cost
+
+
+def sell(symbol, price, shares):
+    """Sell shares of symbol at the market. Returns the proceeds, rounded to a cent."""
+    proceeds = round(quote_sell(symbol, price, shares), 2)
+    record(symbol, -shares, proceeds)
+    return proceeds
+
+
+def close_tick(symbols, prices):
+    """End the tick: (drift, volumes) for the next market update, and start a new one.
+
+    drift is an array of log returns in symbols order, prices the ones the tick traded at:
+    net buying (selling) of a whole budget, or more, adds (takes off) VOLUME_DRIFT. volumes is
+    {symbol: Beaned Bucks traded} of every symbol that traded, baskets included.
+    """
+    drift = np.zeros(len(symbols))
+    for i, (symbol, price) in enumerate(zip(symbols, prices)):
+        x = _flow.get(symbol)
+        if x and price > 0:
+            #log2 of how far the fill price was pushed
+            pressure = x / depth(symbol, price) / math.log(2)
+            drift[i] = VOLUME_DRIFT * min(max(pressure, -1.0), 1.0)
+    volumes = {symbol: round(value, 2) for symbol, value in _volume.items() if value > 0}
+    _flow.clear()
+    _volume.clear()
+    return drift, volumes
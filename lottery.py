@@ -2,7 +2,6 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
 import os
 import random
 import datetime
@@ -10,24 +9,23 @@ import asyncio
 from zoneinfo import ZoneInfo
 from globals import LOTTERY_FILE, GUILD_ID, ALLOWED_ROLES
 from utils import load_data, save_data
+import snapshots
 
 def load_lottery():
     try:
-        with open(LOTTERY_FILE, "r") as f:
-            data = json.load(f)
-            if "Jackpot" not in data:
-                data["Jackpot"] = 100000
-            if "Tickets" not in data:
-                data["Tickets"] = []
-            return data
-    except (FileNotFoundError, json.JSONDecodeError):
+        data = snapshots.load(LOTTERY_FILE)
+        if "Jackpot" not in data:
+            data["Jackpot"] = 100000
+        if "Tickets" not in data:
+            data["Tickets"] = []
+        return data
+    except (FileNotFoundError, ValueError):
         default_data = {"Jackpot": 100000, "Tickets": []}
         save_lottery(default_data)
         return default_data
 
 def save_lottery(data):
-    with open(LOTTERY_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    snapshots.save(LOTTERY_FILE, data)
 
 def lottery_draw():
     lottery_data = load_lottery()
@@ -92,14 +90,14 @@ class LotteryCog(commands.Cog):
 
         user_data = load_data()
         user_id = str(interaction.user.id)
-        user_record = user_data.get(user_id, {"balance": 0})
+        user_record = user_data.user(user_id)
         if user_record.get("balance", 0) < 5000:
             await interaction.response.send_message("You do not have enough Beaned Bucks to buy a lottery ticket.", ephemeral=True)
             return
 
         user_record["balance"] -= 5000
         user_data[user_id] = user_record
-        save_data(user_data)
+        save_data(user_data, user_id)
 
         lottery_data = load_lottery()
         lottery_data["Jackpot"] = lottery_data.get("Jackpot", 100000) + 5000
@@ -127,13 +125,13 @@ class LotteryCog(commands.Cog):
         winners_msg = ""
         if payouts:
             for uid, amount in payouts.items():
-                record = user_data.get(uid, {"balance": 0})
+                record = user_data.user(uid)
                 record["balance"] = record.get("balance", 0) + amount
                 user_data[uid] = record
                 member = interaction.guild.get_member(int(uid))
                 name = member.display_name if member else f"User {uid}"
                 winners_msg += f"{name} wins {amount:.2f} Beaned Bucks.\n"
-            save_data(user_data)
+            save_data(user_data, *payouts)
         else:
             winners_msg = "No winning tickets this draw."
         await interaction.response.send_message(f"Drawn Numbers: {drawn_numbers}\n{winners_msg}")
@@ -144,13 +142,13 @@ class LotteryCog(commands.Cog):
         winners_msg = ""
         if payouts:
             for uid, amount in payouts.items():
-                record = user_data.get(uid, {"balance": 0})
+                record = user_data.user(uid)
                 record["balance"] = record.get("balance", 0) + amount
                 user_data[uid] = record
                 member = self.bot.get_guild(GUILD_ID).get_member(int(uid))
                 name = member.display_name if member else f"User {uid}"
                 winners_msg += f"{name} wins {amount:.2f} Beaned Bucks.\n"
-            save_data(user_data)
+            save_data(user_data, *payouts)
         else:
             winners_msg = "No winning tickets this draw."
         channel = discord.utils.get(self.bot.get_all_channels(), name="bot-output")
@@ -0,0 +1,201 @@
+#margin positions: /stockbuy with leverage buys leverage times the bucks put in, the rest is a
+#loan from the bank. the shares are held by the position (not the portfolio) as collateral until
+#it's closed with /margin or liquidated.
+#
+#loans grow by margin_interest_daily, compounded. instead of touching every loan each tick, a
+#position keeps its debt in units of a global borrow index and the index is what grows: a loan is
+#debt * borrow_index(), so accruing interest for everyone is one multiplication.
+#
+#a position is liquidated once its equity (shares * price - loan) falls under margin_maintenance
+#of its value, i.e. once the price is under
+#
+#    loan / (shares * (1 - maintenance)) = debt / (shares * (1 - maintenance)) * borrow index
+#
+#the first factor never changes while the position is open, so each symbol keeps its positions in
+#a list sorted by it (highest first) and a tick finds every position to liquidate with one bisect
+#at price / borrow index, O(log n + liquidated), without valuing anyone's account.
+#the positions are kept in memory and written to MARGIN_FILE whenever they change. liquidations
+#sell at the tick's price, positions opened and closed by hand fill along liquidity.py's curve.
+import datetime
+import math
+import os
+from sortedcontainers import SortedList
+from globals import MARGIN_FILE, MARGIN_INTEREST_DAILY, MARGIN_MAINTENANCE, MARGIN_MAX_LEVERAGE
+import economy
+import liquidity
+import snapshots
+
+MAX_POSITIONS_PER_USER = 10
+
+_positions = None
+#symbol -> SortedList of (-liquidation key, position id), the first to liquidate first
+_sorted = {}
+#user id -> set of their position ids
+_by_user = {}
+_next_id = 1
+_borrow_index = 1.0
+_accrued_at = None
+
+
+def _key(position):
+    """The liquidation price of the position divided by the borrow index, fixed while it's open."""
+    return position["debt"] / (position["shares"] * (1 - MARGIN_MAINTENANCE))
+
+
+def _index(position):
+    _sorted.setdefault(position["symbol"], SortedList()).add((-_key(position), position["id"]))
+    _by_user.setdefault(position["user_id"], set()).add(position["id"])
+
+
+def _unindex(position):
+    ids = _by_user.get(position["user_id"])
+    if ids is not None:
+        ids.discard(position["id"])
+        if not ids:
+            del _by_user[position["user_id"]]
+
+
+def load():
+    """The open positions, {position id: position}. Read from MARGIN_FILE on first use."""
+    global _positions, _next_id, _borrow_index, _accrued_at
+    if _positions is None:
+        saved = {}
+        if os.path.exists(MARGIN_FILE):
+            try:
+                saved = snapshots.load(MARGIN_FILE)
+            except ValueError:
+                print(f"{MARGIN_FILE} is unreadable, starting with no margin positions.")
+        _positions = {}
+        for position in saved.get("positions", []):
+            _positions[position["id"]] = position
+            _index(position)
+        _next_id = saved.get("next_id", max(_positions, default=0) + 1)
+        _borrow_index = saved.get("borrow_index", 1.0)
+        _accrued_at = saved.get("accrued_at") or datetime.datetime.now().isoformat()
+    return _positions
+
+
+def save():
+    snapshots.save(MARGIN_FILE, {"next_id": _next_id, "borrow_index": _borrow_index, "accrued_at": _accrued_at,
+                                 "positions": list(load().values())})
+
+
+def borrow_index():
+    load()
+    return _borrow_index
+
+
+def accrue(now=None):
+    """Grow every loan by the interest since the last call."""
+    global _borrow_index, _accrued_at
+    load()
+    now = now or datetime.datetime.now()
+    days = (now - datetime.datetime.fromisoformat(_accrued_at)).total_seconds() / 86400
+    if days <= 0:
+        return
+    _borrow_index *= (1 + MARGIN_INTEREST_DAILY) ** days
+    _accrued_at = now.isoformat()
+    save()
+
+
+def loan(position):
+    """What the position owes right now."""
+    return position["debt"] * borrow_index()
+
+
+def liquidation_price(position):
+    return _key(position) * borrow_index()
+
+
+def user_positions(user_id):
+    """The user's open positions, oldest first."""
+    positions = load()
+    return [positions[position_id] for position_id in sorted(_by_user.get(str(user_id), ()))]
+
+
+def open_position(user_id, symbol, price, equity, leverage):
+    """Buy equity * leverage worth of symbol at price with equity from the user and the rest borrowed.
+
+    price is what the shares filled at on average. The caller has already taken equity from the user. Raises ValueError if the leverage is out of range.
+    """
+    global _next_id
+    if not 1 < leverage <= MARGIN_MAX_LEVERAGE:
+        raise ValueError(f"Leverage must be over 1 and at most {MARGIN_MAX_LEVERAGE}.")
+    positions = load()
+    borrowed = equity * (leverage - 1)
+    position = {
+        "id": _next_id,
+        "user_id": str(user_id),
+        "symbol": symbol,
+        "shares": equity * leverage / price,
+        "price": price,
+        "equity": equity,
+        "borrowed": borrowed,
+        "debt": borrowed / _borrow_index,
+        "opened": datetime.datetime.now().isoformat(),
+    }
+    _next_id += 1
+    positions[position["id"]] = position
+    _index(position)
+    save()
+    return position
+
+
+def close(position_id, user_id=None):
+    """Take a position out of the book and return it, None if there's no such position (or it's not user_id's)."""
+    positions = load()
+    position = positions.get(position_id)
+    if position is None or (user_id is not None and position["user_id"] != str(user_id)):
+        return None
+    del positions[position_id]
+    _unindex(position)
+    _sorted[position["symbol"]].remove((-_key(position), position_id))
+    save()
+    return position
+
+
+def pay_out(record, position, sale):
+    """Repay a closed position's loan out of sale, what its shares sold for, and credit what's left. Returns (owed, paid)."""
+    owed = round(loan(position), 2)
+    #a price that gapped through the liquidation price leaves a shortfall, the bank eats it
+    paid = max(0.0, sale - owed)
+    record["balance"] = record.get("balance", 0) + paid
+    record["total_earned"] = record.get("total_earned", 0) + paid
+    return owed, paid
+
+
+def check(prices):
+    """Take out every position the new prices ({symbol: price}) put under maintenance. Returns [(position, price)]."""
+    positions = load()
+    liquidated = []
+    for symbol, ranked in _sorted.items():
+        price = prices.get(symbol)
+        if price is None or not ranked:
+            continue
+        #key > price / borrow index, i.e. the price is under the position's liquidation price
+        end = ranked.bisect_left((-price / _borrow_index, -math.inf))
+        if not end:
+            continue
+        for _, position_id in ranked[:end]:
+            position = positions.pop(position_id)
+            _unindex(position)
+            liquidated.append((position, price))
+        del ranked[:end]
+    if liquidated:
+        save()
+    return liquidated
+
+
+async def settle(liquidated):
+    """Sell out positions from check() in one transaction. Returns one line per position for the market update."""
+    lines = []
+    if not liquidated:
+        return lines
+    async with economy.transaction(*{position["user_id"] for position, _ in liquidated}) as tx:
+        for position, price in liquidated:
+            sale = round(position["shares"] * price, 2)
+            liquidity.record(position["symbol"], -position["shares"], sale)
+            owed, paid = pay_out(tx[position["user_id"]], position, sale)
+            lines.append(f"<@{position['user_id']}> #{position['id']} {position['shares']:.4f} {position['symbol']} "
+                         f"sold at {price} for {sale}, repaid {owed}, returned {paid}")
+    return lines
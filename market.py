@@ -0,0 +1,132 @@
+#vectorized price engine behind stocks.update_stock_prices. every symbol's move is drawn from the
+#same distributions the old per-symbol loop used (cycle phases, rally/crash events, mega moves,
+#the 0.1% extreme events and the recovery boost at the minimum price), but a whole tick is a
+#handful of batched rng calls and array ops, so thousands of tickers cost about the same as ten.
+#python -m benchmarks.market --check compares the two statistically.
+import numpy as np
+
+COIN_MIN = 0.00000001
+STOCK_MIN = 0.01
+
+#cycle phase thresholds on one uniform roll: bubble, crash, recovery, else normal
+CYCLE_EDGES = np.array([0.02, 0.04, 0.06])
+EVENT_HOT = 0.70
+MEGA_MOVE = 0.01
+EXTREME = 0.001
+
+#(low, high, sign) of the uniform change for every case, new = price * (1 + sign * change)
+COIN_RALLY_HOT, COIN_RALLY, COIN_CRASH_HOT, COIN_CRASH = 0, 1, 2, 3
+COIN_BUBBLE = 4  #+ cycle phase: bubble, crash, recovery, normal
+STOCK = 8  #stock cases are the coin cases shifted by 8
+STOCK_MEGA = 16
+CASES = np.array([
+    #coins
+    (0.20, 1.20, 1), (-0.30, 0.50, 1), (0.15, 0.70, -1), (-0.40, 0.30, 1),
+    (0.30, 2.00, 1), (0.40, 0.85, -1), (0.10, 0.60, 1), (-0.70, 1.50, 1),
+    #stocks
+    (0.10, 0.35, 1), (-0.05, 0.15, 1), (0.10, 0.35, -1), (-0.05, 0.10, 1),
+    (0.20, 0.80, 1), (0.25, 0.60, -1), (0.08, 0.40, 1), (-0.12, 0.12, 1),
+    #stock mega move, the sign is its own coin flip
+    (0.40, 1.20, 1),
+])
+
+#market events a tick can start when none is running, with their weights, and how many ticks they last
+EVENTS = (("none", 0.96), ("rally", 0.02), ("crash", 0.02))
+EVENT_DURATION = (1, 3)
+
+_rng = np.random.default_rng()
+#(symbols, mask) of the last call, the symbol list only changes when a ticker is added or removed
+_last_mask = ([], np.zeros(0, dtype=bool))
+
+
+def choose_new_market_event(rng=None, events=EVENTS):
+    """None, or a new {"event": "rally"|"crash", "duration": ticks} drawn from events."""
+    rng = rng or _rng
+    total_weight = sum(weight for event, weight in events)
+    r = rng.random() * total_weight
+    cumulative = 0
+    for event, weight in events:
+        cumulative += weight
+        if r < cumulative:
+            if event == "none":
+                return None
+            return {"event": event, "duration": int(rng.integers(EVENT_DURATION[0], EVENT_DURATION[1] + 1))}
+    return None
+
+
+def advance_market_event(event):
+    """The running event after a tick: its duration counts down and it ends at zero."""
+    if event:
+        event["duration"] -= 1
+        if event["duration"] <= 0:
+            return None
+    return event
+
+
+def coin_mask(symbols):
+    """True for the symbols that move like coins."""
+    global _last_mask
+    if symbols == _last_mask[0]:
+        return _last_mask[1]
+    mask = np.fromiter(("COIN" in s.upper() for s in symbols), dtype=bool, count=len(symbols))
+    mask.flags.writeable = False
+    _last_mask = (list(symbols), mask)
+    return mask
+
+
+def tick(prices, is_coin, event_type=None, rng=None, drift=None):
+    """One market update for every symbol at once.
+
+    drift is an optional log return per symbol added to the random move, the trading pressure
+    from liquidity.close_tick.
+
+    Returns (new_prices, extreme, boost): extreme is the 0.1% mega moon/crash multiplier where one
+    hit and 0 elsewhere, boost is the recovery boost fraction where one was applied and 0 elsewhere.
+    """
+    rng = rng or _rng
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    #one batch of uniforms per roll the old loop made
+    cycle_roll, branch_roll, amount_roll, side_roll, extreme_roll, extreme_side, extreme_amount, boost_roll = rng.random((8, n))
+
+    if event_type == "rally":
+        case = np.where(branch_roll < EVENT_HOT, COIN_RALLY_HOT, COIN_RALLY)
+    elif event_type == "crash":
+        case = np.where(branch_roll < EVENT_HOT, COIN_CRASH_HOT, COIN_CRASH)
+    else:
+        case = COIN_BUBBLE + np.searchsorted(CYCLE_EDGES, cycle_roll, side="right")
+    case = np.where(is_coin, case, case + STOCK)
+    if event_type not in ("rally", "crash"):
+        #normal stock movement has a 1% chance of a 40-120% mega move instead
+        case[(case == STOCK + COIN_BUBBLE + 3) & (branch_roll < MEGA_MOVE)] = STOCK_MEGA
+
+    low, high, sign = CASES[case].T
+    change = low + (high - low) * amount_roll
+    mega = case == STOCK_MEGA
+    #a mega move is a moon or a crash of at most 90%
+    down = mega & (side_roll >= 0.5)
+    change[down] = np.minimum(change[down], 0.90)
+    sign[down] = -1
+    new_prices = prices * (1 + sign * change)
+    if drift is not None:
+        new_prices *= np.exp(drift)
+
+    new_prices = np.where(is_coin, np.maximum(np.round(new_prices, 8), COIN_MIN),
+                          np.maximum(np.round(new_prices, 2), STOCK_MIN))
+
+    #very rare extreme events replace the move: 5-20x moon or an 80-95% crash
+    extreme = np.zeros(n)
+    hit = extreme_roll < EXTREME
+    if hit.any():
+        moon = extreme_side[hit] < 0.5
+        extreme[hit] = np.where(moon, 5.0 + 15.0 * extreme_amount[hit], 0.05 + 0.15 * extreme_amount[hit])
+        new_prices[hit] = prices[hit] * extreme[hit]
+
+    #recovery boost of 20-150% for anything sitting on the minimum
+    boost = np.zeros(n)
+    floored = new_prices <= np.where(is_coin, COIN_MIN, STOCK_MIN)
+    if floored.any():
+        boost[floored] = 0.20 + 1.30 * boost_roll[floored]
+        boosted = new_prices[floored] * (1 + boost[floored])
+        new_prices[floored] = np.where(is_coin[floored], np.round(boosted, 8), np.round(boosted, 2))
+    return new_prices, extreme, boost
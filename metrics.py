@@ -0,0 +1,56 @@
+#event loop lag: a task that asks to wake up every INTERVAL seconds and records how late it was.
+#anything blocking the loop (a big synchronous save, a slow loop body) shows up as lag, and
+#while the loop is blocked discord heartbeats and every other command wait too.
+import asyncio
+import collections
+import time
+
+INTERVAL = 0.1
+#lag above this is printed as it happens
+WARN_SECONDS = 0.25
+
+
+class LoopLagMonitor:
+    def __init__(self, interval=INTERVAL, window=600, warn=WARN_SECONDS):
+        self.interval = interval
+        self.warn = warn
+        #the most recent samples, window * interval seconds worth
+        self.samples = collections.deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if self.warn and lag > self.warn:
+                print(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self):
+        """Lag over the recent window in milliseconds, plus the worst since start."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "max_ever_ms": 0.0}
+        return {
+            "samples": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+            "max_ever_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_lag = LoopLagMonitor()
@@ -0,0 +1,283 @@
+#net worth index behind /leaderboard networth. net worth is balance + graphics cards * 10000 +
+#shares * price, counting the bucks and shares held by open orders (orders.py) as the user's own,
+#margin positions (margin.py) as their shares less the loan, and short positions (shorts.py) as
+#their collateral less the shares owed.
+#
+#every user is a row: the cash part in a vector, their shares in a sparse users x symbols matrix.
+#economy tells the index which users changed (economy.subscribe) and only those rows are
+#recomputed, so a trade costs one user. when prices move every value is recomputed in one
+#sparse matrix x price vector product. the index is brought up to date when it's read, so a
+#burst of trades or a market tick costs nothing until someone looks.
+#
+#the index also keeps each part of a user's wealth apart (bank, cash, GPUs, options, stocks) so
+#networthhistory.py can sample everyone after a price update from the same arrays. margin debt is
+#kept in borrow index units like margin.py does, so interest moves every value the way a price
+#change does, in the same vectorized pass. shorts are negative shares, and the borrow fee they
+#owe is a negative holding of a ("fee", symbol) column priced at the symbol's fee index.
+#
+#the top of the board is kept as a candidate set: the best TOP_K rows when it was built, plus any
+#row that has since climbed past the weakest of them. nobody outside it can be worth more than that
+#floor, so the first page is a sort of ~TOP_K values and the full ranking is only redone when
+#enough candidates have dropped under the floor (or on a price change).
+import numpy as np
+from scipy import sparse
+import economy
+import orders
+import margin
+import shorts
+
+CARD_VALUE = 10000
+TOP_K = 100
+#columns of _parts. the leaderboard counts bank + gpus + stocks, like it always has, less margin debt
+BANK, CASH, GPUS, OPTIONS, DEBT = range(5)
+
+#user id -> row, row -> user id (and as an int64, -1 for ids that aren't numbers)
+_rows = {}
+_uids = []
+_int_ids = np.zeros(0, dtype=np.int64)
+#bank (balance + bucks held by buy orders), cash, card value, option value, margin debt (in borrow
+#index units) per row
+_parts = np.zeros((0, 5))
+#the leaderboard net worth per row
+_values = np.zeros(0)
+#symbol -> column, and the price each column was last valued at
+_cols = {}
+_prices = np.zeros(0)
+#the borrow index debt was last valued at
+_borrow_index = 1.0
+_holdings = sparse.csr_matrix((0, 0))
+#row -> {column: shares} for rows changed since _holdings was last rebuilt
+_changed = {}
+#users changed since the last refresh, None once everything has to be rebuilt
+_pending = None
+_top = set()
+_floor = -np.inf
+
+
+def _on_change(user_ids):
+    global _pending
+    if user_ids is None:
+        _pending = None
+    elif _pending is not None:
+        _pending.update(user_ids)
+
+
+economy.subscribe(_on_change)
+
+
+def _user_row(user_id, record):
+    """([bank, cash, gpus, options, debt], {column: shares}) for one user."""
+    parts = [0.0, 0.0, 0.0, 0.0, 0.0]
+    shares = {}
+    if record is not None:
+        parts[BANK] = float(record.get("balance", 0))
+        parts[CASH] = float(record.get("cash", 0))
+        parts[GPUS] = record.get("graphics_cards", 0) * CARD_VALUE
+        #what the contracts would sell for right now, see options.py
+        parts[OPTIONS] = sum(option.get(f"{option['strategy']}_price", 0) * 100 * option["quantity"]
+                             for option in record.get("options", ()))
+        for symbol, count in record.get("portfolio", {}).items():
+            col = _column(symbol)
+            shares[col] = shares.get(col, 0) + count
+    for order in orders.user_orders(user_id):
+        if order["kind"] == "buy":
+            parts[BANK] += order["amount"]
+        else:
+            col = _column(order["symbol"])
+            shares[col] = shares.get(col, 0) + order["shares"]
+    for position in margin.user_positions(user_id):
+        col = _column(position["symbol"])
+        shares[col] = shares.get(col, 0) + position["shares"]
+        parts[DEBT] += position["debt"]
+    for position in shorts.user_shorts(user_id):
+        col = _column(position["symbol"])
+        shares[col] = shares.get(col, 0) - position["shares"]
+        shares[_column(("fee", position["symbol"]))] = -position["shares"]
+        #collateral now = collateral - shares * (fee index - fee index then)
+        parts[BANK] += position["collateral"] + position["shares"] * position["fee_index"]
+    return parts, shares
+
+
+def _column(symbol):
+    global _prices
+    col = _cols.get(symbol)
+    if col is None:
+        col = _cols[symbol] = len(_cols)
+        #valued at 0 until the next refresh sees a price for it, like the old leaderboard did
+        _prices = np.append(_prices, 0.0)
+    return col
+
+
+def _price_vector(prices):
+    prices = {**prices, **shorts.fee_prices()}
+    for symbol in prices:
+        _column(symbol)
+    return np.fromiter((prices.get(symbol, 0) for symbol in _cols), dtype=np.float64, count=len(_cols))
+
+
+def _int_id(user_id):
+    return int(user_id) if user_id.isdigit() else -1
+
+
+def _worth():
+    """Every row's leaderboard net worth at _prices and _borrow_index."""
+    return _parts[:, BANK] + _parts[:, GPUS] - _parts[:, DEBT] * _borrow_index + _holdings @ _prices
+
+
+def _rebuild(data, prices):
+    global _uids, _int_ids, _parts, _values, _holdings, _prices, _borrow_index, _pending
+    _rows.clear()
+    _cols.clear()
+    _changed.clear()
+    _prices = np.zeros(0)
+    _uids = list(data)
+    _int_ids = np.fromiter(map(_int_id, _uids), dtype=np.int64, count=len(_uids))
+    parts = np.empty((len(_uids), 5))
+    row_ids, col_ids, counts = [], [], []
+    for row, user_id in enumerate(_uids):
+        _rows[user_id] = row
+        parts[row], shares = _user_row(user_id, data[user_id])
+        row_ids.extend([row] * len(shares))
+        col_ids.extend(shares)
+        counts.extend(shares.values())
+    _prices = _price_vector(prices)
+    _borrow_index = margin.borrow_index()
+    _parts = parts
+    _holdings = sparse.csr_matrix((counts, (row_ids, col_ids)), shape=(len(_uids), len(_cols)))
+    _values = _worth()
+    _pending = set()
+    _rank()
+
+
+def _apply_changed():
+    """Fold the rows changed since the last price change into the holdings matrix."""
+    global _holdings
+    shape = (len(_uids), len(_cols))
+    if _holdings.shape != shape:
+        _holdings.resize(shape)
+    if not _changed:
+        return
+    keep = np.ones(shape[0])
+    keep[list(_changed)] = 0
+    row_ids = [row for row, shares in _changed.items() for _ in shares]
+    col_ids = [col for shares in _changed.values() for col in shares]
+    counts = [count for shares in _changed.values() for count in shares.values()]
+    _holdings = (sparse.diags(keep) @ _holdings + sparse.csr_matrix((counts, (row_ids, col_ids)), shape=shape)).tocsr()
+    _holdings.eliminate_zeros()
+    _changed.clear()
+
+
+def _rank():
+    """Rebuild the candidate set from scratch."""
+    global _top, _floor
+    if len(_values) <= TOP_K:
+        _top = set(range(len(_values)))
+        _floor = -np.inf
+        return
+    best = np.argpartition(-_values, TOP_K - 1)[:TOP_K]
+    _top = set(best.tolist())
+    _floor = float(_values[best].min())
+
+
+def refresh(prices):
+    """Bring the index up to date with the economy and prices ({symbol: price})."""
+    global _parts, _values, _prices, _borrow_index, _int_ids
+    data = economy.load()
+    if _pending is None:
+        _rebuild(data, prices)
+        return
+    for user_id in _pending:
+        row = _rows.get(user_id)
+        if row is None:
+            row = _rows[user_id] = len(_uids)
+            _uids.append(user_id)
+            _int_ids = np.append(_int_ids, _int_id(user_id))
+            _parts = np.append(_parts, np.zeros((1, 5)), axis=0)
+            _values = np.append(_values, 0.0)
+        _parts[row], shares = _user_row(user_id, data.get(user_id))
+        _changed[row] = shares
+        _values[row] = (_parts[row, BANK] + _parts[row, GPUS] - _parts[row, DEBT] * _borrow_index
+                        + sum(count * _prices[col] for col, count in shares.items()))
+        if _values[row] > _floor:
+            _top.add(row)
+    _pending.clear()
+
+    new_prices = _price_vector(prices)
+    new_index = margin.borrow_index()
+    if not np.array_equal(new_prices, _prices) or new_index != _borrow_index:
+        _prices = new_prices
+        _borrow_index = new_index
+        _apply_changed()
+        _values = _worth()
+        _rank()
+    elif len(_top) > 2 * TOP_K:
+        _rank()
+
+
+def top(prices, count=10):
+    """The count richest users as [(user id, net worth)], richest first."""
+    refresh(prices)
+    count = min(count, TOP_K, len(_values))
+    for _ in range(2):
+        ranked = sorted(_top, key=lambda row: -_values[row])
+        #rows under the floor may be outranked by someone outside the set
+        if count == 0 or _values[ranked[count - 1]] >= _floor:
+            return [(_uids[row], float(_values[row])) for row in ranked[:count]]
+        _rank()
+    return [(_uids[row], float(_values[row])) for row in ranked[:count]]
+
+
+def value(user_id, prices):
+    """One user's net worth."""
+    refresh(prices)
+    row = _rows.get(str(user_id))
+    return 0.0 if row is None else float(_values[row])
+
+
+def page(prices, number, size=10):
+    """[(rank, user id, net worth)] on page number (from 1)."""
+    start, end = (number - 1) * size, number * size
+    if end <= TOP_K:
+        board = top(prices, end)
+    else:
+        #past the candidate set, rare enough that a full argsort is fine
+        refresh(prices)
+        board = [(_uids[row], float(_values[row])) for row in np.argsort(-_values, kind="stable")[:end]]
+    return [(start + i + 1, user_id, worth) for i, (user_id, worth) in enumerate(board[start:end])]
+
+
+def rank(user_id, prices):
+    """user_id's 1-based rank, None if they're not in the index. A vectorized count, not a sort."""
+    refresh(prices)
+    row = _rows.get(str(user_id))
+    if row is None:
+        return None
+    return int(np.count_nonzero(_values > _values[row])) + 1
+
+
+def size(prices):
+    refresh(prices)
+    return len(_uids)
+
+
+def samples(prices):
+    """(user ids as int64, float32 rows of [cash, bank, stocks, options, gpus]) for every user, bank less margin debt."""
+    refresh(prices)
+    _apply_changed()
+    stocks = _holdings @ _prices
+    bank = _parts[:, BANK] - _parts[:, DEBT] * _borrow_index
+    columns = np.column_stack((_parts[:, CASH], bank, stocks, _parts[:, OPTIONS], _parts[:, GPUS]))
+    keep = _int_ids >= 0
+    return _int_ids[keep], columns[keep].astype(np.float32)
+
+
+def breakdown(user_id, prices):
+    """One user's {cash, bank, stocks, options, gpus}, the parts networthhistory samples. Margin debt is taken off bank."""
+    refresh(prices)
+    row = _rows.get(str(user_id))
+    if row is None:
+        return dict.fromkeys(("cash", "bank", "stocks", "options", "gpus"), 0.0)
+    bank = _parts[row, BANK] - _parts[row, DEBT] * _borrow_index
+    stocks = _values[row] - bank - _parts[row, GPUS]
+    return {"cash": float(_parts[row, CASH]), "bank": float(bank), "stocks": float(stocks),
+            "options": float(_parts[row, OPTIONS]), "gpus": float(_parts[row, GPUS])}
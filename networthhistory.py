@@ -0,0 +1,280 @@
+#per-user net worth history, sampled from the networth.py index after every market update:
+#
+#    networth_history/<tier>.bin   blocks: int64 unix time, int64 user count, the users' int64 ids
+#                                  (sorted), then float32 [cash, bank, stocks, options, gpus] per user
+#
+#tiers are "raw" (every update), "1h" and "1d" (the first update of each hour / day, utc). a block
+#only holds the users whose sample changed since the previous block of its tier, and the first
+#block after a restart holds everyone, so users without stocks cost nothing per tick. raw blocks
+#older than networth_history_raw_days and hourly blocks older than networth_history_hourly_days
+#are dropped once a day, the oldest block left is rewritten with everyone's state at that point so
+#nobody's value goes missing. daily blocks are kept forever.
+#
+#a block header is read once per session, after that reading a user is one binary search per
+#block in the range, over the tier that covers it.
+import bisect
+import datetime
+import os
+import threading
+import numpy as np
+from globals import NETWORTH_HISTORY_DIR, NETWORTH_HISTORY_RAW_DAYS, NETWORTH_HISTORY_HOURLY_DAYS
+import fileio
+
+COLUMNS = ("cash", "bank", "stocks", "options", "gpus")
+HEADER = np.dtype([("time", "<i8"), ("count", "<i8")])
+#tier -> bucket length in seconds (None for every update), and days kept (0 keeps it forever)
+TIERS = {
+    "raw": (None, NETWORTH_HISTORY_RAW_DAYS),
+    "1h": (3600, NETWORTH_HISTORY_HOURLY_DAYS),
+    "1d": (86400, 0),
+}
+_SAMPLE_BYTES = 4 * len(COLUMNS)
+
+_lock = threading.Lock()
+#(unix time, ids, samples) updates not yet on disk, oldest first. the head is being written
+_pending = []
+_draining = False
+#tier -> [(time, offset, count)] of every block on disk
+_index = {}
+#tier -> (ids, samples) as of the newest block written this session
+_state = {}
+_last_prune = None
+
+
+def _path(tier):
+    return os.path.join(NETWORTH_HISTORY_DIR, f"{tier}.bin")
+
+
+def _block_size(count):
+    payload = count * (8 + _SAMPLE_BYTES)
+    #padded so the next header stays 8 byte aligned
+    return HEADER.itemsize + payload + (-payload) % 8
+
+
+def _load_index(tier):
+    """Scan the block headers of a tier, cutting off a block torn by a crash mid-append."""
+    index = []
+    path = _path(tier)
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return index
+    offset = 0
+    with open(path, "rb") as f:
+        while offset + HEADER.itemsize <= size:
+            f.seek(offset)
+            header = np.frombuffer(f.read(HEADER.itemsize), dtype=HEADER)[0]
+            end = offset + _block_size(int(header["count"]))
+            if end > size:
+                break
+            index.append((int(header["time"]), offset, int(header["count"])))
+            offset = end
+    if offset != size:
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+    return index
+
+
+def _ensure_index(tier):
+    with _lock:
+        if tier not in _index:
+            os.makedirs(NETWORTH_HISTORY_DIR, exist_ok=True)
+            _index[tier] = _load_index(tier)
+        return _index[tier]
+
+
+def _encode(when, ids, samples):
+    header = np.array((when, len(ids)), dtype=HEADER)
+    payload = ids.tobytes() + samples.tobytes()
+    return header.tobytes() + payload + b"\0" * ((-len(payload)) % 8)
+
+
+def _changed(tier, ids, samples):
+    """The rows of (ids, samples) that differ from the tier's newest block, and the new state."""
+    state = _state.get(tier)
+    if state is None:
+        return ids, samples, (ids, samples)
+    old_ids, old_samples = state
+    pos = np.minimum(np.searchsorted(old_ids, ids), max(len(old_ids) - 1, 0))
+    same = np.zeros(len(ids), dtype=bool)
+    if len(old_ids):
+        same = (old_ids[pos] == ids) & (old_samples[pos] == samples).all(axis=1)
+    #users that left the economy keep their last sample
+    gone = ~np.isin(old_ids, ids)
+    if gone.any():
+        merged_ids = np.concatenate([ids, old_ids[gone]])
+        order = np.argsort(merged_ids, kind="stable")
+        new_state = (merged_ids[order], np.concatenate([samples, old_samples[gone]])[order])
+    else:
+        new_state = (ids, samples)
+    return ids[~same], samples[~same], new_state
+
+
+def _write(tier, when, ids, samples):
+    index = _ensure_index(tier)
+    bucket = TIERS[tier][0]
+    if bucket and index and when // bucket == index[-1][0] // bucket:
+        return
+    if index and when <= index[-1][0]:
+        return
+    changed_ids, changed_samples, state = _changed(tier, ids, samples)
+    block = _encode(when, changed_ids, changed_samples)
+    path = _path(tier)
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(block)
+    with _lock:
+        index.append((when, offset, len(changed_ids)))
+    _state[tier] = state
+
+
+def _read_block(data, offset, count):
+    ids = np.frombuffer(data, dtype=np.int64, count=count, offset=offset + HEADER.itemsize)
+    samples = np.frombuffer(data, dtype=np.float32, count=count * len(COLUMNS),
+                            offset=offset + HEADER.itemsize + count * 8).reshape(count, len(COLUMNS))
+    return ids, samples
+
+
+def _open(tier):
+    """(index, memory map) of a tier that stay consistent even if a prune swaps the file."""
+    _ensure_index(tier)
+    with _lock:
+        index = list(_index[tier])
+        if not index:
+            return index, None
+        return index, np.memmap(_path(tier), dtype=np.uint8, mode="r")
+
+
+def _prune_tier(tier, cutoff):
+    index, data = _open(tier)
+    drop = bisect.bisect_left([time for time, _, _ in index], cutoff)
+    #the newest dropped block stays as a keyframe, so dropping just that one changes nothing
+    if drop < 2:
+        return 0
+    #everyone's newest sample among the dropped blocks, newest blocks first so unique keeps those
+    parts = [_read_block(data, offset, count) for _, offset, count in reversed(index[:drop])]
+    all_ids = np.concatenate([ids for ids, _ in parts])
+    all_samples = np.concatenate([samples for _, samples in parts])
+    ids, first = np.unique(all_ids, return_index=True)
+    keyframe = _encode(index[drop - 1][0], ids, all_samples[first])
+    rest = bytes(data[index[drop][1]:]) if drop < len(index) else b""
+    with _lock:
+        fileio.write_atomic(_path(tier), keyframe + rest)
+        _index[tier] = _load_index(tier)
+    return drop - 1
+
+
+def _to_unix(when):
+    if isinstance(when, datetime.datetime):
+        return int(when.timestamp())
+    return int(when)
+
+
+def prune(now=None):
+    """Drop raw and hourly blocks past their retention. Returns how many blocks went."""
+    now = _to_unix(now or datetime.datetime.now())
+    dropped = 0
+    for tier, (_, days) in TIERS.items():
+        if days:
+            dropped += _prune_tier(tier, now - days * 86400)
+    return dropped
+
+
+def _drain():
+    global _draining, _last_prune
+    while True:
+        with _lock:
+            if not _pending:
+                _draining = False
+                return
+            when, ids, samples = _pending[0]
+        try:
+            for tier in TIERS:
+                _write(tier, when, ids, samples)
+            #retention runs here so it never races an update writing the same files
+            day = when // 86400
+            if day != _last_prune:
+                _last_prune = day
+                dropped = prune(when)
+                if dropped:
+                    print(f"Pruned {dropped} old net worth history blocks.")
+        except Exception as e:
+            print(f"Failed to append net worth history: {e}")
+        with _lock:
+            _pending.pop(0)
+
+
+def append(ids, samples, when=None):
+    """Record every user's sample (see networth.samples) at `when`. Written in the background, in order."""
+    global _draining
+    when = _to_unix(when or datetime.datetime.now())
+    order = np.argsort(ids, kind="stable")
+    with _lock:
+        _pending.append((when, ids[order], samples[order]))
+        if _draining:
+            return
+        _draining = True
+    fileio.submit(_drain)
+
+
+def tier_for(seconds):
+    """The finest tier that still covers the last `seconds` (None for everything)."""
+    for tier, (_, days) in TIERS.items():
+        if not days or (seconds is not None and seconds <= days * 86400):
+            return tier
+    return "1d"
+
+
+def last_time(tier="raw"):
+    """Unix time of the newest sample in a tier, None if it has none yet."""
+    index = _ensure_index(tier)
+    with _lock:
+        if _pending:
+            return _pending[-1][0]
+        return index[-1][0] if index else None
+
+
+def history(user_id, start=None, end=None, tier="raw"):
+    """(unix times, float32 samples of COLUMNS) of one user with start <= time <= end, oldest first.
+
+    start/end are unix times, None for open-ended. There's a point for every block in the range,
+    carrying the user's last sample forward through blocks they didn't change in.
+    """
+    user_id = int(user_id)
+    index, data = _open(tier)
+    times = [time for time, _, _ in index]
+    lo = 0 if start is None else bisect.bisect_left(times, start)
+    hi = len(index) if end is None else bisect.bisect_right(times, end)
+
+    def lookup(block):
+        _, offset, count = block
+        ids, samples = _read_block(data, offset, count)
+        pos = np.searchsorted(ids, user_id)
+        if pos < count and ids[pos] == user_id:
+            return samples[pos]
+        return None
+
+    #where the user stood when the range starts
+    current = None
+    for i in range(lo - 1, -1, -1):
+        current = lookup(index[i])
+        if current is not None:
+            break
+    points, values = [], []
+    for block in index[lo:hi]:
+        sample = lookup(block)
+        if sample is not None:
+            current = sample
+        if current is not None:
+            points.append(block[0])
+            values.append(current)
+    #an update still on its way to the disk
+    with _lock:
+        queued = [(when, ids, samples) for when, ids, samples in _pending
+                  if (not points or when > points[-1]) and (end is None or when <= end)]
+    for when, ids, samples in queued:
+        pos = np.searchsorted(ids, user_id)
+        if pos < len(ids) and ids[pos] == user_id:
+            points.append(when)
+            values.append(samples[pos])
+    return np.array(points, dtype=np.int64), np.array(values, dtype=np.float32).reshape(-1, len(COLUMNS))
@@ -1,11 +1,11 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
 import os
 import datetime
 from globals import UPDATE_INTERVAL_MINUTES, GUILD_ID, OPTIONS_FILE
 from utils import load_data, save_data
+import snapshots
 from stocks import load_stocks
 from typing import Optional
 import numpy as np
@@ -58,14 +58,12 @@ def generate_strike_prices(stock_price, num_strikes=5):
 
 def load_options():
     try:
-        with open(OPTIONS_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        return snapshots.load(OPTIONS_FILE)
+    except (FileNotFoundError, ValueError):
         return {}
 
 def save_options(data):
-    with open(OPTIONS_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    snapshots.save(OPTIONS_FILE, data)
 
 def create_options_for_stock(stock, stock_price):
     """Create option chain for a specific stock."""
@@ -196,7 +194,7 @@ class OptionsCog(commands.Cog):
                         option[f"{strategy}_price"] = new_options[expiry][strategy][strike]["price"]
         
         save_options(options_data)
-        save_data(data)
+        save_data(data, *[uid for uid, record in data.items() if "options" in record])
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="options", description="Shows what options the user currently owns.")
@@ -205,7 +203,7 @@ class OptionsCog(commands.Cog):
         target = user or interaction.user
         data = load_data()
         user_id = str(target.id)
-        user_record = data.get(user_id, {"options": []})
+        user_record = data.user(user_id)
         user_options = user_record.get("options", [])
         
         if not user_options:
@@ -337,7 +335,7 @@ class OptionsCog(commands.Cog):
         
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "options": []})
+        user_record = data.user(user_id)
         
         if user_record.get("balance", 0) < total_cost:
             await interaction.response.send_message(
@@ -373,7 +371,7 @@ class OptionsCog(commands.Cog):
             })
         
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"Bought {quantity} {stock} ${strike} {strategy} contracts for ${total_cost:,.2f}.",
@@ -392,7 +390,7 @@ class OptionsCog(commands.Cog):
         
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "options": []})
+        user_record = data.user(user_id)
         
         if not user_record.get("options"):
             await interaction.response.send_message("You don't own any options.", ephemeral=True)
@@ -426,7 +424,7 @@ class OptionsCog(commands.Cog):
             user_record["options"].remove(target_option)
         
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         
         await interaction.response.send_message(
             f"Sold {quantity} contracts for ${total_value:,.2f}.",
@@ -0,0 +1,190 @@
+#resting stock orders, matched against the new prices right after every market update.
+#
+#    buy   limit buy, fills once the price is at or below the limit, spends a fixed amount of bucks
+#    sell  limit sell (take profit), fills once the price is at or above the limit
+#    stop  stop loss, sells once the price is at or below the stop
+#
+#whatever an order could spend is taken when it's placed (the bucks for a buy, the shares for a
+#sell/stop) and handed back on cancel, so a fill never fails. every fill is at the tick's price,
+#the limit is the guarantee, and counts towards the tick's flow in liquidity.py.
+#
+#each (symbol, kind) has a heap with the order that triggers first on top, so a tick only pops the
+#orders it fills: O(filled * log n), the orders that don't trigger are never looked at. cancelled
+#orders are dropped from the heap lazily, when they reach the top or the heap is mostly dead.
+#the book is kept in memory and written to ORDERS_FILE whenever it changes.
+import datetime
+import heapq
+import os
+from globals import ORDERS_FILE
+import economy
+import liquidity
+import snapshots
+
+KINDS = ("buy", "sell", "stop")
+MAX_ORDERS_PER_USER = 25
+
+_orders = None
+#(symbol, kind) -> [(heap key, order id)], the key is -price for buy/stop so the highest is on top
+_heaps = {}
+#(symbol, kind) -> cancelled orders still in that heap
+_dead = {}
+#user id -> set of their order ids
+_by_user = {}
+_next_id = 1
+
+
+def _key(order):
+    return order["price"] if order["kind"] == "sell" else -order["price"]
+
+
+def _triggered(kind, key, price):
+    if kind == "sell":
+        return price >= key
+    return price <= -key
+
+
+def _index(order):
+    heapq.heappush(_heaps.setdefault((order["symbol"], order["kind"]), []), (_key(order), order["id"]))
+    _by_user.setdefault(order["user_id"], set()).add(order["id"])
+
+
+def load():
+    """The open orders, {order id: order}. Read from ORDERS_FILE on first use."""
+    global _orders, _next_id
+    if _orders is None:
+        saved = {}
+        if os.path.exists(ORDERS_FILE):
+            try:
+                saved = snapshots.load(ORDERS_FILE)
+            except ValueError:
+                print(f"{ORDERS_FILE} is unreadable, starting with no open orders.")
+        _orders = {}
+        for order in saved.get("orders", []):
+            _orders[order["id"]] = order
+            _index(order)
+        _next_id = saved.get("next_id", max(_orders, default=0) + 1)
+    return _orders
+
+
+def save():
+    snapshots.save(ORDERS_FILE, {"next_id": _next_id, "orders": list(load().values())})
+
+
+def user_orders(user_id):
+    """The user's open orders, oldest first."""
+    orders = load()
+    return [orders[order_id] for order_id in sorted(_by_user.get(str(user_id), ()))]
+
+
+def place(user_id, symbol, kind, price, amount=0.0, shares=0.0):
+    """Add an order. The caller has already taken amount (buy) or shares (sell/stop) from the user."""
+    global _next_id
+    orders = load()
+    order = {
+        "id": _next_id,
+        "user_id": str(user_id),
+        "symbol": symbol,
+        "kind": kind,
+        "price": price,
+        "amount": amount,
+        "shares": shares,
+        "placed": datetime.datetime.now().isoformat(),
+    }
+    _next_id += 1
+    orders[order["id"]] = order
+    _index(order)
+    save()
+    return order
+
+
+def _unindex(order):
+    ids = _by_user.get(order["user_id"])
+    if ids is not None:
+        ids.discard(order["id"])
+        if not ids:
+            del _by_user[order["user_id"]]
+
+
+def cancel(order_id, user_id=None):
+    """Remove an open order and return it, None if there's no such order (or it's not user_id's)."""
+    orders = load()
+    order = orders.get(order_id)
+    if order is None or (user_id is not None and order["user_id"] != str(user_id)):
+        return None
+    del orders[order_id]
+    _unindex(order)
+    heap_key = (order["symbol"], order["kind"])
+    heap = _heaps[heap_key]
+    _dead[heap_key] = _dead.get(heap_key, 0) + 1
+    #rebuild once most of the heap is cancelled orders, so it can't grow without bound
+    if _dead[heap_key] > 32 and _dead[heap_key] * 2 > len(heap):
+        heap[:] = [entry for entry in heap if entry[1] in orders]
+        heapq.heapify(heap)
+        _dead[heap_key] = 0
+    save()
+    return order
+
+
+def refund(record, order):
+    """Give back what the order was holding."""
+    if order["kind"] == "buy":
+        record["balance"] = record.get("balance", 0) + order["amount"]
+    else:
+        portfolio = record.get("portfolio", {})
+        portfolio[order["symbol"]] = portfolio.get(order["symbol"], 0) + order["shares"]
+        record["portfolio"] = portfolio
+
+
+def match(prices):
+    """Pop every order the new prices trigger. Returns [(order, fill price)], the book is saved."""
+    orders = load()
+    fills = []
+    for heap_key, heap in _heaps.items():
+        symbol, kind = heap_key
+        price = prices.get(symbol)
+        #a coin rounded down to 0 can't be bought at, leave its orders resting
+        if price is None or price <= 0:
+            continue
+        while heap and _triggered(kind, heap[0][0], price):
+            _, order_id = heapq.heappop(heap)
+            order = orders.pop(order_id, None)
+            if order is None:
+                #cancelled earlier
+                _dead[heap_key] -= 1
+                continue
+            _unindex(order)
+            fills.append((order, price))
+        #drop cancelled orders sitting on top so the next tick starts on a live one
+        while heap and heap[0][1] not in orders:
+            heapq.heappop(heap)
+            _dead[heap_key] -= 1
+    if fills:
+        save()
+    return fills
+
+
+async def settle(fills):
+    """Pay out fills from match(). Returns one line per fill for the market update post."""
+    lines = []
+    if not fills:
+        return lines
+    async with economy.transaction(*{order["user_id"] for order, _ in fills}) as tx:
+        for order, price in fills:
+            record = tx[order["user_id"]]
+            symbol = order["symbol"]
+            if order["kind"] == "buy":
+                shares = order["amount"] / price
+                portfolio = record.get("portfolio", {})
+                portfolio[symbol] = portfolio.get(symbol, 0) + shares
+                record["portfolio"] = portfolio
+                record["total_spent"] = record.get("total_spent", 0) + order["amount"]
+                liquidity.record(symbol, shares, order["amount"])
+                lines.append(f"<@{order['user_id']}> #{order['id']} bought {shares} {symbol} at {price}")
+            else:
+                sale_value = round(price * order["shares"], 2)
+                record["balance"] = record.get("balance", 0) + sale_value
+                record["total_earned"] = record.get("total_earned", 0) + sale_value
+                liquidity.record(symbol, -order["shares"], sale_value)
+                lines.append(f"<@{order['user_id']}> #{order['id']} {order['kind']} sold {order['shares']} {symbol} "
+                             f"at {price} for {sale_value}")
+    return lines
@@ -5,6 +5,9 @@ import datetime
 import random
 from globals import GUILD_ID
 from utils import load_data, save_data
+import orders
+import margin
+import shorts
 
 class PrestigeCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -82,6 +85,22 @@ class PrestigeCog(commands.Cog):
             )
             return
 
+        # Orders, margin positions and shorts hold value outside the record, closing them after the
+        # reset would pay it into the new one
+        open_positions = []
+        if orders.user_orders(user_id):
+            open_positions.append("open orders (cancel them with /orders)")
+        if margin.user_positions(user_id):
+            open_positions.append("margin positions (close them with /margin)")
+        if shorts.user_shorts(user_id):
+            open_positions.append("short positions (cover them with /stockcover)")
+        if open_positions:
+            await interaction.response.send_message(
+                "Close these before you prestige:\n• " + "\n• ".join(open_positions),
+                ephemeral=True
+            )
+            return
+
         # Build a new record preserving only time accruals and incrementing prestige
         new_record = {
             "vc_time": record.get("vc_time", 0),
@@ -91,7 +110,7 @@ class PrestigeCog(commands.Cog):
             "balance": 0
         }
         data[user_id] = new_record
-        save_data(data)
+        save_data(data, user_id)
         await interaction.response.send_message(
             f"🎉 Congratulations! You have prestiged to level {current_prestige + 1}! 🎉\n"
             f"Your economy data has been reset (except your time accruals and prestige).",
@@ -209,7 +228,7 @@ class PrestigeCog(commands.Cog):
         record["last_prestige_daily"] = now.isoformat()
 
         data[user_id] = record
-        save_data(data)
+        save_data(data, user_id)
         await interaction.response.send_message(
             f"💎 You have received a prestige daily bonus of {reward:,} Beaned Bucks! 💎\n"
             f"(Base: {base_reward:,} × {factor:.1f} prestige multiplier)",
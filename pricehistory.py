@@ -0,0 +1,350 @@
+#stock price history, append-only binary files per symbol instead of stock_history.json:
+#
+#    price_history/<SYMBOL>.bin      raw ticks, 16 byte records: int64 unix time + float64 price
+#    price_history/<SYMBOL>.1h.bin   OHLC candles per hour, day (.1d) and week (.1w), 48 byte records:
+#                                    int64 bucket start, float64 open/high/low/close, int64 last tick
+#    price_history/<SYMBOL>.volume.bin  Beaned Bucks traded in the tick before each update, 16 byte
+#                                    records: int64 unix time of the update + float64 volume. only
+#                                    updates with trading get one, a time that's missing is 0
+#
+#a market tick appends one raw record per symbol and updates (or starts) the newest candle of each
+#timeframe in the i/o pool, so it costs the same on day one and day three hundred. buckets are in
+#utc, weeks start on monday. raw ticks and volumes older than price_history_raw_days and hourly candles older
+#than price_history_hourly_days are dropped once a day, daily and weekly candles are kept forever.
+#reads memory-map the file: the last n points are a slice off the end and time ranges are two
+#binary searches. stock_history.json is migrated on first use and then left alone (python
+#pricehistory.py migrate does it by hand).
+import bisect
+import datetime
+import os
+import sys
+import threading
+from urllib.parse import quote, unquote
+import numpy as np
+from globals import PRICE_HISTORY_DIR, STOCK_HISTORY_FILE, PRICE_HISTORY_RAW_DAYS, PRICE_HISTORY_HOURLY_DAYS
+import fileio
+import snapshots
+
+RECORD = np.dtype([("time", "<i8"), ("price", "<f8")])
+VOLUME = np.dtype([("time", "<i8"), ("volume", "<f8")])
+CANDLE = np.dtype([("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+                   ("last", "<i8")])
+#timeframe -> bucket length in seconds
+TIMEFRAMES = {"1h": 3600, "1d": 86400, "1w": 7 * 86400}
+#the unix epoch was a thursday, weekly buckets are shifted to start on the monday after it
+_WEEK_OFFSET = 4 * 86400
+#written once the candles have been built from the raw history
+ROLLUP_MARKER = os.path.join(PRICE_HISTORY_DIR, ".rollups")
+
+_lock = threading.Lock()
+#(unix time, {symbol: price}, {symbol: volume}) ticks not yet on disk, oldest first. the head is being written
+_pending = []
+_draining = False
+_ready = False
+#(symbol, timeframe) -> newest candle on disk, saves reading it back every tick
+_last_candle = {}
+_last_prune = None
+
+
+def _path(symbol, timeframe=None):
+    #dots are escaped too so a timeframe suffix can't be mistaken for part of a symbol
+    name = quote(symbol, safe="").replace(".", "%2E")
+    return os.path.join(PRICE_HISTORY_DIR, f"{name}.{timeframe}.bin" if timeframe else f"{name}.bin")
+
+
+def _to_unix(when):
+    if isinstance(when, str):
+        when = datetime.datetime.fromisoformat(when)
+    if isinstance(when, datetime.datetime):
+        return int(when.timestamp())
+    return int(when)
+
+
+def bucket_start(times, timeframe):
+    """Start of the candle each unix time (int or array) falls in."""
+    offset = _WEEK_OFFSET if timeframe == "1w" else 0
+    return times - (times - offset) % TIMEFRAMES[timeframe]
+
+
+def _read(path, dtype):
+    try:
+        count = os.path.getsize(path) // dtype.itemsize
+    except FileNotFoundError:
+        count = 0
+    if not count:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _fold(candles, rows, timeframe):
+    """candles with the raw rows newer than their last tick rolled in. rows are sorted by time."""
+    if len(candles):
+        rows = rows[rows["time"] > candles[-1]["last"]]
+    if not len(rows):
+        return candles
+    prices = rows["price"]
+    buckets = bucket_start(rows["time"], timeframe)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    new = np.empty(len(starts), CANDLE)
+    new["time"] = buckets[starts]
+    new["open"] = prices[starts]
+    new["high"] = np.maximum.reduceat(prices, starts)
+    new["low"] = np.minimum.reduceat(prices, starts)
+    new["close"] = prices[ends]
+    new["last"] = rows["time"][ends]
+    if len(candles) and candles[-1]["time"] == new[0]["time"]:
+        #the first new ticks continue the newest existing candle
+        new["open"][0] = candles[-1]["open"]
+        new["high"][0] = max(new["high"][0], candles[-1]["high"])
+        new["low"][0] = min(new["low"][0], candles[-1]["low"])
+        candles = candles[:-1]
+    return np.concatenate([candles, new])
+
+
+def _build_rollups():
+    #candles for history that predates them (a fresh migration or a store from before rollups)
+    for symbol in _symbols_on_disk():
+        rows = _read(_path(symbol), RECORD)
+        for timeframe in TIMEFRAMES:
+            candles = _fold(np.zeros(0, CANDLE), rows, timeframe)
+            fileio.write_atomic(_path(symbol, timeframe), candles.tobytes())
+    fileio.write_atomic(ROLLUP_MARKER, b"1")
+
+
+def _ensure_store():
+    global _ready
+    if _ready:
+        return
+    with _lock:
+        if _ready:
+            return
+        if not os.path.isdir(PRICE_HISTORY_DIR):
+            if os.path.exists(STOCK_HISTORY_FILE):
+                migrate(STOCK_HISTORY_FILE)
+            else:
+                os.makedirs(PRICE_HISTORY_DIR, exist_ok=True)
+        if not os.path.exists(ROLLUP_MARKER):
+            _build_rollups()
+        _ready = True
+
+
+def migrate(json_path, dest=PRICE_HISTORY_DIR):
+    """Convert a stock_history.json ({symbol: [{"timestamp", "price"}, ...]}) into per-symbol files."""
+    history = snapshots.load(json_path)
+    tmp_dest = dest + ".tmp"
+    os.makedirs(tmp_dest, exist_ok=True)
+    points = 0
+    for symbol, records in history.items():
+        rows = np.array([(_to_unix(r["timestamp"]), r["price"]) for r in records], dtype=RECORD)
+        rows.sort(order="time", kind="stable")
+        fileio.write_atomic(os.path.join(tmp_dest, os.path.basename(_path(symbol))), rows.tobytes())
+        points += len(rows)
+    #written to the side and swapped in, a crash mid-migration just migrates again
+    os.replace(tmp_dest, dest)
+    print(f"Migrated {points} price points for {len(history)} symbols from {json_path} to {dest}/")
+
+
+def _append_record(path, record):
+    with open(path, "ab") as f:
+        end = f.tell()
+        if end % record.itemsize:
+            #a torn record from a crash mid-append, drop it so everything after stays aligned
+            f.truncate(end - end % record.itemsize)
+        f.write(record.tobytes())
+
+
+def _roll(symbol, timeframe, start, when, price):
+    key = (symbol, timeframe)
+    path = _path(symbol, timeframe)
+    #[start, open, high, low, close, last tick]
+    last = _last_candle.get(key)
+    if last is None:
+        on_disk = _read(path, CANDLE)
+        last = list(on_disk[-1].item()) if len(on_disk) else None
+    if last is not None and when <= last[5]:
+        return
+    if last is not None and last[0] == start:
+        last[2] = max(last[2], price)
+        last[3] = min(last[3], price)
+        last[4] = price
+        last[5] = when
+        with open(path, "r+b") as f:
+            f.seek(-CANDLE.itemsize, os.SEEK_END)
+            f.write(np.array(tuple(last), dtype=CANDLE).tobytes())
+    else:
+        last = [start, price, price, price, price, when]
+        _append_record(path, np.array(tuple(last), dtype=CANDLE))
+    _last_candle[key] = last
+
+
+def _write_tick(when, prices, volumes):
+    starts = {timeframe: bucket_start(when, timeframe) for timeframe in TIMEFRAMES}
+    for symbol, price in prices.items():
+        _append_record(_path(symbol), np.array((when, price), dtype=RECORD))
+        for timeframe, start in starts.items():
+            _roll(symbol, timeframe, start, when, price)
+    for symbol, value in volumes.items():
+        _append_record(_path(symbol, "volume"), np.array((when, value), dtype=VOLUME))
+
+
+def _drop_before(path, dtype, cutoff):
+    rows = _read(path, dtype)
+    keep_from = bisect.bisect_left(rows["time"], cutoff)
+    if keep_from:
+        fileio.write_atomic(path, rows[keep_from:].tobytes())
+    return keep_from
+
+
+def prune(now=None):
+    """Drop raw ticks and hourly candles past their retention. Returns how many records went."""
+    now = _to_unix(now or datetime.datetime.now())
+    dropped = 0
+    for symbol in _symbols_on_disk():
+        if PRICE_HISTORY_RAW_DAYS:
+            dropped += _drop_before(_path(symbol), RECORD, now - PRICE_HISTORY_RAW_DAYS * 86400)
+            dropped += _drop_before(_path(symbol, "volume"), VOLUME, now - PRICE_HISTORY_RAW_DAYS * 86400)
+        if PRICE_HISTORY_HOURLY_DAYS:
+            dropped += _drop_before(_path(symbol, "1h"), CANDLE, now - PRICE_HISTORY_HOURLY_DAYS * 86400)
+    return dropped
+
+
+def _drain():
+    global _draining, _last_prune
+    while True:
+        with _lock:
+            if not _pending:
+                _draining = False
+                return
+            when, prices, volumes = _pending[0]
+        try:
+            _write_tick(when, prices, volumes)
+            #retention runs here so it never races a tick writing the same files
+            day = bucket_start(when, "1d")
+            if day != _last_prune:
+                _last_prune = day
+                dropped = prune(when)
+                if dropped:
+                    print(f"Pruned {dropped} old price history records.")
+        except Exception as e:
+            print(f"Failed to append price history: {e}")
+        with _lock:
+            _pending.pop(0)
+
+
+def append(prices, when=None, volumes=None):
+    """Record {symbol: price} and the {symbol: volume} traded before it at `when` (now by default).
+
+    Written in the background, in order.
+    """
+    global _draining
+    _ensure_store()
+    with _lock:
+        _pending.append((_to_unix(when or datetime.datetime.now()), dict(prices), dict(volumes or {})))
+        if _draining:
+            return
+        _draining = True
+    fileio.submit(_drain)
+
+
+def _pending_rows(symbol):
+    with _lock:
+        rows = [(when, prices[symbol]) for when, prices, _ in _pending if symbol in prices]
+    return np.array(rows, dtype=RECORD)
+
+
+def volumes(symbol):
+    """Every volume record of symbol (fields time, volume), oldest first. Updates without trading have none."""
+    _ensure_store()
+    on_disk = _read(_path(symbol, "volume"), VOLUME)
+    with _lock:
+        rows = [(when, traded[symbol]) for when, _, traded in _pending if symbol in traded]
+    pending = np.array(rows, dtype=VOLUME)
+    if len(pending) and len(on_disk):
+        pending = pending[pending["time"] > on_disk[-1]["time"]]
+    return np.concatenate([on_disk, pending]) if len(pending) else on_disk
+
+
+def series(symbol):
+    """Every raw point of symbol as a read-only record array (fields time, price), oldest first.
+
+    Memory-mapped, so this is cheap however long the history is until the slice is read.
+    """
+    _ensure_store()
+    on_disk = _read(_path(symbol), RECORD)
+    pending = _pending_rows(symbol)
+    if len(pending):
+        #points still queued for the disk, and in case a write landed between the two reads
+        #only the ones newer than the end of the file
+        if len(on_disk):
+            pending = pending[pending["time"] > on_disk[-1]["time"]]
+        return np.concatenate([on_disk, pending])
+    return on_disk
+
+
+def candles(symbol, timeframe):
+    """Every OHLC candle of symbol for a timeframe in TIMEFRAMES as a record array, oldest first."""
+    _ensure_store()
+    on_disk = _read(_path(symbol, timeframe), CANDLE)
+    pending = _pending_rows(symbol)
+    if not len(pending):
+        return on_disk
+    #ticks still queued only ever touch the newest candle onwards
+    return np.concatenate([on_disk[:-1], _fold(np.array(on_disk[-1:]), pending, timeframe)])
+
+
+def _range(rows, start, end):
+    times = rows["time"]
+    lo = 0 if start is None else bisect.bisect_left(times, _to_unix(start))
+    hi = len(rows) if end is None else bisect.bisect_right(times, _to_unix(end))
+    return np.array(rows[lo:hi])
+
+
+def tail(symbol, n=10, volume=False):
+    """The last n raw points of symbol as a list of (datetime, price), oldest first.
+
+    With volume=True (datetime, price, volume), the Beaned Bucks traded before each point.
+    """
+    rows = series(symbol)[-n:]
+    points = [(datetime.datetime.fromtimestamp(int(t)), float(p)) for t, p in zip(rows["time"], rows["price"])]
+    if not volume:
+        return points
+    traded = _range(volumes(symbol), int(rows["time"][0]), None) if len(rows) else np.zeros(0, VOLUME)
+    by_time = dict(zip(traded["time"].tolist(), traded["volume"].tolist()))
+    return [(when, price, by_time.get(int(t), 0.0)) for (when, price), t in zip(points, rows["time"].tolist())]
+
+
+def tail_candles(symbol, timeframe, n=10):
+    """The last n candles of symbol as a list of (datetime, open, high, low, close), oldest first."""
+    return [(datetime.datetime.fromtimestamp(int(c["time"])), float(c["open"]), float(c["high"]),
+             float(c["low"]), float(c["close"])) for c in candles(symbol, timeframe)[-n:]]
+
+
+def between(symbol, start, end, timeframe=None):
+    """Raw points (or candles of timeframe) of symbol with start <= time <= end. start/end are
+    datetimes or unix times, None for open-ended."""
+    rows = candles(symbol, timeframe) if timeframe else series(symbol)
+    return _range(rows, start, end)
+
+
+def _symbols_on_disk():
+    names = os.listdir(PRICE_HISTORY_DIR)
+    return sorted(unquote(name[:-4]) for name in names if name.endswith(".bin") and "." not in name[:-4])
+
+
+def symbols():
+    """Every symbol with history on disk."""
+    _ensure_store()
+    return _symbols_on_disk()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "migrate":
+        if os.path.isdir(PRICE_HISTORY_DIR):
+            print(f"{PRICE_HISTORY_DIR}/ already exists, not migrating.")
+            sys.exit(1)
+        migrate(STOCK_HISTORY_FILE)
+        _build_rollups()
+    else:
+        print("usage: python pricehistory.py migrate")
+        sys.exit(1)
@@ -0,0 +1,80 @@
+#pre-ranked leaderboards for the record fields /leaderboard shows (voice time, alone time, afk
+#time, prestige). each category is a sorted list of (-value, user id) next to a dict of every
+#user's current value, so a page is a slice and a user's rank is a bisect, both O(log n).
+#changed users come in through economy.subscribe and are re-ranked on the next read, at
+#O(log n) each, so a busy voice channel doesn't cost anything until someone looks.
+#net worth is ranked by networth.py instead, every price tick moves every user at once there.
+from sortedcontainers import SortedList
+import economy
+
+#category -> record field
+CATEGORIES = {
+    "time": "vc_time",
+    "timealone": "vc_timealone",
+    "timeafk": "vc_afk",
+    "prestige": "prestige",
+}
+
+#category -> SortedList of (-value, user id)
+_ranked = {}
+#category -> {user id: value}
+_values = {}
+#users changed since the last read, None once everything has to be rebuilt
+_pending = None
+
+
+def _on_change(user_ids):
+    global _pending
+    if user_ids is None:
+        _pending = None
+    elif _pending is not None:
+        _pending.update(user_ids)
+
+
+economy.subscribe(_on_change)
+
+
+def refresh():
+    """Re-rank the users that changed since the last call."""
+    global _pending
+    data = economy.load()
+    if _pending is None:
+        for category, field in CATEGORIES.items():
+            values = {user_id: record.get(field, 0) for user_id, record in data.items()}
+            _values[category] = values
+            _ranked[category] = SortedList((-value, user_id) for user_id, value in values.items())
+        _pending = set()
+        return
+    for user_id in _pending:
+        record = data.get(user_id)
+        for category, field in CATEGORIES.items():
+            values = _values[category]
+            ranked = _ranked[category]
+            old = values.pop(user_id, None)
+            if old is not None:
+                ranked.remove((-old, user_id))
+            if record is not None:
+                value = values[user_id] = record.get(field, 0)
+                ranked.add((-value, user_id))
+    _pending.clear()
+
+
+def page(category, number, size=10):
+    """[(rank, user id, value)] on page number (from 1) of category."""
+    refresh()
+    start = (number - 1) * size
+    return [(start + i + 1, user_id, -value) for i, (value, user_id) in enumerate(_ranked[category][start:start + size])]
+
+
+def rank(category, user_id):
+    """user_id's 1-based rank in category, None if they have no record."""
+    refresh()
+    value = _values[category].get(str(user_id))
+    if value is None:
+        return None
+    return _ranked[category].bisect_left((-value, str(user_id))) + 1
+
+
+def size(category):
+    refresh()
+    return len(_values[category])
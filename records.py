@@ -0,0 +1,190 @@
+#compact in-memory user records. every user used to be a plain dict with string keys, which
+#costs a hash table per user plus whatever default dicts a command allocated for them.
+#UserRecord keeps the known fields in __slots__ and still behaves like the old dict, so
+#record["balance"], record.get("cash", 0), "inventory" in record and so on keep working.
+#
+#a field that was never set is absent: "cash" in record is False and
+#record.get("cash") is None, just like the dict. indexing is more forgiving though,
+#record["cash"] on an absent number gives 0 and record["portfolio"] on an absent
+#container creates it, so commands don't have to spell out defaults anymore.
+from collections.abc import MutableMapping
+from operator import attrgetter
+
+#numbers that read as 0 until they're first written
+NUMBER_FIELDS = (
+    "balance", "cash", "prestige", "vc_time", "vc_timealone", "vc_afk",
+    "graphics_cards", "total_spent", "total_earned",
+)
+#iso timestamps of the last time a cooldown command was used
+TIME_FIELDS = ("last_daily", "last_daily_boost", "last_work", "last_prestige_daily")
+#sub-structures that are only allocated once something is stored in them
+CONTAINER_FIELDS = {
+    "portfolio": dict,
+    "inventory": dict,
+    "facilities": dict,
+    "mining": dict,
+    "options": list,
+}
+FIELDS = NUMBER_FIELDS + TIME_FIELDS + tuple(CONTAINER_FIELDS)
+_FIELD_SET = frozenset(FIELDS)
+_NUMBER_SET = frozenset(NUMBER_FIELDS)
+#unset slots hold this instead of being left empty, reading an empty slot raises and
+#building the exception on every miss is what made to_dict slow
+_MISSING = object()
+_get_fields = attrgetter(*FIELDS)
+
+
+class UserRecord(MutableMapping):
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, fields=None, **kwargs):
+        self._clear_fields()
+        self._extra = None
+        if fields:
+            self.update(fields)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, fields):
+        """Build a record from its storage form, the dict to_dict() returns."""
+        record = cls.__new__(cls)
+        record._clear_fields()
+        extra = None
+        for key, value in fields.items():
+            slot = _SLOTS.get(key)
+            if slot is not None:
+                slot.__set__(record, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        record._extra = extra
+        return record
+
+    def to_dict(self):
+        """Storage form of the record, only the fields that are set. Containers are shared, not copied."""
+        fields = {key: value for key, value in zip(FIELDS, _get_fields(self)) if value is not _MISSING}
+        if self._extra:
+            fields.update(self._extra)
+        return fields
+
+    def _clear_fields(self):
+        #one chained assignment is a lot faster than looping over FIELDS, keep the two in sync
+        self.balance = self.cash = self.prestige = self.vc_time = self.vc_timealone = self.vc_afk = \
+            self.graphics_cards = self.total_spent = self.total_earned = \
+            self.last_daily = self.last_daily_boost = self.last_work = self.last_prestige_daily = \
+            self.portfolio = self.inventory = self.facilities = self.mining = self.options = _MISSING
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+            if key in _NUMBER_SET:
+                return 0
+            factory = CONTAINER_FIELDS.get(key)
+            if factory is not None:
+                value = factory()
+                object.__setattr__(self, key, value)
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            if getattr(self, key) is _MISSING:
+                raise KeyError(key)
+            object.__setattr__(self, key, _MISSING)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key, value in zip(FIELDS, _get_fields(self)):
+            if value is not _MISSING:
+                yield key
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self):
+        count = sum(1 for value in _get_fields(self) if value is not _MISSING)
+        return count + (len(self._extra) if self._extra else 0)
+
+    def setdefault(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self[key] = value = default
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, UserRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __deepcopy__(self, memo):
+        import copy
+        return UserRecord.from_dict(copy.deepcopy(self.to_dict(), memo))
+
+    def __repr__(self):
+        return f"UserRecord({self.to_dict()!r})"
+
+
+#the member descriptors behind the slots, setting through these skips attribute lookup
+_SLOTS = {key: UserRecord.__dict__[key] for key in FIELDS}
+
+
+class UserTable(dict):
+    """user id -> UserRecord. Plain dicts stored into it are converted on the way in."""
+
+    @classmethod
+    def from_storage(cls, records):
+        table = cls()
+        for user_id, fields in records.items():
+            dict.__setitem__(table, user_id, UserRecord.from_dict(fields))
+        return table
+
+    def __setitem__(self, user_id, record):
+        if not isinstance(record, UserRecord):
+            record = UserRecord.from_dict(record)
+        dict.__setitem__(self, user_id, record)
+
+    def user(self, user_id):
+        """The record for user_id, created empty if they don't have one yet.
+
+        Empty records never reach disk, so looking someone up doesn't give them an entry.
+        """
+        record = dict.get(self, user_id)
+        if record is None:
+            record = UserRecord()
+            dict.__setitem__(self, user_id, record)
+        return record
+
+    def to_storage(self):
+        """Plain dicts for every user that has anything stored."""
+        return {user_id: fields for user_id, record in self.items() if (fields := record.to_dict())}
@@ -16,7 +16,7 @@ class RouletteCog(commands.Cog):
     async def roulette(self, interaction: discord.Interaction, bet: str, choice: str):
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0})
+        user_record = data.user(user_id)
         current_balance = float(user_record.get("balance", 0))
         
         if bet.lower() == "all":
@@ -38,7 +38,7 @@ class RouletteCog(commands.Cog):
         #deduct the wager
         user_record["balance"] = current_balance - bet_value
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
 
         outcome = random.randint(0, 36)
         red_numbers = {1,3,5,7,9,12,14,16,18,19,21,23,25,27,30,32,34,36}
@@ -112,7 +112,7 @@ class RouletteCog(commands.Cog):
             embed.add_field(name="Result", value="LOSE!", inline=False)
 
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
         embed.set_footer(text=f"New Balance: {user_record['balance']} Beaned Bucks")
         await interaction.response.send_message(embed=embed)
 
@@ -4,28 +4,33 @@ import json
 from typing import Optional
 import datetime
 import random
+import fileio
+
+
+#rpg files stay indented json so they're easy to edit by hand, reads and writes go through fileio
+def read_json(path, default):
+    try:
+        return json.loads(fileio.read(path))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path, data):
+    fileio.write(path, json.dumps(data, indent=4).encode())
 
 
 def rpg_load_data():
-    if not os.path.exists(RPG_INVENTORY_FILE):
-        return {}
-    with open(RPG_INVENTORY_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+    return read_json(RPG_INVENTORY_FILE, {})
 
 
 def rpg_save_data(data):
-    with open(RPG_INVENTORY_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    write_json(RPG_INVENTORY_FILE, data)
 
 
 def load_rpg_items():
     """Load items data from rpgitems.json."""
     try:
-        with open(RPG_ITEMS_FILE, "r") as f:
-            return json.load(f)
+        return json.loads(fileio.read(RPG_ITEMS_FILE))
     except Exception as e:
         print(f"Error loading items data: {e}")
         return {}
@@ -36,8 +41,7 @@ def load_rpg_party_data():
     if not os.path.exists(RPG_PARTIES_FILE):
         return {}
     try:
-        with open(RPG_PARTIES_FILE, "r") as f:
-            return json.load(f)
+        return json.loads(fileio.read(RPG_PARTIES_FILE))
     except Exception as e:
         print(f"Error loading party data: {e}")
         return {}
@@ -280,14 +284,7 @@ def roll_d12():
 BACKUP_FILE = "rpgbackup.json"
 def add_to_graveyard(user_id: str, enemy: Optional[str] = None):
     #open the graveyard file or default
-    if os.path.exists(GRAVEYARD_FILE):
-        with open(GRAVEYARD_FILE, "r") as f:
-            try:
-                graveyard = json.load(f)
-            except json.JSONDecodeError:
-                graveyard = []
-    else:
-        graveyard = []
+    graveyard = read_json(GRAVEYARD_FILE, [])
     #load user data and get killer, default to unknown
     data = rpg_load_data()
     killer = enemy
@@ -299,8 +296,7 @@ def add_to_graveyard(user_id: str, enemy: Optional[str] = None):
     #setup the entry
     entry = f"Level [{level}], {name} was killed by {killer}."
     graveyard.append(entry)
-    with open(GRAVEYARD_FILE, "w") as f:
-        json.dump(graveyard, f, indent=4)
+    write_json(GRAVEYARD_FILE, graveyard)
 
     #backup the entire character incase of bugs so we can restore :D
     backup_entry = {
@@ -309,16 +305,8 @@ def add_to_graveyard(user_id: str, enemy: Optional[str] = None):
         "character": character
     }
     
-    if os.path.exists(BACKUP_FILE):
-        with open(BACKUP_FILE, "r") as f:
-            try:
-                backup_data = json.load(f)
-            except json.JSONDecodeError:
-                backup_data = []
-    else:
-        backup_data = []
+    backup_data = read_json(BACKUP_FILE, [])
     backup_data.append(backup_entry)
-    with open(BACKUP_FILE, "w") as f:
-        json.dump(backup_data, f, indent=4)
+    write_json(BACKUP_FILE, backup_data)
     
 
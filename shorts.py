@@ -0,0 +1,262 @@
+#short positions: /stockshort sells borrowed shares, /stockcover buys them back. a user has at most
+#one short per symbol, shorting more adds to it.
+#
+#the sale's proceeds plus short_margin of the value from the user's balance are held as collateral.
+#the user's part of it (the deposit) isn't counted as spent, only what a short makes or loses over
+#it counts as earned or spent once it's covered.
+#a borrow fee of short_fee_daily of the position's value is taken out of the collateral for every
+#day it's open, and a short whose collateral is under short_maintenance times its value is bought
+#in (covered by force) right after the price update that put it there.
+#
+#the fee is charged to every short at once: each symbol has a fee index, the fee one share has
+#paid since the bot started, and every market tick adds fee rate * elapsed days * price to the whole
+#vector in one numpy operation. a position keeps the collateral and fee index it had when it last
+#changed, its collateral right now is
+#
+#    collateral - shares * (fee index - fee index at the time)
+#
+#it's bought in once that's under maintenance * shares * price, i.e. once
+#
+#    collateral / shares + fee index at the time  <  fee index + maintenance * price
+#
+#the left side never changes while the position is untouched, so each symbol keeps its shorts in a
+#list sorted by it and a tick finds every buy-in with one bisect, like margin.py does.
+#the positions are kept in memory and written to SHORTS_FILE whenever they change. buy-ins are at
+#the tick's price, shorts opened and covered by hand fill along liquidity.py's curve.
+import datetime
+import math
+import os
+import numpy as np
+from sortedcontainers import SortedList
+from globals import SHORTS_FILE, SHORT_FEE_DAILY, SHORT_MARGIN, SHORT_MAINTENANCE
+import economy
+import liquidity
+import snapshots
+
+_positions = None
+#symbol -> SortedList of (buy-in key, position id), the first to be bought in first
+_sorted = {}
+#user id -> {symbol: position id}
+_by_user = {}
+_next_id = 1
+#symbol -> position in _fee_index
+_symbols = {}
+_fee_index = np.zeros(0)
+_charged_at = None
+
+
+def _key(position):
+    return position["collateral"] / position["shares"] + position["fee_index"]
+
+
+def _index(position):
+    _sorted.setdefault(position["symbol"], SortedList()).add((_key(position), position["id"]))
+    _by_user.setdefault(position["user_id"], {})[position["symbol"]] = position["id"]
+
+
+def _unindex(position):
+    _sorted[position["symbol"]].remove((_key(position), position["id"]))
+    symbols = _by_user.get(position["user_id"])
+    if symbols is not None:
+        symbols.pop(position["symbol"], None)
+        if not symbols:
+            del _by_user[position["user_id"]]
+
+
+def _slot(symbol):
+    global _fee_index
+    slot = _symbols.get(symbol)
+    if slot is None:
+        slot = _symbols[symbol] = len(_symbols)
+        _fee_index = np.append(_fee_index, 0.0)
+    return slot
+
+
+def load():
+    """The open shorts, {position id: position}. Read from SHORTS_FILE on first use."""
+    global _positions, _next_id, _charged_at
+    if _positions is None:
+        saved = {}
+        if os.path.exists(SHORTS_FILE):
+            try:
+                saved = snapshots.load(SHORTS_FILE)
+            except ValueError:
+                print(f"{SHORTS_FILE} is unreadable, starting with no short positions.")
+        for symbol, value in saved.get("fee_index", {}).items():
+            slot = _slot(symbol)
+            _fee_index[slot] = value
+        _positions = {}
+        for position in saved.get("positions", []):
+            _positions[position["id"]] = position
+            _index(position)
+        _next_id = saved.get("next_id", max(_positions, default=0) + 1)
+        _charged_at = saved.get("charged_at") or datetime.datetime.now().isoformat()
+    return _positions
+
+
+def save():
+    load()
+    snapshots.save(SHORTS_FILE, {"next_id": _next_id, "charged_at": _charged_at,
+                                 "fee_index": dict(zip(_symbols, _fee_index.tolist())),
+                                 "positions": list(_positions.values())})
+
+
+def fee_index(symbol):
+    """The borrow fee one share of symbol has paid so far."""
+    load()
+    slot = _symbols.get(symbol)
+    return 0.0 if slot is None else float(_fee_index[slot])
+
+
+def fee_prices():
+    """{("fee", symbol): fee index}, priced like symbols so networth.py can value the fees owed."""
+    load()
+    return {("fee", symbol): value for symbol, value in zip(_symbols, _fee_index.tolist())}
+
+
+def collateral(position):
+    """What's left of the position's collateral after the fees so far."""
+    return position["collateral"] - position["shares"] * (fee_index(position["symbol"]) - position["fee_index"])
+
+
+def buy_in_price(position):
+    """The price the short is bought in at, given the fees so far."""
+    return (_key(position) - fee_index(position["symbol"])) / SHORT_MAINTENANCE
+
+
+def user_shorts(user_id):
+    """The user's open shorts, oldest first."""
+    positions = load()
+    return [positions[position_id] for position_id in sorted(_by_user.get(str(user_id), {}).values())]
+
+
+def user_short(user_id, symbol):
+    load()
+    position_id = _by_user.get(str(user_id), {}).get(symbol)
+    return None if position_id is None else _positions[position_id]
+
+
+def required(shares, price):
+    """What the user puts up on top of the sale's proceeds to short shares at price."""
+    return shares * price * SHORT_MARGIN
+
+
+def charge(prices, now=None):
+    """Take the borrow fee since the last call from every short, one vector operation for all of them."""
+    global _charged_at
+    load()
+    now = now or datetime.datetime.now()
+    days = (now - datetime.datetime.fromisoformat(_charged_at)).total_seconds() / 86400
+    if days <= 0:
+        return
+    for symbol in prices:
+        _slot(symbol)
+    price_vector = np.fromiter((prices.get(symbol, 0) for symbol in _symbols), dtype=np.float64, count=len(_symbols))
+    _fee_index[:] += SHORT_FEE_DAILY * days * price_vector
+    _charged_at = now.isoformat()
+    save()
+
+
+def open_short(user_id, symbol, shares, proceeds, deposit):
+    """Short shares more of symbol, sold for proceeds, with deposit taken from the user already. Returns the position."""
+    global _next_id
+    positions = load()
+    position = user_short(user_id, symbol)
+    if position is None:
+        position = {"id": _next_id, "user_id": str(user_id), "symbol": symbol, "shares": 0.0, "collateral": 0.0,
+                    "deposit": 0.0, "fee_index": fee_index(symbol), "opened": datetime.datetime.now().isoformat()}
+        _next_id += 1
+        positions[position["id"]] = position
+    else:
+        _unindex(position)
+        position["collateral"] = collateral(position)
+        position["fee_index"] = fee_index(symbol)
+    position["shares"] += shares
+    position["collateral"] += proceeds + deposit
+    #shorts from before deposits were tracked had theirs counted as spent already
+    position["deposit"] = position.get("deposit", 0.0) + deposit
+    _index(position)
+    save()
+    return position
+
+
+def cover(user_id, symbol, shares):
+    """Close shares of the user's short in symbol. Returns (position, shares covered, collateral released,
+    deposit released), None if there's no short. The caller pays for buying the shares back out of the
+    collateral released.
+    """
+    position = user_short(user_id, symbol)
+    if position is None:
+        return None
+    _unindex(position)
+    held = collateral(position)
+    shares = min(shares, position["shares"])
+    released = held * shares / position["shares"]
+    deposit = position.get("deposit", 0.0) * shares / position["shares"]
+    position["shares"] -= shares
+    #rounding can leave a speck of a share behind, close it out
+    if position["shares"] <= 1e-9:
+        released = held
+        deposit = position.get("deposit", 0.0)
+        del _positions[position["id"]]
+    else:
+        position["collateral"] = held - released
+        position["deposit"] = position.get("deposit", 0.0) - deposit
+        position["fee_index"] = fee_index(symbol)
+        _index(position)
+    save()
+    return position, shares, released, deposit
+
+
+def pay_out(record, returned, deposit):
+    """Credit what covering a short returned (negative if the user owes), deposit being the user's part
+    of the collateral it released. Only the difference counts as earned or spent."""
+    record["balance"] = record.get("balance", 0) + returned
+    profit = returned - deposit
+    if profit > 0:
+        record["total_earned"] = record.get("total_earned", 0) + profit
+    elif profit < 0:
+        record["total_spent"] = record.get("total_spent", 0) - profit
+
+
+def check(prices):
+    """Take out every short the new prices put under maintenance. Returns [(position, price)]."""
+    positions = load()
+    bought_in = []
+    for symbol, ranked in _sorted.items():
+        price = prices.get(symbol)
+        if price is None or not ranked:
+            continue
+        end = ranked.bisect_left((fee_index(symbol) + SHORT_MAINTENANCE * price, -math.inf))
+        if not end:
+            continue
+        for _, position_id in ranked[:end]:
+            position = positions.pop(position_id)
+            #still indexed under the key it had, take it out of the by-user map only
+            symbols = _by_user[position["user_id"]]
+            del symbols[symbol]
+            if not symbols:
+                del _by_user[position["user_id"]]
+            bought_in.append((position, price))
+        del ranked[:end]
+    if bought_in:
+        save()
+    return bought_in
+
+
+async def settle(bought_in):
+    """Buy back shorts from check() in one transaction. Returns one line per short for the market update."""
+    lines = []
+    if not bought_in:
+        return lines
+    async with economy.transaction(*{position["user_id"] for position, _ in bought_in}) as tx:
+        for position, price in bought_in:
+            record = tx[position["user_id"]]
+            cost = round(position["shares"] * price, 2)
+            liquidity.record(position["symbol"], position["shares"], cost)
+            #a price that gapped far enough leaves a shortfall, the bank eats it
+            returned = max(0.0, round(collateral(position) - cost, 2))
+            pay_out(record, returned, position.get("deposit", 0.0))
+            lines.append(f"<@{position['user_id']}> short {position['shares']:.4f} {position['symbol']} "
+                         f"bought in at {price} for {cost}, returned {returned}")
+    return lines
@@ -0,0 +1,186 @@
+#offline market simulator: runs the same engine as the live market (market.tick and the event
+#choice) with a seeded rng and a virtual clock, thousands of ticks a second, and never touches the
+#bot's files. use it to tune the event weights or the move distributions in market.py and to check
+#prices don't run away over months of ticks.
+#
+#    python simulate.py --ticks 26280 --seed 1                     a year of 20 minute ticks from stocks.json
+#    python simulate.py --symbols 500 --ticks 10000 --rally-weight 0.05 --output sim.json --paths paths.npy
+#
+#the report has per-symbol return, max drawdown, extreme moves and recovery boosts, the event
+#history, and a market-wide index (geometric mean of price / starting price) to spot inflation.
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import numpy as np
+import market
+
+TICK_MINUTES = 20
+#prices past this count as runaway in the report, float64 overflows to inf not far beyond
+RUNAWAY_PRICE = 1e12
+
+
+def _num(value, digits=None):
+    #json has no inf/nan, those become null
+    value = float(value)
+    if not np.isfinite(value):
+        return None
+    return round(value, digits) if digits is not None else value
+
+
+def synthetic_prices(count, rng):
+    """count symbols priced 5-1000, one in twenty a coin, for when there's no stocks.json."""
+    return {f"S{i:04d}COIN" if i % 20 == 0 else f"S{i:04d}": round(float(rng.uniform(5, 1000)), 2)
+            for i in range(count)}
+
+
+def simulate(prices, ticks, seed=0, events=market.EVENTS, start=None, tick_minutes=TICK_MINUTES, keep_paths=False):
+    """Run ticks market updates from {symbol: price}. Returns (report dict, paths or None).
+
+    paths is a (ticks + 1, symbols) array of every price when keep_paths is set.
+    """
+    rng = np.random.default_rng(seed)
+    clock = start or datetime.datetime(2025, 1, 1)
+    step = datetime.timedelta(minutes=tick_minutes)
+    symbols = list(prices)
+    current = np.fromiter(prices.values(), dtype=np.float64, count=len(symbols))
+    initial = current.copy()
+    is_coin = market.coin_mask(symbols)
+
+    paths = np.empty((ticks + 1, len(symbols))) if keep_paths else None
+    if keep_paths:
+        paths[0] = current
+    peak = current.copy()
+    max_drawdown = np.zeros(len(symbols))
+    low, high = current.copy(), current.copy()
+    moons = np.zeros(len(symbols), dtype=np.int64)
+    crashes = np.zeros(len(symbols), dtype=np.int64)
+    boosts = np.zeros(len(symbols), dtype=np.int64)
+    #market-wide index after every tick as log(geometric mean of price relative to the start).
+    #prices are clipped for it, coins can overflow to inf and a coin can be rounded to 0
+    log_index = np.empty(ticks + 1)
+    log_index[0] = 0.0
+    event_log = []
+    event_ticks = {"none": 0, "rally": 0, "crash": 0}
+
+    event = None
+    started = time.perf_counter()
+    for i in range(1, ticks + 1):
+        if event is None:
+            event = market.choose_new_market_event(rng, events)
+            if event:
+                event_log.append({"tick": i, "time": clock.isoformat(), **event})
+        event_type = event["event"] if event else None
+        event_ticks[event_type or "none"] += 1
+
+        #runaway coins overflow to inf here, the report counts them
+        with np.errstate(over="ignore", invalid="ignore"):
+            current, extreme, boost = market.tick(current, is_coin, event_type, rng)
+        moons += extreme >= 1
+        crashes += (extreme > 0) & (extreme < 1)
+        boosts += boost > 0
+        with np.errstate(all="ignore"):
+            np.maximum(peak, current, out=peak)
+            np.fmax(max_drawdown, 1 - current / peak, out=max_drawdown)
+            np.minimum(low, current, out=low)
+            np.maximum(high, current, out=high)
+            log_index[i] = np.mean(np.log(np.clip(current, 1e-300, 1e300) / initial))
+        if keep_paths:
+            paths[i] = current
+
+        event = market.advance_market_event(event)
+        clock += step
+    elapsed = time.perf_counter() - started
+
+    with np.errstate(all="ignore"):
+        returns = current / initial - 1
+    per_symbol = {
+        symbol: {
+            "start": _num(initial[j]),
+            "end": _num(current[j]),
+            "return_pct": _num(returns[j] * 100, 2),
+            "min": _num(low[j]),
+            "max": _num(high[j]),
+            "max_drawdown_pct": _num(max_drawdown[j] * 100, 2),
+            "mega_moons": int(moons[j]),
+            "mega_crashes": int(crashes[j]),
+            "recovery_boosts": int(boosts[j]),
+        }
+        for j, symbol in enumerate(symbols)
+    }
+    days = ticks * tick_minutes / 1440
+    report = {
+        "seed": seed,
+        "ticks": ticks,
+        "symbols": len(symbols),
+        "simulated_days": round(days, 2),
+        "end_time": clock.isoformat(),
+        "ticks_per_second": round(ticks / elapsed) if elapsed else None,
+        "index": {
+            "log10_end": _num(log_index[-1] / np.log(10), 3),
+            "log10_min": _num(log_index.min() / np.log(10), 3),
+            "log10_max": _num(log_index.max() / np.log(10), 3),
+            #compounded per simulated year, a quick read on whether prices inflate
+            "per_year_pct": _num(np.expm1(log_index[-1] * 365 / days) * 100, 2) if days else None,
+        },
+        "median_return_pct": _num(np.median(returns) * 100, 2),
+        "median_max_drawdown_pct": _num(np.median(max_drawdown) * 100, 2),
+        "runaway_symbols": int(np.count_nonzero(~(current < RUNAWAY_PRICE))),
+        "zeroed_symbols": int(np.count_nonzero(current == 0)),
+        "events": {
+            "started": {name: sum(1 for e in event_log if e["event"] == name) for name in ("rally", "crash")},
+            "ticks_in": event_ticks,
+            "log": event_log,
+        },
+        "per_symbol": per_symbol,
+    }
+    return report, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the stock market offline.")
+    parser.add_argument("--ticks", type=int, default=72 * 30, help="market updates to run (72 a day)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prices", default="stocks.json", help="starting prices, read only")
+    parser.add_argument("--symbols", type=int, help="use this many synthetic symbols instead of --prices")
+    parser.add_argument("--tick-minutes", type=int, default=TICK_MINUTES)
+    parser.add_argument("--rally-weight", type=float, help="chance a rally starts on a quiet tick")
+    parser.add_argument("--crash-weight", type=float, help="chance a crash starts on a quiet tick")
+    parser.add_argument("--output", help="write the full report here instead of a summary to stdout")
+    parser.add_argument("--paths", help="save every price path as a .npy array (ticks + 1, symbols)")
+    args = parser.parse_args()
+
+    if args.symbols:
+        prices = synthetic_prices(args.symbols, np.random.default_rng(args.seed))
+    elif os.path.exists(args.prices):
+        import snapshots
+        prices = snapshots.loads(open(args.prices, "rb").read())
+    else:
+        print(f"{args.prices} not found, pass --symbols N to simulate synthetic ones.")
+        sys.exit(1)
+
+    weights = dict(market.EVENTS)
+    if args.rally_weight is not None:
+        weights["rally"] = args.rally_weight
+    if args.crash_weight is not None:
+        weights["crash"] = args.crash_weight
+    weights["none"] = max(0.0, 1.0 - weights["rally"] - weights["crash"])
+    events = tuple((name, weights[name]) for name in ("none", "rally", "crash"))
+
+    report, paths = simulate(prices, args.ticks, args.seed, events, tick_minutes=args.tick_minutes,
+                             keep_paths=bool(args.paths))
+    report["event_weights"] = weights
+    if args.paths:
+        np.save(args.paths, paths)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    summary = {key: value for key, value in report.items() if key != "per_symbol"}
+    summary["events"] = {key: value for key, value in report["events"].items() if key != "log"}
+    print(json.dumps(summary, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#encoding for the state files (data.json, stocks.json, stock_history.json, options.json,
+#contracts.json, lottery.json). the format written is picked by snapshot_format in config.json:
+#    "orjson"  - compact json through orjson, falls back to compact stdlib json (default)
+#    "msgpack" - binary msgpack, needs the msgpack package
+#    "json"    - the old indent=4 stdlib json, easiest to read and edit by hand
+#reading works out the format from the file itself, so old pretty-printed files keep loading
+#and switching formats only changes how the next save is written.
+import json
+from globals import SNAPSHOT_FORMAT
+import fileio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+#msgpack files start with this, no json document can start with 0xff
+MSGPACK_MAGIC = b"\xffmsgpack\n"
+
+
+def json_line(obj):
+    """Compact single-line json as bytes, for append-only logs whatever the snapshot format."""
+    if orjson is not None:
+        #numpy scalars (option prices come out of numpy/scipy) are floats to the stdlib json, but
+        #orjson only takes them with OPT_SERIALIZE_NUMPY
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def dumps(obj, fmt=None):
+    """Encode obj in the configured snapshot format, returns bytes."""
+    fmt = fmt or SNAPSHOT_FORMAT
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("snapshot_format is msgpack but the msgpack package isn't installed.")
+        return MSGPACK_MAGIC + msgpack.packb(obj, use_bin_type=True)
+    if fmt == "json":
+        return json.dumps(obj, indent=4).encode()
+    return json_line(obj)
+
+
+def join_parts(parts, fmt=None):
+    """Encode a dict given as (key, json bytes of the value) pairs, like dumps(dict(parts)).
+
+    Lets a big dict be encoded a piece at a time on the event loop and joined in a worker thread.
+    """
+    fmt = fmt or SNAPSHOT_FORMAT
+    if fmt in ("json", "msgpack") or orjson is None:
+        return dumps({key: loads(value) for key, value in parts}, fmt)
+    return b"{" + b",".join(json_line(key) + b":" + value for key, value in parts) + b"}"
+
+
+def loads(raw):
+    """Decode bytes written by dumps() in any format. Raises ValueError on a corrupt file."""
+    if raw.startswith(MSGPACK_MAGIC):
+        if msgpack is None:
+            raise RuntimeError("This file is msgpack but the msgpack package isn't installed.")
+        try:
+            return msgpack.unpackb(raw[len(MSGPACK_MAGIC):], raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(f"Corrupt msgpack snapshot: {e}") from e
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def load(path):
+    """Read and decode a state file. Raises FileNotFoundError or ValueError like json.load did."""
+    return loads(fileio.read(path))
+
+
+def save(path, obj):
+    """Encode now, so later changes to obj don't leak in, and write in the background."""
+    return fileio.write(path, dumps(obj))
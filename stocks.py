@@ -1,69 +1,52 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import json
-import random
 import datetime
-from globals import STOCK_FILE, STOCK_HISTORY_FILE, UPDATE_INTERVAL_MINUTES, GUILD_ID
+from globals import (STOCK_FILE, UPDATE_INTERVAL_MINUTES, GUILD_ID, ALERT_DMS_PER_SECOND, MARGIN_INTEREST_DAILY,
+                     MARGIN_MAINTENANCE, MARGIN_MAX_LEVERAGE, SHORT_FEE_DAILY, SHORT_MAINTENANCE)
 from utils import load_data, save_data
+import economy
+import filecache
+import market
+import pricehistory
+import charts
+import orders
+import alerts
+import margin
+import shorts
+import baskets
+import liquidity
+import networth
+import networthhistory
+import io
+import numpy as np
+import copy
 from typing import Optional
 import pytz
 
 #helper functions for stocks:
 def load_stocks():
     try:
-        with open(STOCK_FILE, "r") as f:
-            data = json.load(f)
-            if not isinstance(data, dict):
-                raise ValueError("Stocks data is not a dictionary.")
-            return data
-    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        #copied because callers update prices in place before saving
+        data = filecache.load(STOCK_FILE, copy=copy.copy)
+        if not isinstance(data, dict):
+            raise ValueError("Stocks data is not a dictionary.")
+        return data
+    except (FileNotFoundError, ValueError):
         default_data = {"INK": 300.0, "BEANEDCOIN": 10.0}
         save_stocks(default_data)
         return default_data
 
 def save_stocks(data):
-    with open(STOCK_FILE, "w") as f:
-        json.dump(data, f, indent=4)
-
-def load_stock_history():
-    try:
-        with open(STOCK_HISTORY_FILE, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def save_stock_history(history):
-    with open(STOCK_HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=4)
-
-def choose_new_market_event():
-    events = [
-        ("none", 0.96),
-        ("rally", 0.02),
-        ("crash", 0.02)
-    ]
-    total_weight = sum(weight for event, weight in events)
-    r = random.random() * total_weight
-    cumulative = 0
-    for event, weight in events:
-        cumulative += weight
-        if r < cumulative:
-            if event == "none":
-                return None
-            else:
-                duration = random.randint(1, 3)
-                return {"event": event, "duration": duration}
-    return None
+    filecache.save(STOCK_FILE, data, copy=copy.copy)
 
 def update_stock_prices(current_market_event):
     data = load_stocks()
-    history = load_stock_history()
-    now_iso = datetime.datetime.now().isoformat()
+    now = datetime.datetime.now()
     changes = {}
 
     if current_market_event is None:
-        current_market_event = choose_new_market_event()
+        current_market_event = market.choose_new_market_event()
         if current_market_event:
             print(f"[Market Event] New event started: {current_market_event}")
         else:
@@ -71,161 +54,195 @@ def update_stock_prices(current_market_event):
 
     event_type = current_market_event["event"] if current_market_event else None
 
-    for stock, price in data.items():
-        old_price = price
-        is_coin = "COIN" in stock.upper()
+    #baskets don't move on their own, they're repriced from their parts below. one whose definition
+    #is invalid (a part was removed, ...) can't be, it moves like a stock until it's fixed
+    basket_names = baskets.names()
+    parts = [symbol for symbol in data if symbol not in basket_names]
+    definitions, weights = baskets.load(parts)
+    invalid = [symbol for symbol in data if symbol in basket_names and symbol not in definitions]
+    for symbol in invalid:
+        print(f"[Baskets] {symbol} isn't a valid basket, it moves like a stock this update.")
+    symbols = parts + invalid
+    old_prices = np.fromiter((data[symbol] for symbol in symbols), dtype=np.float64, count=len(symbols))
+    is_coin = market.coin_mask(symbols)
+    #what was traded since the last update pushes each symbol on top of its random move
+    drift, volumes = liquidity.close_tick(symbols, old_prices.tolist())
+    new_prices, extreme, boost = market.tick(old_prices, is_coin, event_type, drift=drift)
 
-        # RANDOM CYCLE EFFECTS - each stock randomly enters different phases
-        cycle_roll = random.random()
-        
-        # 10% chance of entering a specific cycle each update
-        if cycle_roll < 0.02:  # 2% bubble phase
-            cycle_effect = "bubble"
-        elif cycle_roll < 0.04:  # 2% crash phase  
-            cycle_effect = "crash"
-        elif cycle_roll < 0.06:  # 2% recovery phase
-            cycle_effect = "recovery"
+    for i in np.flatnonzero(extreme):
+        if extreme[i] >= 1:
+            print(f"🚀 {symbols[i]} MEGA MOON! {extreme[i]:.1f}x gain!")
         else:
-            cycle_effect = "normal"
-
-        if is_coin:
-            # COINS - Wild and unpredictable
-            if event_type == "rally":
-                if random.random() < 0.70:
-                    change_percent = random.uniform(0.20, 1.20)  # 20-120% gains possible
-                    new_price = price * (1 + change_percent)
-                else:
-                    change_percent = random.uniform(-0.30, 0.50)
-                    new_price = price * (1 + change_percent)
-            elif event_type == "crash":
-                if random.random() < 0.70:
-                    change_percent = random.uniform(0.15, 0.70)  # 15-70% crashes
-                    new_price = price * (1 - change_percent)
-                else:
-                    change_percent = random.uniform(-0.40, 0.30)
-                    new_price = price * (1 + change_percent)
-            else:
-                # Normal movement but with cycle effects
-                if cycle_effect == "bubble":
-                    # Bubble phase - strong upward bias
-                    change_percent = random.uniform(0.30, 2.00)  # 30-200% pump
-                    new_price = price * (1 + change_percent)
-                elif cycle_effect == "crash":
-                    # Crash phase - strong downward movement
-                    change_percent = random.uniform(0.40, 0.85)  # 40-85% dump
-                    new_price = price * (1 - change_percent)
-                elif cycle_effect == "recovery":
-                    # Recovery phase - moderate upward bias
-                    change_percent = random.uniform(0.10, 0.60)  # 10-60% recovery
-                    new_price = price * (1 + change_percent)
-                else:
-                    # Normal chaos: -70% to +150%
-                    change_percent = random.uniform(-0.70, 1.50)
-                    new_price = price * (1 + change_percent)
-                
-            # Set minimum but no maximum
-            new_price = max(round(new_price, 8), 0.00000001)
-            
-        else:
-            # REGULAR STOCKS - More stable but still can moon/crash
-            if event_type == "rally":
-                if random.random() < 0.70:
-                    change_percent = random.uniform(0.10, 0.35)  # 10-35% rally
-                    new_price = price * (1 + change_percent)
-                else:
-                    change_percent = random.uniform(-0.05, 0.15)
-                    new_price = price * (1 + change_percent)
-            elif event_type == "crash":
-                if random.random() < 0.70:
-                    change_percent = random.uniform(0.10, 0.35)  # 10-35% crash
-                    new_price = price * (1 - change_percent)
-                else:
-                    change_percent = random.uniform(-0.05, 0.10)
-                    new_price = price * (1 + change_percent)
-            else:
-                # Cycle effects for stocks too
-                if cycle_effect == "bubble":
-                    # Stock bubble - strong gains
-                    change_percent = random.uniform(0.20, 0.80)  # 20-80% pump
-                    new_price = price * (1 + change_percent)
-                elif cycle_effect == "crash":
-                    # Stock crash
-                    change_percent = random.uniform(0.25, 0.60)  # 25-60% dump
-                    new_price = price * (1 - change_percent)
-                elif cycle_effect == "recovery":
-                    # Stock recovery
-                    change_percent = random.uniform(0.08, 0.40)  # 8-40% recovery
-                    new_price = price * (1 + change_percent)
-                else:
-                    # Rare mega moves
-                    if random.random() < 0.01:  # 1% chance
-                        jump_factor = random.uniform(0.40, 1.20)  # 40-120% mega move
-                        if random.random() < 0.5:
-                            new_price = price * (1 + jump_factor)  # Moon
-                        else:
-                            new_price = price * (1 - min(jump_factor, 0.90))  # Crash (max 90% down)
-                    else:
-                        # Normal: -12% to +12%
-                        change_percent = random.uniform(-0.12, 0.12)
-                        new_price = price * (1 + change_percent)
-            
-            # Set minimum
-            new_price = max(round(new_price, 2), 0.01)
-
-        # RANDOM INTERVENTION - very rare extreme events
-        extreme_roll = random.random()
-        if extreme_roll < 0.001:  # 0.1% chance per stock per update
-            if random.random() < 0.5:
-                # MEGA MOON - 500-2000% gain
-                moon_factor = random.uniform(5.0, 20.0)
-                new_price = price * moon_factor
-                print(f"🚀 {stock} MEGA MOON! {moon_factor:.1f}x gain!")
-            else:
-                # MEGA CRASH - 80-95% loss
-                crash_factor = random.uniform(0.05, 0.20)
-                new_price = price * crash_factor
-                print(f"💥 {stock} MEGA CRASH! {(1-crash_factor)*100:.0f}% loss!")
-
-        # Recovery boost if hitting minimum
-        if (is_coin and new_price <= 0.00000001) or (not is_coin and new_price <= 0.01):
-            boost = random.uniform(0.20, 1.50)  # 20-150% recovery boost
-            new_price = new_price * (1 + boost)
-            if is_coin:
-                new_price = round(new_price, 8)
-            else:
-                new_price = round(new_price, 2)
-            print(f"🔄 {stock} RECOVERY BOOST! +{boost*100:.0f}%")
+            print(f"💥 {symbols[i]} MEGA CRASH! {(1-extreme[i])*100:.0f}% loss!")
+    for i in np.flatnonzero(boost):
+        print(f"🔄 {symbols[i]} RECOVERY BOOST! +{boost[i]*100:.0f}%")
 
+    absolute = np.where(is_coin, np.round(new_prices - old_prices, 8), np.round(new_prices - old_prices, 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(old_prices != 0, np.round((new_prices - old_prices) / old_prices * 100, 2), 0)
+    for stock, old_price, new_price, absolute_change, percent_change in zip(
+            symbols, old_prices.tolist(), new_prices.tolist(), absolute.tolist(), percent.tolist()):
         data[stock] = new_price
-        absolute_change = round(new_price - old_price, 8 if is_coin else 2)
-        percent_change = round(((new_price - old_price) / old_price) * 100, 2) if old_price != 0 else 0
         changes[stock] = {"old": old_price, "new": new_price, "abs": absolute_change, "perc": percent_change}
-        
-        if stock not in history:
-            history[stock] = []
-        history[stock].append({"timestamp": now_iso, "price": new_price})
 
-    if current_market_event:
-        current_market_event["duration"] -= 1
-        if current_market_event["duration"] <= 0:
-            print(f"[Market Event] Event ended: {current_market_event}")
-            current_market_event = None
+    #parts come first in symbols, the matrix's columns are theirs
+    repriced = baskets.reprice(definitions, weights, old_prices[:len(parts)], new_prices[:len(parts)], data)
+    for basket, new_price in repriced.items():
+        old_price = data.get(basket, new_price)
+        data[basket] = new_price
+        changes[basket] = {"old": old_price, "new": new_price, "abs": round(new_price - old_price, 2),
+                           "perc": round((new_price - old_price) / old_price * 100, 2)}
+
+    event = current_market_event
+    current_market_event = market.advance_market_event(event)
+    if event and current_market_event is None:
+        print(f"[Market Event] Event ended: {event}")
 
     save_stocks(data)
-    save_stock_history(history)
+    pricehistory.append(data, now, volumes)
     print("Stock prices updated:", data)
     return changes, current_market_event
 
 
+def fill_note(price, value, shares):
+    """How a market fill of shares for value compared to the posted price, for the reply."""
+    average = value / shares
+    return f"an average of {round(average, 8)} per share ({(average - price) / price * 100:+.2f}% against the market price of {price})"
+
+
+MAX_TRADE_LEGS = 10
+
+def parse_legs(text):
+    """Split "buy INK 5000, sell BEANEDCOIN all, buy ACME 25%" into [(side, symbol, amount)].
+
+    amount is "all", a float, or ("%", fraction). Raises ValueError with a message for the user.
+    """
+    legs = []
+    for part in text.replace(";", ",").split(","):
+        words = part.split()
+        if not words:
+            continue
+        if len(words) != 3 or words[0].lower() not in ("buy", "sell"):
+            raise ValueError(f"Couldn't read `{part.strip()}`, each leg is `buy|sell SYMBOL amount`.")
+        side, symbol, amount = words[0].lower(), words[1].upper(), words[2].lower()
+        try:
+            if amount == "all":
+                pass
+            elif amount.endswith("%"):
+                amount = ("%", float(amount[:-1]) / 100)
+                if not 0 < amount[1] <= 1:
+                    raise ValueError
+            else:
+                amount = float(amount)
+                if amount <= 0:
+                    raise ValueError
+        except ValueError:
+            raise ValueError(f"Invalid amount in `{part.strip()}`, use a positive number, a percentage or 'all'.")
+        legs.append((side, symbol, amount))
+    if not legs:
+        raise ValueError("No trades given.")
+    if len(legs) > MAX_TRADE_LEGS:
+        raise ValueError(f"At most {MAX_TRADE_LEGS} legs per trade.")
+    return legs
+
+def plan_trade(legs, prices, balance, portfolio):
+    """Work out every leg against one price snapshot without touching the user.
+
+    Sells run first so their proceeds can fund the buys, a buy percentage is of the balance after
+    the sells. Each leg fills along the liquidity curve after this tick's flow and the legs before
+    it. Returns (fills, balance, portfolio) with fills as (side, symbol, shares, average price, value),
+    for the caller to liquidity.record once the trade goes through.
+    Raises ValueError if any leg can't be done, in which case nothing is.
+    """
+    portfolio = dict(portfolio)
+    fills = []
+    #symbol -> net shares traded so far, this tick's flow plus the legs before
+    flows = {}
+    for side, symbol, amount in legs:
+        if symbol not in prices:
+            raise ValueError(f"Invalid stock symbol {symbol}.")
+    for side, symbol, amount in legs:
+        if side != "sell":
+            continue
+        owned = portfolio.get(symbol, 0)
+        if amount == "all":
+            shares = owned
+        elif isinstance(amount, tuple):
+            shares = owned * amount[1]
+        else:
+            shares = amount
+        if owned <= 0 or shares <= 0:
+            raise ValueError(f"You do not own any shares of {symbol}.")
+        if shares > owned:
+            raise ValueError(f"You do not own enough shares of {symbol} to sell {shares}.")
+        x = flows.get(symbol, liquidity.flow(symbol))
+        value = round(liquidity.quote_sell(symbol, prices[symbol], shares, x), 2)
+        flows[symbol] = x - shares
+        portfolio[symbol] = owned - shares
+        if portfolio[symbol] <= 0:
+            del portfolio[symbol]
+        balance += value
+        fills.append(("sell", symbol, shares, value / shares, value))
+    buying_power = balance
+    for side, symbol, amount in legs:
+        if side != "buy":
+            continue
+        if amount == "all":
+            value = balance
+        elif isinstance(amount, tuple):
+            value = buying_power * amount[1]
+        else:
+            value = amount
+        if value <= 0:
+            raise ValueError(f"Nothing left to buy {symbol} with.")
+        #percentages adding up to 100% can miss the balance by a rounding error
+        if value > balance and value - balance < 1e-6:
+            value = balance
+        if value > balance:
+            raise ValueError(f"You do not have enough Beaned Bucks to invest {value} in {symbol}.")
+        x = flows.get(symbol, liquidity.flow(symbol))
+        shares = liquidity.quote_buy(symbol, prices[symbol], value, x)
+        flows[symbol] = x + shares
+        balance -= value
+        portfolio[symbol] = portfolio.get(symbol, 0) + shares
+        fills.append(("buy", symbol, shares, value / shares, value))
+    return fills, balance, portfolio
+
+
 class StocksCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.current_market_event = None
         self.market_task = tasks.loop(minutes=UPDATE_INTERVAL_MINUTES)(self.market_update_task)
         self.market_task.start()
+        self.alert_task = tasks.loop(seconds=1)(self.send_alerts)
+        self.alert_task.start()
 
     async def market_update_task(self):
         changes, self.current_market_event = update_stock_prices(self.current_market_event)
+        #settle resting orders against the new prices before anyone can react to them
+        prices = {stock: change["new"] for stock, change in changes.items()}
+        fills = orders.match(prices)
+        filled = await orders.settle(fills)
+        if filled:
+            print(f"[Orders] {len(filled)} order(s) filled.")
+        #interest first, so positions are checked against what they owe now
+        margin.accrue()
+        liquidated = await margin.settle(margin.check(prices))
+        if liquidated:
+            print(f"[Margin] {len(liquidated)} position(s) liquidated.")
+        #the borrow fee for every short in one go, then buy in the ones it and the prices ran dry
+        shorts.charge(prices)
+        bought_in = await shorts.settle(shorts.check(prices))
+        if bought_in:
+            print(f"[Shorts] {len(bought_in)} short(s) bought in.")
+        fired = alerts.check(prices, {stock: change["old"] for stock, change in changes.items()})
+        if fired:
+            alerts.notify(fired)
+            print(f"[Alerts] {len(fired)} alert(s) fired.")
+        #everyone's net worth at the new prices, one vectorized pass over the networth index
+        ids, samples = networth.samples(prices)
+        networthhistory.append(ids, samples)
         channel = discord.utils.get(self.bot.get_all_channels(), name="bot-output")
         if channel:
             embed = discord.Embed(
@@ -241,15 +258,65 @@ class StocksCog(commands.Cog):
                     value=f"**Old:** {change['old']}\n**New:** {change['new']}\n**Change:** {sign}{change['abs']} ({sign}{change['perc']}%)",
                     inline=True
                 )
+            #an embed holds 25 fields, with that many stocks these get their own message below
+            overflow = []
+            for name, lines in (("Margin Liquidations", liquidated), ("Short Buy-ins", bought_in)):
+                if not lines:
+                    continue
+                if len(embed.fields) >= 25:
+                    overflow.append((name, lines))
+                    continue
+                value = ""
+                for i, line in enumerate(lines):
+                    more = f"\n...and {len(lines) - i} more"
+                    if len(value) + len(line) + 1 + len(more) > 1024:
+                        value += more
+                        break
+                    value += "\n" + line
+                embed.add_field(name=f"{name} ({len(lines)})", value=value.strip(), inline=False)
             try:
                 await channel.send(embed=embed)
             except Exception as e:
                 print(f"Failed to send stock update embed: {e}")
+            if filled:
+                await self._send_lines(channel, "**Orders filled:**", filled)
+            for name, lines in overflow:
+                await self._send_lines(channel, f"**{name}:**", lines)
+
+    async def _send_lines(self, channel, title, lines):
+        #one message per batch of lines that fits in discord's 2000 character limit
+        message = title
+        for line in lines:
+            if len(message) + len(line) + 1 > 2000:
+                await self._send_mentions(channel, message)
+                message = ""
+            message += "\n" + line
+        await self._send_mentions(channel, message)
+
+    async def _send_mentions(self, channel, message):
+        try:
+            await channel.send(message, allowed_mentions=discord.AllowedMentions(users=True))
+        except Exception as e:
+            print(f"Failed to send market update message: {e}")
+
+    async def send_alerts(self):
+        """DM the users whose alerts fired, ALERT_DMS_PER_SECOND of them per run, one message each."""
+        for user_id, lines in alerts.outbox(ALERT_DMS_PER_SECOND):
+            message = "**Price alert:**\n" + "\n".join(lines)
+            if len(message) > 2000:
+                message = message[:1997] + "..."
+            try:
+                user = self.bot.get_user(int(user_id)) or await self.bot.fetch_user(int(user_id))
+                await user.send(message)
+            except Exception as e:
+                #not found or DMs closed, the alert is used up either way
+                print(f"Failed to DM price alert to {user_id}: {e}")
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="stockbuy", description="Buy stock using your Beaned Bucks.")
-    @app_commands.describe(stock="Stock symbol (e.g. ACME)", amount="Amount to invest (or 'all')")
-    async def stockbuy(self, interaction: discord.Interaction, stock: str, amount: str):
+    @app_commands.describe(stock="Stock symbol (e.g. ACME)", amount="Amount to invest (or 'all')",
+                           leverage="Optional: buy this many times the amount, borrowing the rest (see /margin)")
+    async def stockbuy(self, interaction: discord.Interaction, stock: str, amount: str, leverage: Optional[float] = None):
         stocks_data = load_stocks()
         stock = stock.upper()
         if stock not in stocks_data:
@@ -259,7 +326,7 @@ class StocksCog(commands.Cog):
         price = stocks_data[stock]
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "portfolio": {}, "total_spent": 0, "total_earned": 0})
+        user_record = data.user(user_id)
         current_balance = float(user_record.get("balance", 0))
 
         #determine investment amount.
@@ -278,8 +345,12 @@ class StocksCog(commands.Cog):
         if invest_amount > current_balance:
             await interaction.response.send_message(f"You do not have enough Beaned Bucks to invest {invest_amount}.", ephemeral=True)
             return
+        if leverage is not None and leverage != 1:
+            await self._margin_buy(interaction, stock, price, invest_amount, leverage)
+            return
 
-        shares = invest_amount / price
+        #big orders fill further up the curve, see liquidity.py
+        shares = liquidity.buy(stock, price, invest_amount)
         user_record["balance"] = current_balance - invest_amount
         portfolio = user_record.get("portfolio", {})
         portfolio[stock] = portfolio.get(stock, 0) + shares
@@ -287,14 +358,50 @@ class StocksCog(commands.Cog):
         user_record["total_spent"] = user_record.get("total_spent", 0) + invest_amount
 
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
 
         await interaction.response.send_message(
-            f"Successfully invested {invest_amount} Beaned Bucks in {stock} at {price} per share.\n"
+            f"Successfully invested {invest_amount} Beaned Bucks in {stock} at {fill_note(price, invest_amount, shares)}.\n"
             f"You now own {portfolio[stock]} shares of {stock}.\n"
             f"Your new balance is {user_record['balance']} Beaned Bucks."
         )
 
+    async def _margin_buy(self, interaction, stock, price, equity, leverage):
+        user_id = str(interaction.user.id)
+        if not 1 < leverage <= MARGIN_MAX_LEVERAGE:
+            await interaction.response.send_message(f"Leverage must be over 1 and at most {MARGIN_MAX_LEVERAGE}.", ephemeral=True)
+            return
+        if price <= 0:
+            await interaction.response.send_message(f"{stock} can't be bought on margin at a price of {price}.", ephemeral=True)
+            return
+        if len(margin.user_positions(user_id)) >= margin.MAX_POSITIONS_PER_USER:
+            await interaction.response.send_message(
+                f"You can have at most {margin.MAX_POSITIONS_PER_USER} margin positions, close one with /margin first.", ephemeral=True)
+            return
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            current_balance = float(user_record.get("balance", 0))
+            if equity > current_balance:
+                await interaction.response.send_message(f"You do not have enough Beaned Bucks to invest {equity}.", ephemeral=True)
+                return
+            #slippage can leave a big position under maintenance before the price even moves
+            shares = liquidity.quote_buy(stock, price, equity * leverage)
+            if shares * price * (1 - MARGIN_MAINTENANCE) <= equity * (leverage - 1):
+                await interaction.response.send_message(
+                    f"At {fill_note(price, equity * leverage, shares)} that position would be liquidated at the next update, "
+                    f"buy less or with less leverage.", ephemeral=True)
+                return
+            user_record["balance"] = current_balance - equity
+            user_record["total_spent"] = user_record.get("total_spent", 0) + equity
+            shares = liquidity.buy(stock, price, equity * leverage)
+            position = margin.open_position(user_id, stock, equity * leverage / shares, equity, leverage)
+        await interaction.response.send_message(
+            f"Margin position #{position['id']} opened: {shares} shares of {stock} at {fill_note(price, equity * leverage, shares)}, "
+            f"{equity} Beaned Bucks of yours and {round(position['borrowed'], 2)} borrowed.\n"
+            f"It's liquidated if {stock} drops under {round(margin.liquidation_price(position), 8)}. Close it with /margin.\n"
+            f"Your new balance is {user_record['balance']} Beaned Bucks."
+        )
+
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="portfolio", description="View your stock portfolio.")
     @app_commands.describe(user="Optional: The user whose portfolio you want to see (defaults to yourself)")
@@ -302,7 +409,7 @@ class StocksCog(commands.Cog):
         target = user or interaction.user
         data = load_data()
         user_id = str(target.id)
-        user_record = data.get(user_id, {"balance": 0, "portfolio": {}, "total_spent": 0, "total_earned": 0})
+        user_record = data.user(user_id)
         portfolio_holdings = user_record.get("portfolio", {})
 
         stock_prices = load_stocks()
@@ -331,6 +438,15 @@ class StocksCog(commands.Cog):
                 value=f"{round(total_value, 2)} Beaned Bucks",
                 inline=False
             )
+        for position in shorts.user_shorts(user_id):
+            price = stock_prices.get(position["symbol"], 0)
+            embed.add_field(
+                name=f"{position['symbol']} (short)",
+                value=f"Shares: {position['shares']}\nPrice: {price} Beaned Bucks\n"
+                      f"Collateral: {round(shorts.collateral(position), 2)} Beaned Bucks\n"
+                      f"Buy-in price: {round(shorts.buy_in_price(position), 8)}",
+                inline=True
+            )
         
         #add profit tracking
         total_spent = user_record.get("total_spent", 0)
@@ -342,6 +458,39 @@ class StocksCog(commands.Cog):
         
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="networth", description="Chart your (or someone's) net worth over time.")
+    @app_commands.rename(period="range")
+    @app_commands.describe(user="Optional: The user whose net worth you want to see (defaults to yourself)",
+                           period="Optional: 1d, 1w (default), 1m, 1y or all")
+    async def networth(self, interaction: discord.Interaction, user: Optional[discord.Member] = None,
+                       period: Optional[str] = None):
+        target = user or interaction.user
+        period = (period or "1w").lower()
+        if period not in charts.PERIODS:
+            await interaction.response.send_message("Range must be 1d, 1w, 1m, 1y or all.", ephemeral=True)
+            return
+        prices = load_stocks()
+        parts = networth.breakdown(target.id, prices)
+        embed = discord.Embed(title=f"{target.display_name}'s Net Worth", color=discord.Color.green())
+        embed.description = f"**{round(sum(parts.values()), 2)} Beaned Bucks**"
+        for name, value in parts.items():
+            embed.add_field(name=name.capitalize(), value=f"{round(value, 2)} Beaned Bucks", inline=True)
+        #drawn in the chart process pool, defer so slow renders don't time out the interaction
+        await interaction.response.defer()
+        try:
+            png = await charts.networth_chart(target.id, target.display_name, period)
+        except Exception as e:
+            print(f"Failed to render net worth chart for {target.id}: {e}")
+            await interaction.followup.send(embed=embed)
+            return
+        if png is None:
+            embed.set_footer(text="No history yet, it's sampled after every market update.")
+            await interaction.followup.send(embed=embed)
+            return
+        embed.set_image(url="attachment://networth.png")
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="networth.png"))
+
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="stocksell", description="Sell a specific stock in shares.")
     @app_commands.describe(
@@ -362,7 +511,7 @@ class StocksCog(commands.Cog):
         #load user data.
         data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "portfolio": {}, "total_spent": 0, "total_earned": 0})
+        user_record = data.user(user_id)
         portfolio = user_record.get("portfolio", {})
 
         if stock not in portfolio:
@@ -387,7 +536,7 @@ class StocksCog(commands.Cog):
             await interaction.response.send_message("You do not own enough shares of that stock to sell.", ephemeral=True)
             return
 
-        sale_value = round(price * sell_quantity, 2)
+        sale_value = liquidity.sell(stock, price, sell_quantity)
 
         #update portfolio.
         portfolio[stock] -= sell_quantity
@@ -402,18 +551,23 @@ class StocksCog(commands.Cog):
         user_record["total_earned"] = user_record.get("total_earned", 0) + sale_value
 
         data[user_id] = user_record
-        save_data(data)
+        save_data(data, user_id)
 
         await interaction.response.send_message(
-            f"Successfully sold {sell_quantity} shares of {stock} at {price} Beaned Bucks each for a total of {sale_value} Beaned Bucks.\n"
+            f"Successfully sold {sell_quantity} shares of {stock} at {fill_note(price, sale_value, sell_quantity)} "
+            f"for a total of {sale_value} Beaned Bucks.\n"
             f"Your new balance is {user_record['balance']} Beaned Bucks."
         )
 
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="stocks", description="View current stock prices, or view a specific stock's price history.")
-    @app_commands.describe(stock="Optional: The stock symbol to view history for")
-    async def stocks(self, interaction: discord.Interaction, stock: Optional[str] = None):
+    @app_commands.describe(stock="Optional: The stock symbol to view history for",
+                           timeframe="Optional: show hourly (1h), daily (1d) or weekly (1w) candles instead of the last updates",
+                           period="Optional: chart range, 1d, 1w (default), 1m, 1y or all",
+                           style="Optional: line (default) or candle chart")
+    async def stocks(self, interaction: discord.Interaction, stock: Optional[str] = None, timeframe: Optional[str] = None,
+                     period: Optional[str] = None, style: Optional[str] = None):
         current_prices = load_stocks()
         
         #if no specific stock is provided, display current prices for all stocks.
@@ -427,26 +581,442 @@ class StocksCog(commands.Cog):
             if stock not in current_prices:
                 await interaction.response.send_message(f"Stock symbol '{stock}' not found.", ephemeral=True)
                 return
+            period = (period or "1w").lower()
+            style = (style or "line").lower()
+            if timeframe is not None:
+                timeframe = timeframe.lower()
+            if timeframe is not None and timeframe not in pricehistory.TIMEFRAMES:
+                await interaction.response.send_message("Timeframe must be 1h, 1d or 1w.", ephemeral=True)
+                return
+            if period not in charts.PERIODS or style not in charts.STYLES:
+                await interaction.response.send_message("Period must be 1d, 1w, 1m, 1y or all and style line or candle.", ephemeral=True)
+                return
 
             #retrieve current price.
             price = current_prices[stock]
             embed = discord.Embed(title=f"{stock} Stock Information", color=discord.Color.green())
             embed.add_field(name="Current Price", value=f"{price} Beaned Bucks", inline=False)
+            parts = baskets.definitions(current_prices).get(stock)
+            if parts:
+                embed.add_field(name="Basket", value=", ".join(f"{round(weight * 100, 2):g}% {symbol}" for symbol, weight in parts.items()),
+                                inline=False)
             
-            #load the stock history.
-            history = load_stock_history()
-            if stock in history and history[stock]:
-                history_text = "**Price History (last 10 updates):**\n" 
-                for record in history[stock][-10:]:
-                    timestamp = record["timestamp"]
-                    hist_price = record["price"]
-                    history_text += f"{timestamp}: {hist_price}\n"
-                embed.add_field(name="History", value=history_text, inline=False)
+            if timeframe is not None:
+                #pre-aggregated candles, long ranges never touch the raw ticks.
+                candles = pricehistory.tail_candles(stock, timeframe, 10)
+                if candles:
+                    history_text = f"**{timeframe} candles (open / high / low / close):**\n"
+                    for start, open_price, high, low, close in candles:
+                        history_text += f"{start.isoformat()}: {open_price} / {high} / {low} / {close}\n"
+                    embed.add_field(name="History", value=history_text, inline=False)
+                else:
+                    embed.add_field(name="History", value="No history available.", inline=False)
             else:
-                embed.add_field(name="History", value="No history available.", inline=False)
-            
-            await interaction.response.send_message(embed=embed)
+                #the last 10 points, read off the end of the symbol's history file.
+                history = pricehistory.tail(stock, 10, volume=True)
+                if history:
+                    history_text = "**Price History (last 10 updates):**\n" 
+                    for timestamp, hist_price, traded in history:
+                        history_text += f"{timestamp.isoformat()}: {hist_price}"
+                        history_text += f" (traded {traded})\n" if traded else "\n"
+                    embed.add_field(name="History", value=history_text, inline=False)
+                else:
+                    embed.add_field(name="History", value="No history available.", inline=False)
+
+            #a chart that isn't cached yet is drawn in a worker process, which can take longer than
+            #discord waits for a first response.
+            await interaction.response.defer()
+            try:
+                png = await charts.chart(stock, period, style)
+            except Exception as e:
+                print(f"Failed to render chart for {stock}: {e}")
+                png = None
+            if png is None:
+                await interaction.followup.send(embed=embed)
+                return
+            embed.set_image(url="attachment://chart.png")
+            await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="chart.png"))
+
+
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="trade", description="Buy and sell several stocks at once, all at the same prices.")
+    @app_commands.describe(legs="e.g. buy INK 5000, sell BEANEDCOIN all, buy ACME 25% (buys in Beaned Bucks, sells in shares)")
+    async def trade(self, interaction: discord.Interaction, legs: str):
+        try:
+            parsed = parse_legs(legs)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        #one snapshot for every leg, nothing can move between them
+        prices = load_stocks()
+        user_id = str(interaction.user.id)
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            try:
+                fills, balance, portfolio = plan_trade(
+                    parsed, prices, float(user_record.get("balance", 0)), user_record.get("portfolio", {}))
+            except ValueError as e:
+                await interaction.response.send_message(f"{e} No trades were made.", ephemeral=True)
+                return
+            for side, symbol, shares, _, value in fills:
+                liquidity.record(symbol, shares if side == "buy" else -shares, value)
+            spent = sum(value for side, _, _, _, value in fills if side == "buy")
+            earned = sum(value for side, _, _, _, value in fills if side == "sell")
+            user_record["balance"] = balance
+            user_record["portfolio"] = portfolio
+            if spent:
+                user_record["total_spent"] = user_record.get("total_spent", 0) + spent
+            if earned:
+                user_record["total_earned"] = user_record.get("total_earned", 0) + earned
+
+        embed = discord.Embed(title=f"{interaction.user.display_name}'s Trade", color=discord.Color.green())
+        for side, symbol, shares, price, value in fills:
+            verb = "Bought" if side == "buy" else "Sold"
+            embed.add_field(
+                name=f"{verb} {symbol}",
+                value=f"Shares: {shares}\nAverage price: {round(price, 8)} Beaned Bucks\n"
+                      f"Market price: {prices[symbol]}\nValue: {value} Beaned Bucks",
+                inline=True
+            )
+        embed.set_footer(text=f"Spent {round(spent, 2)}, received {round(earned, 2)}. Balance: {balance} Beaned Bucks")
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="stockorder", description="Place a limit buy, limit sell or stop loss order.")
+    @app_commands.describe(
+    kind="buy (fills at or below price), sell (at or above price) or stop (sells at or below price)",
+    stock="Stock symbol (e.g. ACME)",
+    price="The limit or stop price",
+    amount="buy: Beaned Bucks to spend, sell/stop: shares to sell (or 'all')"
+    )
+    async def stockorder(self, interaction: discord.Interaction, kind: str, stock: str, price: float, amount: str):
+        kind = kind.lower()
+        stock = stock.upper()
+        if kind not in orders.KINDS:
+            await interaction.response.send_message("Order kind must be buy, sell or stop.", ephemeral=True)
+            return
+        if stock not in load_stocks():
+            await interaction.response.send_message("Invalid stock symbol.", ephemeral=True)
+            return
+        if price <= 0:
+            await interaction.response.send_message("Price must be greater than 0.", ephemeral=True)
+            return
+        price = round(price, 8 if "COIN" in stock else 2)
+
+        user_id = str(interaction.user.id)
+        if len(orders.user_orders(user_id)) >= orders.MAX_ORDERS_PER_USER:
+            await interaction.response.send_message(
+                f"You can have at most {orders.MAX_ORDERS_PER_USER} open orders, cancel one with /orders first.", ephemeral=True)
+            return
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            if kind == "buy":
+                current_balance = float(user_record.get("balance", 0))
+                try:
+                    quantity = current_balance if amount.lower() == "all" else float(amount)
+                except ValueError:
+                    await interaction.response.send_message("Invalid investment amount.", ephemeral=True)
+                    return
+                if quantity <= 0:
+                    await interaction.response.send_message("Investment amount must be greater than 0.", ephemeral=True)
+                    return
+                if quantity > current_balance:
+                    await interaction.response.send_message(f"You do not have enough Beaned Bucks to invest {quantity}.", ephemeral=True)
+                    return
+                #held by the order until it fills or is cancelled
+                user_record["balance"] = current_balance - quantity
+                order = orders.place(user_id, stock, kind, price, amount=quantity)
+                held = f"{quantity} Beaned Bucks"
+            else:
+                portfolio = user_record.get("portfolio", {})
+                if stock not in portfolio:
+                    await interaction.response.send_message("You do not own any shares of that stock.", ephemeral=True)
+                    return
+                try:
+                    quantity = portfolio[stock] if amount.lower() == "all" else float(amount)
+                except ValueError:
+                    await interaction.response.send_message("Invalid quantity format. Please provide a number or 'all'.", ephemeral=True)
+                    return
+                if quantity <= 0:
+                    await interaction.response.send_message("Quantity must be greater than zero.", ephemeral=True)
+                    return
+                if portfolio[stock] < quantity:
+                    await interaction.response.send_message("You do not own enough shares of that stock to sell.", ephemeral=True)
+                    return
+                portfolio[stock] -= quantity
+                if portfolio[stock] <= 0:
+                    del portfolio[stock]
+                user_record["portfolio"] = portfolio
+                order = orders.place(user_id, stock, kind, price, shares=quantity)
+                held = f"{quantity} shares of {stock}"
+
+        await interaction.response.send_message(
+            f"Order #{order['id']} placed: {kind} {stock} at {price}, holding {held} until it fills or you cancel it with /orders.")
+
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="orders", description="List your open stock orders, or cancel one.")
+    @app_commands.describe(cancel="Optional: the order number to cancel, or 'all'")
+    async def list_orders(self, interaction: discord.Interaction, cancel: Optional[str] = None):
+        user_id = str(interaction.user.id)
+        if cancel is not None:
+            if cancel.lower() == "all":
+                order_ids = [order["id"] for order in orders.user_orders(user_id)]
+            else:
+                try:
+                    order_ids = [int(cancel.lstrip("#"))]
+                except ValueError:
+                    await interaction.response.send_message("Give an order number or 'all'.", ephemeral=True)
+                    return
+            #taken out of the book before anything is awaited, so a market update can't fill it as well
+            cancelled = [order for order in (orders.cancel(order_id, user_id) for order_id in order_ids) if order]
+            if not cancelled:
+                await interaction.response.send_message("You have no open order with that number.", ephemeral=True)
+                return
+            async with economy.transaction(user_id) as tx:
+                user_record = tx[user_id]
+                for order in cancelled:
+                    orders.refund(user_record, order)
+            await interaction.response.send_message(
+                f"Cancelled order(s) {', '.join('#' + str(order['id']) for order in cancelled)}.", ephemeral=True)
+            return
 
+        open_orders = orders.user_orders(user_id)
+        embed = discord.Embed(title=f"{interaction.user.display_name}'s Open Orders", color=discord.Color.blue())
+        if not open_orders:
+            embed.description = "No open orders. Place one with /stockorder."
+        for order in open_orders:
+            held = f"{order['amount']} Beaned Bucks" if order["kind"] == "buy" else f"{order['shares']} shares"
+            embed.add_field(
+                name=f"#{order['id']} {order['kind']} {order['symbol']}",
+                value=f"Price: {order['price']}\nHolding: {held}",
+                inline=True
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="stockshort", description="Short a stock: sell borrowed shares to buy back later.")
+    @app_commands.describe(stock="Stock symbol (e.g. ACME)", quantity="The number of shares to short")
+    async def stockshort(self, interaction: discord.Interaction, stock: str, quantity: float):
+        stock = stock.upper()
+        price = load_stocks().get(stock)
+        if price is None:
+            await interaction.response.send_message("Invalid stock symbol.", ephemeral=True)
+            return
+        if price <= 0:
+            await interaction.response.send_message(f"{stock} can't be shorted at a price of {price}.", ephemeral=True)
+            return
+        if quantity <= 0:
+            await interaction.response.send_message("Quantity must be greater than zero.", ephemeral=True)
+            return
+        user_id = str(interaction.user.id)
+        deposit = round(shorts.required(quantity, price), 2)
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            current_balance = float(user_record.get("balance", 0))
+            if deposit > current_balance:
+                await interaction.response.send_message(
+                    f"Shorting {quantity} {stock} needs {deposit} Beaned Bucks of collateral on top of the sale, "
+                    f"you have {current_balance}.", ephemeral=True)
+                return
+            #the same for a short sold far enough under the price
+            proceeds = liquidity.quote_sell(stock, price, quantity)
+            existing = shorts.user_short(user_id, stock)
+            held = proceeds + deposit + (shorts.collateral(existing) if existing else 0)
+            total = quantity + (existing["shares"] if existing else 0)
+            if held < SHORT_MAINTENANCE * total * price:
+                await interaction.response.send_message(
+                    f"At {fill_note(price, proceeds, quantity)} that short would be bought in at the next update, "
+                    f"short fewer shares.", ephemeral=True)
+                return
+            #held as collateral and handed back on cover, not spent
+            user_record["balance"] = current_balance - deposit
+            proceeds = liquidity.sell(stock, price, quantity)
+            position = shorts.open_short(user_id, stock, quantity, proceeds, deposit)
+        await interaction.response.send_message(
+            f"Shorted {quantity} shares of {stock} at {fill_note(price, proceeds, quantity)}. You're short {position['shares']} shares, "
+            f"holding {round(shorts.collateral(position), 2)} Beaned Bucks of collateral ({deposit} of it yours).\n"
+            f"Borrowing costs {SHORT_FEE_DAILY * 100}% of the value a day. It's bought in if {stock} climbs past "
+            f"{round(shorts.buy_in_price(position), 8)}. Buy it back with /stockcover.\n"
+            f"Your new balance is {user_record['balance']} Beaned Bucks."
+        )
+
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="stockcover", description="Buy back shorted shares.")
+    @app_commands.describe(stock="Stock symbol (e.g. ACME)", quantity="The number of shares to buy back, or 'all'")
+    async def stockcover(self, interaction: discord.Interaction, stock: str, quantity: str):
+        stock = stock.upper()
+        price = load_stocks().get(stock)
+        if price is None:
+            await interaction.response.send_message("Invalid stock symbol.", ephemeral=True)
+            return
+        user_id = str(interaction.user.id)
+        if quantity.lower() != "all":
+            try:
+                cover_quantity = float(quantity)
+            except ValueError:
+                await interaction.response.send_message("Invalid quantity format. Please provide a number or 'all'.", ephemeral=True)
+                return
+            if cover_quantity <= 0:
+                await interaction.response.send_message("Quantity must be greater than zero.", ephemeral=True)
+                return
+        #the check, the cover and the fill all happen under the user's lock with nothing awaited in
+        #between, so neither the balance nor the short (a market update buying it in) can change under them
+        async with economy.transaction(user_id) as tx:
+            user_record = tx[user_id]
+            position = shorts.user_short(user_id, stock)
+            if position is None:
+                await interaction.response.send_message(f"You have no short position in {stock}.", ephemeral=True)
+                return
+            if quantity.lower() == "all":
+                cover_quantity = position["shares"]
+            if cover_quantity > position["shares"]:
+                await interaction.response.send_message(f"You are only short {position['shares']} shares of {stock}.", ephemeral=True)
+                return
+            #a big buy-back can cost more than the collateral it frees, the user makes up the difference
+            shortfall = round(liquidity.quote_cost(stock, price, cover_quantity)
+                              - shorts.collateral(position) * cover_quantity / position["shares"], 2)
+            balance = float(user_record.get("balance", 0))
+            if shortfall > balance:
+                await interaction.response.send_message(
+                    f"Buying back {cover_quantity} {stock} at once would cost {shortfall} Beaned Bucks more than the collateral, "
+                    f"you have {balance}. Cover fewer shares.", ephemeral=True)
+                return
+            position, covered, released, deposit = shorts.cover(user_id, stock, cover_quantity)
+            cost = liquidity.buy_back(stock, price, covered)
+            returned = round(released - cost, 2)
+            shorts.pay_out(user_record, returned, deposit)
+        left = f"You're still short {position['shares']} shares." if position["shares"] > 1e-9 else "Your short is closed."
+        settled = (f"{returned} Beaned Bucks of collateral returned" if returned >= 0
+                   else f"{-returned} Beaned Bucks more than the collateral paid from your balance")
+        await interaction.response.send_message(
+            f"Bought back {covered} shares of {stock} at {fill_note(price, cost, covered)} for {cost}, {settled}. {left}\n"
+            f"Your new balance is {user_record['balance']} Beaned Bucks."
+        )
+
+    @app_commands.guilds(discord.Object(id=GUILD_ID))
+    @app_commands.command(name="margin", description="List your margin positions, or close one.")
+    @app_commands.describe(close="Optional: the position number to close, or 'all'")
+    async def margin_positions(self, interaction: discord.Interaction, close: Optional[str] = None):
+        user_id = str(interaction.user.id)
+        prices = load_stocks()
+        if close is not None:
+            if close.lower() == "all":
+                position_ids = [position["id"] for position in margin.user_positions(user_id)]
+            else:
+                try:
+                    position_ids = [int(close.lstrip("#"))]
+                except ValueError:
+                    await interaction.response.send_message("Give a position number or 'all'.", ephemeral=True)
+                    return
+            #taken out of the book before anything is awaited, so a market update can't liquidate it as well
+            closed = [position for position in (margin.close(position_id, user_id) for position_id in position_ids) if position]
+            if not closed:
+                await interaction.response.send_message("You have no margin position with that number.", ephemeral=True)
+                return
+            lines = []
+            async with economy.transaction(user_id) as tx:
+                user_record = tx[user_id]
+                for position in closed:
+                    price = prices.get(position["symbol"], 0)
+                    sale = liquidity.sell(position["symbol"], price, position["shares"]) if price > 0 else 0.0
+                    owed, paid = margin.pay_out(user_record, position, sale)
+                    at = fill_note(price, sale, position["shares"]) if sale else price
+                    lines.append(f"#{position['id']}: sold {position['shares']} {position['symbol']} at {at} for {sale}, "
+                                 f"repaid {owed}, you got {paid} Beaned Bucks.")
+            lines.append(f"Your new balance is {user_record['balance']} Beaned Bucks.")
+            await interaction.response.send_message("\n".join(lines))
+            return
+
+        positions = margin.user_positions(user_id)
+        embed = discord.Embed(title=f"{interaction.user.display_name}'s Margin Positions", color=discord.Color.blue())
+        embed.set_footer(text=f"Interest: {MARGIN_INTEREST_DAILY * 100}% a day | Liquidated under {MARGIN_MAINTENANCE * 100:.0f}% equity")
+        if not positions:
+            embed.description = "No margin positions. Open one with /stockbuy and a leverage."
+        for position in positions:
+            price = prices.get(position["symbol"], 0)
+            loan = margin.loan(position)
+            embed.add_field(
+                name=f"#{position['id']} {position['symbol']}",
+                value=f"Shares: {position['shares']}\nBought at: {position['price']}\nPrice: {price}\n"
+                      f"Loan: {round(loan, 2)}\nEquity: {round(position['shares'] * price - loan, 2)}\n"
+                      f"Liquidation: {round(margin.liquidation_price(position), 8)}",
+                inline=True
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    alert_group = app_commands.Group(name="alert", description="DMs when a stock reaches a price.",
+                                     guild_ids=[GUILD_ID])
+
+    @alert_group.command(name="add", description="Get a DM once a stock reaches a price.")
+    @app_commands.describe(stock="Stock symbol (e.g. INK)",
+                           price="The price, or a change from the current price like +20% or -50%")
+    async def alert_add(self, interaction: discord.Interaction, stock: str, price: str):
+        stock = stock.upper()
+        current = load_stocks().get(stock)
+        if current is None:
+            await interaction.response.send_message("Invalid stock symbol.", ephemeral=True)
+            return
+        try:
+            if price.strip().endswith("%"):
+                change = price.strip()[:-1]
+                if change[:1] not in ("+", "-"):
+                    raise ValueError(price)
+                level = current * (1 + float(change) / 100)
+            else:
+                level = float(price)
+        except ValueError:
+            await interaction.response.send_message("Give a price, or a change like +20% or -50%.", ephemeral=True)
+            return
+        level = round(level, 8 if "COIN" in stock else 2)
+        if level <= 0:
+            await interaction.response.send_message("Price must be greater than 0.", ephemeral=True)
+            return
+        user_id = str(interaction.user.id)
+        if len(alerts.user_alerts(user_id)) >= alerts.MAX_ALERTS_PER_USER:
+            await interaction.response.send_message(
+                f"You can have at most {alerts.MAX_ALERTS_PER_USER} alerts, remove one with /alert remove first.", ephemeral=True)
+            return
+        try:
+            alert = alerts.add(user_id, stock, level, current)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"Alert #{alert['id']} set: you'll get a DM once {stock} is at or {alert['direction']} {level} (now {current}).",
+            ephemeral=True)
+
+    @alert_group.command(name="list", description="List your price alerts.")
+    async def alert_list(self, interaction: discord.Interaction):
+        active = alerts.user_alerts(interaction.user.id)
+        embed = discord.Embed(title=f"{interaction.user.display_name}'s Price Alerts", color=discord.Color.blue())
+        if not active:
+            embed.description = "No alerts. Set one with /alert add."
+        for alert in active:
+            embed.add_field(
+                name=f"#{alert['id']} {alert['symbol']} {alert['direction']} {alert['price']}",
+                value=f"Set at: {alert['from']}",
+                inline=True
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @alert_group.command(name="remove", description="Remove a price alert.")
+    @app_commands.describe(number="The alert number to remove, or 'all'")
+    async def alert_remove(self, interaction: discord.Interaction, number: str):
+        user_id = str(interaction.user.id)
+        if number.lower() == "all":
+            alert_ids = [alert["id"] for alert in alerts.user_alerts(user_id)]
+        else:
+            try:
+                alert_ids = [int(number.lstrip("#"))]
+            except ValueError:
+                await interaction.response.send_message("Give an alert number or 'all'.", ephemeral=True)
+                return
+        removed = [alert for alert in (alerts.remove(alert_id, user_id) for alert_id in alert_ids) if alert]
+        if not removed:
+            await interaction.response.send_message("You have no alert with that number.", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"Removed alert(s) {', '.join('#' + str(alert['id']) for alert in removed)}.", ephemeral=True)
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="stockgive", description="Give a stock to another user.")
@@ -463,50 +1033,44 @@ class StocksCog(commands.Cog):
             await interaction.response.send_message("Invalid stock symbol.", ephemeral=True)
             return
         
-        #load user data
-        data = load_data()
         user_id = str(interaction.user.id)
-        user_record = data.get(user_id, {"balance": 0, "portfolio": {}, "total_spent": 0, "total_earned": 0})
-        portfolio = user_record.get("portfolio", {})
-        #load target data
         target_id = str(user.id)
-        target_record = data.get(target_id, {"balance": 0, "portfolio": {}, "total_spent": 0, "total_earned": 0})
-        target_portfolio = target_record.get("portfolio", {})
+        #lock both users so the shares can't be spent twice
+        async with economy.transaction(user_id, target_id) as tx:
+            user_record = tx[user_id]
+            portfolio = user_record.get("portfolio", {})
+            target_record = tx[target_id]
+            target_portfolio = target_record.get("portfolio", {})
 
-        if stock not in portfolio:
-            await interaction.response.send_message("You do not own any shares of that stock.", ephemeral=True)
-            return
-        #determine the quantity to give.
-        try:
-            if quantity.lower() == "all":
-                give_quantity = portfolio[stock]
-            else:
-                give_quantity = float(quantity)
-        except Exception as e:
-            await interaction.response.send_message("Invalid quantity format. Please provide a number or 'all'.", ephemeral=True)
-            return
-
-        if give_quantity <= 0:
-            await interaction.response.send_message("Quantity must be greater than zero.", ephemeral=True)
-            return
-
-        if portfolio[stock] < give_quantity:
-            await interaction.response.send_message("You do not own enough shares of that stock to sell.", ephemeral=True)
-            return
+            if stock not in portfolio:
+                await interaction.response.send_message("You do not own any shares of that stock.", ephemeral=True)
+                return
+            #determine the quantity to give.
+            try:
+                if quantity.lower() == "all":
+                    give_quantity = portfolio[stock]
+                else:
+                    give_quantity = float(quantity)
+            except Exception as e:
+                await interaction.response.send_message("Invalid quantity format. Please provide a number or 'all'.", ephemeral=True)
+                return
 
-        #update portfolio.
-        portfolio[stock] -= give_quantity
-        if portfolio[stock] <= 0:
-            del portfolio[stock]
-        user_record["portfolio"] = portfolio
-        data[user_id] = user_record
+            if give_quantity <= 0:
+                await interaction.response.send_message("Quantity must be greater than zero.", ephemeral=True)
+                return
 
-        target_portfolio[stock] = target_portfolio.get(stock, 0) + give_quantity
-        target_record["portfolio"] = target_portfolio
-        data[target_id] = target_record
+            if portfolio[stock] < give_quantity:
+                await interaction.response.send_message("You do not own enough shares of that stock to sell.", ephemeral=True)
+                return
 
+            #update portfolio.
+            portfolio[stock] -= give_quantity
+            if portfolio[stock] <= 0:
+                del portfolio[stock]
+            user_record["portfolio"] = portfolio
 
-        save_data(data)
+            target_portfolio[stock] = target_portfolio.get(stock, 0) + give_quantity
+            target_record["portfolio"] = target_portfolio
 
         await interaction.response.send_message(
             f"Successfully gave {user.mention} {give_quantity} shares of {stock}.")
@@ -0,0 +1,356 @@
+#on-disk persistence for the economy data. JsonBackend is the original data.json layout,
+#SqliteBackend keeps one row per user plus normalized portfolio/inventory/facilities/options tables
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+from records import UserRecord
+import snapshots
+from fileio import write_atomic
+
+
+#full rewrites hand the event loop back after this many users
+CHUNK_SIZE = 2000
+
+
+def as_fields(record):
+    """Plain dict form of a user record, None for a user with nothing stored."""
+    if isinstance(record, UserRecord):
+        record = record.to_dict()
+    return record or None
+
+
+class JsonBackend:
+    """Keeps every user in one snapshot keyed by user id, plus an append-only json log.
+
+    A flush appends one line per changed user to <path>.log, so its cost depends on how
+    many users changed rather than on the size of the economy. compaction folds the log
+    into a fresh snapshot. On startup the log is replayed over the last snapshot.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.log_path = path + ".log"
+
+    def load(self):
+        data = {}
+        if os.path.exists(self.path):
+            try:
+                data = snapshots.load(self.path)
+            except ValueError:
+                data = {}
+        replayed = 0
+        if os.path.exists(self.log_path):
+            #offset just past the last entry that replayed, anything after it is torn
+            read_bytes = good_bytes = 0
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    read_bytes += len(line)
+                    try:
+                        entry = snapshots.loads(line)
+                    except ValueError:
+                        entry = None
+                    if entry is None or not line.endswith(b"\n"):
+                        #write() cuts failed appends off, so this is a crash mid-append. skip it rather
+                        #than stopping, the changes logged after it are still good
+                        print(f"Skipping a corrupt entry in {self.log_path}")
+                        continue
+                    if "r" in entry:
+                        data[entry["u"]] = entry["r"]
+                    else:
+                        data.pop(entry["u"], None)
+                    good_bytes = read_bytes
+                    replayed += 1
+            if good_bytes != read_bytes:
+                #a torn last line, cut it off so new appends start on a line of their own
+                with open(self.log_path, "r+b") as f:
+                    f.truncate(good_bytes)
+        if replayed:
+            print(f"Replayed {replayed} logged changes from {self.log_path}")
+        return data
+
+    def encode(self, data, dirty_ids):
+        """Build the write payload. Runs on the event loop so it sees a consistent copy of data."""
+        if dirty_ids is None:
+            return self.encode_compaction(data)
+        lines = []
+        for user_id in dirty_ids:
+            fields = as_fields(data.get(user_id))
+            if fields:
+                lines.append(snapshots.json_line({"u": user_id, "r": fields}))
+            else:
+                lines.append(snapshots.json_line({"u": user_id, "d": 1}))
+        return ("append", b"\n".join(lines) + b"\n")
+
+    def encode_compaction(self, data):
+        fields = {user_id: f for user_id, record in data.items() if (f := as_fields(record))}
+        return ("snapshot", snapshots.dumps(fields))
+
+    async def encode_async(self, data, dirty_ids):
+        """encode() that yields to the event loop during a full rewrite."""
+        if dirty_ids is None:
+            return await self.encode_compaction_async(data)
+        return self.encode(data, dirty_ids)
+
+    async def encode_compaction_async(self, data):
+        #each user is encoded on the loop so the bytes are a consistent copy of that user,
+        #joining them into the snapshot format happens in write()
+        parts = []
+        for i, (user_id, record) in enumerate(list(data.items()), 1):
+            fields = as_fields(record)
+            if fields:
+                parts.append((user_id, snapshots.json_line(fields)))
+            if i % CHUNK_SIZE == 0:
+                await asyncio.sleep(0)
+        return ("parts", parts)
+
+    def write(self, payload):
+        """Persist a payload from encode(). Safe to run in a worker thread."""
+        kind, raw = payload
+        if kind == "append":
+            start = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+            try:
+                with open(self.log_path, "ab") as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except BaseException:
+                #don't leave half a line for the next append to be glued onto, the users stay dirty
+                #and get written again by the next flush
+                os.truncate(self.log_path, start)
+                raise
+        else:
+            if kind == "parts":
+                raw = snapshots.join_parts(raw)
+            #the snapshot already holds everything in the log, so the log can start over
+            write_atomic(self.path, raw)
+            open(self.log_path, "w").close()
+
+    def forget(self, user_ids):
+        """Called after a failed write, nothing is cached here."""
+        pass
+
+
+#scalar fields that get their own (indexed) column in the users table, everything else
+#that isn't a child table goes into the extra json column
+USER_COLUMNS = ("balance", "cash", "prestige", "vc_time", "vc_timealone", "vc_afk", "graphics_cards")
+CHILD_KEYS = ("portfolio", "inventory", "facilities", "options")
+
+#columns are declared without a type on purpose, sqlite then keeps ints as ints and floats as floats
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    balance, cash, prestige, vc_time, vc_timealone, vc_afk, graphics_cards,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS portfolio (
+    user_id TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    shares,
+    PRIMARY KEY (user_id, symbol)
+);
+CREATE TABLE IF NOT EXISTS inventory (
+    user_id TEXT NOT NULL,
+    item TEXT NOT NULL,
+    quantity,
+    PRIMARY KEY (user_id, item)
+);
+CREATE TABLE IF NOT EXISTS facilities (
+    user_id TEXT NOT NULL,
+    facility TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (user_id, facility)
+);
+CREATE TABLE IF NOT EXISTS options (
+    user_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    stock TEXT,
+    expiration TEXT,
+    data TEXT,
+    PRIMARY KEY (user_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_users_balance ON users(balance);
+CREATE INDEX IF NOT EXISTS idx_users_prestige ON users(prestige);
+CREATE INDEX IF NOT EXISTS idx_users_vc_time ON users(vc_time);
+CREATE INDEX IF NOT EXISTS idx_users_vc_timealone ON users(vc_timealone);
+CREATE INDEX IF NOT EXISTS idx_users_vc_afk ON users(vc_afk);
+CREATE INDEX IF NOT EXISTS idx_portfolio_symbol ON portfolio(symbol);
+CREATE INDEX IF NOT EXISTS idx_options_expiration ON options(expiration);
+"""
+
+CHECKPOINT = "checkpoint"
+
+#(table, key column, value column) for the dict-shaped child tables
+DICT_TABLES = (
+    ("portfolio", "symbol", "shares"),
+    ("inventory", "item", "quantity"),
+    ("facilities", "facility", "value"),
+)
+
+
+def record_to_rows(user_id, record):
+    """Split one user record into the row values for every table."""
+    extra = {k: v for k, v in record.items() if k not in USER_COLUMNS and k not in CHILD_KEYS}
+    return {
+        "users": (user_id,) + tuple(record.get(c) for c in USER_COLUMNS) + (json.dumps(extra) if extra else None,),
+        "portfolio": dict(record.get("portfolio") or {}),
+        "inventory": dict(record.get("inventory") or {}),
+        #oil facilities are lists of wells, so facility values are stored as json
+        "facilities": {k: json.dumps(v) for k, v in (record.get("facilities") or {}).items()},
+        "options": tuple(
+            (i, o.get("stock"), o.get("expiration"), json.dumps(o))
+            for i, o in enumerate(record.get("options") or [])
+        ),
+    }
+
+
+def rows_to_record(rows):
+    """Inverse of record_to_rows."""
+    user_row = rows["users"]
+    record = {}
+    for column, value in zip(USER_COLUMNS, user_row[1:-1]):
+        if value is not None:
+            record[column] = value
+    if user_row[-1]:
+        record.update(json.loads(user_row[-1]))
+    if rows["portfolio"]:
+        record["portfolio"] = dict(rows["portfolio"])
+    if rows["inventory"]:
+        record["inventory"] = dict(rows["inventory"])
+    if rows["facilities"]:
+        record["facilities"] = {k: json.loads(v) for k, v in rows["facilities"].items()}
+    if rows["options"]:
+        record["options"] = [json.loads(row[3]) for row in rows["options"]]
+    return record
+
+
+class SqliteBackend:
+    """One row per user with normalized child tables. A flush only touches rows that changed."""
+    def __init__(self, path, migrate_from=None):
+        self.path = path
+        is_new = not os.path.exists(path)
+        #writes happen from flush worker threads, economy serializes them with a lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        #last rows written per user, used to work out the minimal set of statements per flush
+        self._written = {}
+        if is_new and migrate_from and os.path.exists(migrate_from):
+            self.migrate_json(migrate_from)
+
+    def migrate_json(self, json_path):
+        """One-shot import of an existing data.json."""
+        data = JsonBackend(json_path).load()
+        self.write(self.encode(data, None))
+        print(f"Migrated {len(data)} users from {json_path} to {self.path}")
+
+    def load(self):
+        self._written = {}
+        for row in self.conn.execute("SELECT * FROM users"):
+            self._written[row[0]] = {"users": row, "portfolio": {}, "inventory": {}, "facilities": {}, "options": ()}
+        for table, key_column, value_column in DICT_TABLES:
+            for user_id, key, value in self.conn.execute(f"SELECT user_id, {key_column}, {value_column} FROM {table}"):
+                if user_id in self._written:
+                    self._written[user_id][table][key] = value
+        options = {}
+        for row in self.conn.execute("SELECT position, stock, expiration, data, user_id FROM options ORDER BY user_id, position"):
+            options.setdefault(row[4], []).append(row[:4])
+        for user_id, rows in options.items():
+            if user_id in self._written:
+                self._written[user_id]["options"] = tuple(rows)
+        return {user_id: rows_to_record(rows) for user_id, rows in self._written.items()}
+
+    def _delete_user(self, user_id, statements):
+        for table in ("users", "portfolio", "inventory", "facilities", "options"):
+            statements.append((f"DELETE FROM {table} WHERE user_id = ?", (user_id,)))
+
+    def encode(self, data, dirty_ids):
+        """Diff the dirty users against what was last written and return the statements to run."""
+        if dirty_ids is None:
+            dirty_ids = set(data) | set(self._written)
+        statements = []
+        placeholders = ", ".join("?" * (len(USER_COLUMNS) + 2))
+        for user_id in dirty_ids:
+            record = as_fields(data.get(user_id))
+            previous = self._written.get(user_id)
+            if record is None:
+                if previous is not None:
+                    self._delete_user(user_id, statements)
+                    del self._written[user_id]
+                continue
+            rows = record_to_rows(user_id, record)
+            if previous is None:
+                #unknown state on disk, start this user from scratch
+                self._delete_user(user_id, statements)
+                previous = {"users": None, "portfolio": {}, "inventory": {}, "facilities": {}, "options": ()}
+            if rows["users"] != previous["users"]:
+                statements.append((f"INSERT OR REPLACE INTO users VALUES ({placeholders})", rows["users"]))
+            for table, key_column, value_column in DICT_TABLES:
+                new, old = rows[table], previous[table]
+                for key, value in new.items():
+                    if old.get(key) != value:
+                        statements.append((f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)", (user_id, key, value)))
+                for key in old.keys() - new.keys():
+                    statements.append((f"DELETE FROM {table} WHERE user_id = ? AND {key_column} = ?", (user_id, key)))
+            if rows["options"] != previous["options"]:
+                statements.append(("DELETE FROM options WHERE user_id = ?", (user_id,)))
+                for option_row in rows["options"]:
+                    statements.append(("INSERT INTO options VALUES (?, ?, ?, ?, ?)", (user_id,) + option_row))
+            self._written[user_id] = rows
+        return statements
+
+    async def encode_async(self, data, dirty_ids):
+        """encode() in chunks of users, yielding to the event loop in between."""
+        if dirty_ids is None:
+            dirty_ids = set(data) | set(self._written)
+        user_ids = list(dirty_ids)
+        statements = []
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            if start:
+                await asyncio.sleep(0)
+            statements.extend(self.encode(data, user_ids[start:start + CHUNK_SIZE]))
+        return statements
+
+    def encode_compaction(self, data):
+        #sqlite keeps its own write-ahead log, compaction just checkpoints it into the main file
+        return CHECKPOINT
+
+    async def encode_compaction_async(self, data):
+        return CHECKPOINT
+
+    def write(self, payload):
+        """Run the statements from encode() as one transaction."""
+        if payload == CHECKPOINT:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return
+        if not payload:
+            return
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in payload:
+                cursor.execute(sql, params)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+
+    def forget(self, user_ids):
+        """A write failed, so the next flush rewrites these users from scratch."""
+        if user_ids is None:
+            self._written = {}
+            return
+        for user_id in user_ids:
+            self._written.pop(user_id, None)
+
+
+if __name__ == "__main__":
+    #python storage.py data.json economy.db
+    if len(sys.argv) != 3:
+        print("usage: python storage.py <data.json> <economy.db>")
+        sys.exit(1)
+    if os.path.exists(sys.argv[2]):
+        print(f"{sys.argv[2]} already exists, not migrating.")
+        sys.exit(1)
+    SqliteBackend(sys.argv[2], migrate_from=sys.argv[1])
@@ -0,0 +1,6 @@
+#tests run against a throwaway directory like the benchmarks, so the live json files are never touched.
+#the bot modules read config.json and the data files from the working directory on import, so the
+#sandbox has to be entered before any test module imports them.
+from benchmarks import enter_sandbox
+
+enter_sandbox()
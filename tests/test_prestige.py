@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+import margin
+import orders
+import shorts
+from prestige import PrestigeCog
+from utils import load_data, save_data
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+class FakeUser:
+    def __init__(self, uid):
+        self.id = uid
+
+
+class FakeInteraction:
+    def __init__(self, uid):
+        self.user = FakeUser(uid)
+        self.response = FakeResponse()
+
+
+def prestige(uid):
+    interaction = FakeInteraction(uid)
+    asyncio.run(PrestigeCog.prestigeup.callback(PrestigeCog(None), interaction))
+    return interaction.response.messages
+
+
+def rich_user(uid):
+    data = load_data()
+    data[str(uid)] = {"balance": 10 ** 8, "prestige": 0, "portfolio": {}}
+    save_data(data, str(uid))
+
+
+def open_order(uid):
+    order = orders.place(uid, "BEAN", "buy", 1.0, amount=100.0)
+    return lambda: orders.cancel(order["id"], uid)
+
+
+def open_margin(uid):
+    position = margin.open_position(uid, "BEAN", 1.0, 100.0, 2)
+    return lambda: margin.close(position["id"], uid)
+
+
+def open_short(uid):
+    position = shorts.open_short(uid, "BEAN", 10.0, 10.0, 5.0)
+    return lambda: shorts.cover(uid, "BEAN", position["shares"])
+
+
+@pytest.mark.parametrize("uid, opener", [(101, open_order), (102, open_margin), (103, open_short)])
+def test_prestige_refused_with_open_positions(uid, opener):
+    rich_user(uid)
+    close = opener(uid)
+    messages = prestige(uid)
+    assert messages[0].startswith("Close these before you prestige")
+    record = load_data()[str(uid)]
+    assert record["prestige"] == 0
+    assert record["balance"] == 10 ** 8
+
+    close()
+    prestige(uid)
+    record = load_data()[str(uid)]
+    assert record["prestige"] == 1
+    assert record["balance"] == 0
@@ -0,0 +1,58 @@
+import storage
+from storage import JsonBackend
+
+
+class TornFile:
+    """Writes the first half of what it's given, then fails like a full disk."""
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+    def write(self, raw):
+        self.f.write(raw[:len(raw) // 2])
+        self.f.flush()
+        raise OSError(28, "No space left on device")
+
+
+def test_failed_append_is_cut_off(tmp_path, monkeypatch):
+    backend = JsonBackend(str(tmp_path / "data.json"))
+    backend.write(backend.encode({"1": {"balance": 1}}, ["1"]))
+    size = (tmp_path / "data.json.log").stat().st_size
+
+    monkeypatch.setattr(storage, "open", lambda path, mode: TornFile(open(path, mode)), raising=False)
+    try:
+        backend.write(backend.encode({"2": {"balance": 2}}, ["2"]))
+    except OSError:
+        pass
+    else:
+        raise AssertionError("the torn write should have raised")
+    monkeypatch.undo()
+    assert (tmp_path / "data.json.log").stat().st_size == size
+
+    #the next flush retries the user, after the failed one
+    backend.forget(["2"])
+    backend.write(backend.encode({"2": {"balance": 2}, "3": {"balance": 3}}, ["2", "3"]))
+    assert JsonBackend(str(tmp_path / "data.json")).load() == {
+        "1": {"balance": 1}, "2": {"balance": 2}, "3": {"balance": 3},
+    }
+
+
+def test_replay_skips_corrupt_lines(tmp_path):
+    backend = JsonBackend(str(tmp_path / "data.json"))
+    backend.write(backend.encode({"1": {"balance": 1}}, ["1"]))
+    with open(backend.log_path, "ab") as f:
+        f.write(b'{"u": "2", "r": {"bal\n')
+    backend.write(backend.encode({"3": {"balance": 3}}, ["3"]))
+    with open(backend.log_path, "ab") as f:
+        f.write(b'{"u": "4", "r"')
+
+    assert JsonBackend(backend.path).load() == {"1": {"balance": 1}, "3": {"balance": 3}}
+    #only the torn last line is cut, new appends start on a line of their own
+    assert open(backend.log_path, "rb").read().endswith(b"\n")
+    backend.write(backend.encode({"4": {"balance": 4}}, ["4"]))
+    assert JsonBackend(backend.path).load() == {"1": {"balance": 1}, "3": {"balance": 3}, "4": {"balance": 4}}
@@ -1,17 +1,11 @@
 #stuff that pretty much everything needs
-from globals import TOKEN, GUILD_ID, TARGET_MEMBER_ID, TARGET_USER_ID, DATA_FILE, ALLOWED_ROLES, STOCK_FILE, STOCK_HISTORY_FILE, UPDATE_INTERVAL_MINUTES, LOTTERY_FILE, AFK_CHANNEL_ID
-import os
-import json
+from globals import TOKEN, GUILD_ID, TARGET_MEMBER_ID, TARGET_USER_ID, ALLOWED_ROLES, STOCK_FILE, STOCK_HISTORY_FILE, UPDATE_INTERVAL_MINUTES, LOTTERY_FILE, AFK_CHANNEL_ID
+import economy
 
 def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {}
-    with open(DATA_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+    #shared in-memory copy, see economy.py
+    return economy.load()
 
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
\ No newline at end of file
+def save_data(data, *user_ids):
+    #pass the ids of the users you changed, with none every user gets rewritten on the next flush
+    economy.save(data, *user_ids)
\ No newline at end of file